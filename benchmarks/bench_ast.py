@@ -0,0 +1,104 @@
+"""Compara el AST de diccionarios de SimpylParser con los nodos compactos de simpyl_ast: memoria del árbol,
+memoria máxima al analizar y velocidad de recorrido y de un visitante sobre un programa generado."""
+import gc  # Recolección entre mediciones
+import sys  # Argumentos de la línea de órdenes
+import time  # Medición de tiempos
+import tracemalloc  # Medición de memoria
+
+import paths  # noqa: F401  Añade src a sys.path
+from bench_suite import generate_wide
+from lexer import lexer
+from simpyl_ast import NodeVisitor, Operation, from_dict, parse_compact, to_dict, walk
+from simpyl_optimizer import walk as walk_dicts
+from simpyl_parser import SimpylParser
+
+
+class DictVisitor:
+    """Visitante equivalente sobre diccionarios: busca el método por el texto del tipo en cada nodo."""
+
+    def __init__(self):
+        self.operations = 0
+
+    def visit(self, node):
+        return getattr(self, "visit_" + node["type"], self.generic_visit)(node)
+
+    def generic_visit(self, node):
+        for value in node.values():
+            if isinstance(value, dict):
+                self.visit(value)
+            elif isinstance(value, list):
+                for item in value:
+                    if isinstance(item, dict):
+                        self.visit(item)
+
+    def visit_operation(self, node):
+        self.operations += 1
+        self.generic_visit(node)
+
+
+class CountingVisitor(NodeVisitor):
+    def __init__(self):
+        super().__init__()
+        self.operations = 0
+
+    def visit_operation(self, node):
+        self.operations += 1
+        self.generic_visit(node)
+
+
+def build(function, code):
+    """Devuelve el árbol, la memoria que ocupa al terminar y la memoria máxima durante el análisis (MB)."""
+    gc.collect()
+    tracemalloc.start()
+    tree = function(code)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return tree, current / (1024 * 1024), peak / (1024 * 1024)
+
+
+def elapsed(function, *args):
+    """Devuelve el resultado y los segundos que tarda una llamada."""
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def count_dict_operations(statements):
+    return sum(1 for statement in statements for node in walk_dicts(statement) if node["type"] == "operation")
+
+
+def count_compact_operations(nodes):
+    kind = Operation.kind
+    return sum(1 for node in walk(nodes) if node.kind == kind)
+
+
+def main(forms=150_000):
+    code = generate_wide(forms)
+    dicts, dict_memory, dict_peak = build(SimpylParser(lexer).parse, code)
+    nodes, compact_memory, compact_peak = build(parse_compact, code)
+    total = sum(1 for _ in walk(nodes))
+    print(f"Programa generado: {forms} formas, {total} nodos")
+    print(f"Árbol de diccionarios:  {dict_memory:8.1f} MB (máximo al analizar {dict_peak:8.1f} MB)")
+    print(f"Árbol compacto:         {compact_memory:8.1f} MB (máximo al analizar {compact_peak:8.1f} MB)")
+
+    expected, dict_walk = elapsed(count_dict_operations, dicts)
+    operations, compact_walk = elapsed(count_compact_operations, nodes)
+    assert operations == expected
+    print(f"Recorrido y filtrado por tipo:  diccionarios {dict_walk:6.3f} s   compacto {compact_walk:6.3f} s"
+          f"   ({dict_walk / compact_walk:4.2f}x)")
+
+    dict_visitor, compact_visitor = DictVisitor(), CountingVisitor()
+    _, dict_visit = elapsed(lambda: [dict_visitor.visit(statement) for statement in dicts])
+    _, compact_visit = elapsed(compact_visitor.visit, nodes)
+    assert compact_visitor.operations == dict_visitor.operations == expected
+    print(f"Visitante:                      diccionarios {dict_visit:6.3f} s   compacto {compact_visit:6.3f} s"
+          f"   ({dict_visit / compact_visit:4.2f}x)")
+
+    converted, to_compact = elapsed(from_dict, dicts)
+    restored, to_dicts = elapsed(to_dict, converted)
+    assert restored == dicts
+    print(f"Conversión sin pérdidas:        a compacto {to_compact:6.3f} s   a diccionarios {to_dicts:6.3f} s")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 150_000)
@@ -0,0 +1,54 @@
+"""Ejecuta varios scripts a la vez con run_async, uno de ellos infinito, y mide cuánto se retrasa el bucle de eventos."""
+import asyncio  # Bucle de eventos compartido por todos los scripts
+import sys  # Argumentos de la línea de órdenes
+import time  # Medición de tiempos
+
+import paths  # noqa: F401  Añade src a sys.path
+from simpyl_interpreter import SimpylBudgetError, SimpylInterpreter
+
+WORK = "(i = 0) (t = 0) (while (< i {n}) (t = (+ t i)) (i = (+ i 1))) t"
+FOREVER = "(i = 0) (while (== 0 0) (i = (+ i 1)))"
+TICK = 0.005  # Periodo del temporizador que mide el retraso del bucle
+
+
+async def measure(tenants, n, slice_steps):
+    """Devuelve (segundos totales, retraso máximo del temporizador en ms, resultados correctos)."""
+    delays = []
+
+    async def ticker():
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(TICK)
+            delays.append(time.perf_counter() - start - TICK)
+
+    async def forever():
+        try:
+            await SimpylInterpreter(engine="vm").run_async(FOREVER, timeout=60, slice_steps=slice_steps)
+        except SimpylBudgetError:
+            pass
+
+    timer = asyncio.create_task(ticker())
+    runaway = asyncio.create_task(forever())
+    start = time.perf_counter()
+    results = await asyncio.gather(*(SimpylInterpreter(engine="vm").run_async(WORK.format(n=n), slice_steps=slice_steps)
+                                     for _ in range(tenants)))
+    elapsed = time.perf_counter() - start
+    runaway.cancel()
+    timer.cancel()
+    expected = n * (n - 1) // 2
+    return elapsed, max(delays) * 1000, all(result == expected for result in results)
+
+
+def main(tenants=8, n=100_000):
+    start = time.perf_counter()
+    for _ in range(tenants):
+        SimpylInterpreter(engine="vm").run_source(WORK.format(n=n))
+    print(f"{tenants} scripts de {n} iteraciones uno tras otro con run_source: {time.perf_counter() - start:.2f} s")
+    for slice_steps in (100, 1_000, 10_000):
+        elapsed, delay, correct = asyncio.run(measure(tenants, n, slice_steps))
+        print(f"run_async con tramos de {slice_steps:6} pasos y un script infinito: {elapsed:6.2f} s, "
+              f"retraso máximo del bucle {delay:7.2f} ms, resultados {'correctos' if correct else 'INCORRECTOS'}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 8)
@@ -0,0 +1,40 @@
+"""Compara un proceso por script con el modo por lotes (--jobs) sobre muchos scripts pequeños."""
+import os  # Rutas de los scripts generados
+import subprocess  # Un intérprete nuevo por script, como antes
+import sys  # Argumentos de la línea de órdenes y ejecutable de Python
+import tempfile  # Directorio de los scripts generados
+import time  # Medición de tiempos
+
+from paths import SRC  # Importarlo añade src a sys.path
+from simpyl_batch import BatchRunner
+
+SCRIPT = "(define doble (x) (* x 2)) (n = {i}) (print (doble n)) (doble (+ n 1))"
+
+
+def main(count=2000, single=50):
+    with tempfile.TemporaryDirectory() as directory:
+        paths = []
+        for i in range(count):
+            path = os.path.join(directory, f"script{i}.spy")
+            with open(path, "w", encoding="utf-8") as file:
+                file.write(SCRIPT.format(i=i))
+            paths.append(path)
+
+        start = time.perf_counter()
+        for path in paths[:single]:
+            subprocess.run([sys.executable, os.path.join(SRC, "simpyl_interpreter.py"), "--engine", "vm", "--no-cache", path],
+                           cwd=directory, check=True, capture_output=True)
+        per_script = (time.perf_counter() - start) / single
+        print(f"Un proceso por script: {per_script * 1000:.1f} ms por script, {per_script * count:.1f} s estimados para {count}")
+
+        for jobs in sorted({1, os.cpu_count() or 1}):
+            start = time.perf_counter()
+            with BatchRunner(jobs=jobs, engine="vm", use_cache=False) as runner:
+                results = list(runner.run(paths))
+            elapsed = time.perf_counter() - start
+            assert all(result.status == "ok" for result in results)
+            print(f"Lote con {jobs:2} procesos: {elapsed:6.2f} s para {count} ({count / elapsed:8.0f} scripts/s)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
@@ -0,0 +1,78 @@
+"""Mide el coste del depurador: sin depurador, con un punto de interrupción en otra función y con el punto dentro del bucle."""
+import gc  # Recolección entre mediciones
+import sys  # Argumentos de la línea de órdenes
+import time  # Medición de tiempos
+
+import paths  # noqa: F401  Añade src a sys.path
+from lexer import lexer
+from simpyl_compiler import SimpylCompiler
+from simpyl_interpreter import Debugger
+from simpyl_parser import SimpylParser
+from simpyl_vm import SimpylVM
+
+PROGRAM = """
+(define fib (n)
+  (if (< n 2) n (+ (fib (- n 1)) (fib (- n 2)))))
+(define informe (x)
+  (print x))
+(resultado = (fib {n}))
+"""
+OTHER_FUNCTION = 5  # Línea del cuerpo de 'informe', que nunca se ejecuta
+HOT_LOOP = 3  # Línea del cuerpo de 'fib'
+
+
+def make_debugger(line):
+    """Depurador activo con un punto de interrupción que sólo cuenta las pausas."""
+    debugger = Debugger()
+    debugger.debug_mode = True
+    debugger.breakpoints[line] = True
+    debugger.hits = 0
+
+    def pause(line, names, values, read_global):
+        debugger.hits += 1
+    debugger.pause = pause
+    return debugger
+
+
+def run(engine, statements, debugger):
+    """Compila y ejecuta el programa y devuelve los segundos de ejecución."""
+    variables = {}
+    gc.collect()
+    if engine == "closure":
+        forms = SimpylCompiler(variables, {}, debugger=debugger).compile_program(statements)
+        start = time.perf_counter()
+        for form in forms:
+            form(None)
+    else:
+        vm = SimpylVM(variables, debugger=debugger)
+        code = vm.compile(statements)
+        start = time.perf_counter()
+        vm.execute(code)
+    return time.perf_counter() - start
+
+
+def same_bytecode(statements):
+    """Comprueba que 'fib' se compila igual sin depurador y con un punto de interrupción en otra función."""
+    def listing(debugger):
+        program = SimpylVM({}, debugger=debugger).compile(statements)
+        return [const.code.tobytes() for const in program.consts if getattr(const, "name", None) == "fib"]
+    return listing(None) == listing(make_debugger(OTHER_FUNCTION))
+
+
+def main(n=22, repeat=5):
+    statements = SimpylParser(lexer).parse(PROGRAM.format(n=n))
+    print(f"fib({n}), mejor de {repeat}")
+    print(f"Bytecode de 'fib' idéntico con un punto de interrupción en otra función: {'sí' if same_bytecode(statements) else 'no'}")
+    for engine in ("closure", "vm"):
+        times = {"sin depurador": [], "punto en otra función": [], "punto en fib": []}
+        for _ in range(repeat):
+            times["sin depurador"].append(run(engine, statements, None))
+            times["punto en otra función"].append(run(engine, statements, make_debugger(OTHER_FUNCTION)))
+            times["punto en fib"].append(run(engine, statements, make_debugger(HOT_LOOP)))
+        baseline = min(times["sin depurador"])
+        print(f"{engine:8} " + "   ".join(f"{name}: {min(samples):7.3f} s ({(min(samples) / baseline - 1) * 100:+6.1f}%)"
+                                         for name, samples in times.items()))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 22)
@@ -0,0 +1,57 @@
+"""Compara volver a analizar un archivo completo con el análisis incremental de IncrementalDocument
+tras pequeñas ediciones (cambiar un número, añadir una línea, borrar una forma) en puntos repartidos."""
+import sys  # Argumentos de la línea de órdenes
+import time  # Medición de tiempos
+
+import paths  # noqa: F401  Añade src a sys.path
+from bench_suite import generate_wide
+from lexer import lexer
+from simpyl_incremental import IncrementalDocument
+from simpyl_parser import SimpylParser
+
+
+def edits(text, count):
+    """Ediciones (inicio, fin, texto) repartidas por el documento: cada una deja el programa válido."""
+    result = []
+    for index in range(count):
+        position = text.index("\n(", len(text) * index // count) + 1
+        if index % 3 == 0:
+            digit = text.index(" 2)", position) + 1
+            result.append((digit, digit + 1, "7"))  # Cambia un literal
+        elif index % 3 == 1:
+            result.append((position, position, "(print \"nueva\")\n"))  # Inserta una forma
+        else:
+            result.append((position, text.index("\n", position) + 1, ""))  # Borra una forma
+        text = text[:result[-1][0]] + result[-1][2] + text[result[-1][1]:]
+    return result
+
+
+def main(forms=5000, count=30):
+    code = generate_wide(forms)
+    changes = edits(code, count)
+    print(f"Documento: {forms} formas, {code.count(chr(10)) + 1} líneas; {count} ediciones")
+
+    text = code
+    start = time.perf_counter()
+    for begin, end, new_text in changes:
+        text = text[:begin] + new_text + text[end:]
+        expected = SimpylParser(lexer).parse(text)
+    full = time.perf_counter() - start
+
+    start = time.perf_counter()
+    document = IncrementalDocument(code)
+    initial = time.perf_counter() - start
+    start = time.perf_counter()
+    for begin, end, new_text in changes:
+        document.edit(begin, end, new_text)
+    statements = document.statements()
+    incremental = time.perf_counter() - start
+    assert statements == expected
+
+    print(f"Análisis inicial del documento:  {initial * 1000:9.2f} ms")
+    print(f"Reanálisis completo por edición: {full / count * 1000:9.2f} ms")
+    print(f"Análisis incremental por edición: {incremental / count * 1000:8.2f} ms   ({full / incremental:5.1f}x)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
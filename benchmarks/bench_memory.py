@@ -0,0 +1,98 @@
+"""Compara las pausas del recolector de basura entre el antiguo sondeo con psutil y las políticas de MemoryManager."""
+import gc  # Recolector de basura y sus callbacks
+import os  # Tamaño de página de la memoria
+import sys  # Argumentos de la línea de órdenes
+import time  # Medición de tiempos
+
+import paths  # noqa: F401  Añade src a sys.path
+from simpyl_interpreter import MemoryManager, SimpylInterpreter
+
+# Cada llamada crea un ciclo de referencias: la función interna guarda el marco que la contiene
+FORM = ("(define externa (n) (f = (define interna (x) (+ x n))) (interna n)) "
+        "(i = 0) (while (< i 200) (externa i) (i = (+ i 1)))")
+
+
+def rss_mb():
+    """Memoria residente del proceso en MB, con psutil si está instalado como hacía el intérprete."""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    except ImportError:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+class LegacyMemoryManager:
+    """Comportamiento anterior: cada 10 comandos lee el RSS y, por encima de 100 MB, hace una colección completa
+    y fija el umbral de la generación 0 en el 80 % de los megabytes usados."""
+
+    def __init__(self, threshold=100, check_interval=10):
+        self.memory_threshold = threshold
+        self.check_interval = check_interval
+
+    def monitor_memory(self, command_count):
+        if command_count % self.check_interval == 0:
+            memory_usage = rss_mb()
+            if memory_usage > self.memory_threshold:
+                gc.collect()
+                gc.set_threshold(int(memory_usage * 0.8))
+
+
+def reset_gc():
+    """Devuelve el recolector a su configuración por defecto entre mediciones."""
+    gc.enable()
+    gc.unfreeze()
+    gc.set_threshold(700, 10, 10)
+    gc.collect()
+
+
+def measure(name, policy, forms, live_objects):
+    """Ejecuta `forms` formas mientras crecen los datos globales de larga vida y muestra latencias y pausas."""
+    reset_gc()
+    interpreter = SimpylInterpreter(engine="closure", memory=MemoryManager(policy=policy or "python"))
+    data = interpreter.variables["datos"] = []  # Resultados que el script acumula en una variable global
+    per_form = live_objects // forms
+    statements = interpreter.parser.parse(FORM)
+    legacy = LegacyMemoryManager() if policy is None else None
+    pauses = []
+    started = {}
+
+    def on_gc(phase, info):
+        if phase == "start":
+            started["time"] = time.perf_counter()
+        else:
+            pauses.append(time.perf_counter() - started["time"])
+
+    interpreter.memory_manager.start()
+    gc.callbacks.append(on_gc)
+    latencies = []
+    try:
+        for count in range(1, forms + 1):
+            start = time.perf_counter()
+            data.extend([[index, count] for index in range(per_form)])
+            interpreter.execute_statements(statements)
+            if legacy is not None:
+                legacy.monitor_memory(count)
+            else:
+                interpreter.safe_point()
+            latencies.append(time.perf_counter() - start)
+    finally:
+        interpreter.memory_manager.stop()
+        gc.callbacks.remove(on_gc)
+    latencies.sort()
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    print(f"{name:28} total {sum(latencies):7.2f} s   forma p99 {p99 * 1000:8.2f} ms   máx {latencies[-1] * 1000:8.2f} ms   "
+          f"{len(pauses):6} colecciones, pausa máx {max(pauses, default=0) * 1000:8.2f} ms, "
+          f"suma {sum(pauses) * 1000:8.1f} ms")
+
+
+def main(forms=300, live_objects=1_000_000):
+    print(f"{forms} formas; las variables globales crecen hasta {live_objects} listas vivas")
+    measure("anterior (psutil)", None, forms, live_objects)
+    measure("recolector de Python", "python", forms, live_objects)
+    measure("puntos seguros + freeze", "safe-points", forms, live_objects)
+    reset_gc()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 300)
@@ -0,0 +1,46 @@
+"""Compara la ejecución con y sin el optimizador del AST sobre un script generado con aritmética constante,
+guardas (if true ...), funciones auxiliares pequeñas y expresiones invariantes dentro de los bucles."""
+import sys  # Argumentos de la línea de órdenes
+import time  # Medición de tiempos
+
+import paths  # noqa: F401  Añade src a sys.path
+from simpyl_interpreter import SimpylInterpreter
+
+PROGRAM = """
+(define escala (x) (* x (/ 1000 (* 10 10))))
+(define limita (v lo hi) (if (< v lo) lo (if (> v hi) hi v)))
+(tasa = (/ (* 3 7) (+ 40 60)))
+(i = 0)
+(t = 0)
+(while (< i {n})
+  (if true (t = (+ t (limita (escala tasa) 0 (* 2 (* 60 60))))))
+  (if (> 1 2) (print "nunca"))
+  (t = (+ t (* tasa (+ 1 (* 2 3)))))
+  (i = (+ i 1)))
+t
+"""
+
+
+def measure(engine, optimize, code, repeat):
+    """Mejor tiempo de `repeat` ejecuciones completas: análisis, optimización, compilación y ejecución."""
+    best, result = None, None
+    for _ in range(repeat):
+        interpreter = SimpylInterpreter(engine=engine, optimize=optimize)
+        start = time.perf_counter()
+        result = interpreter.run_source(code)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main(n=200_000, repeat=3):
+    code = PROGRAM.format(n=n)
+    for engine in ("closure", "vm"):
+        plain, expected = measure(engine, False, code, repeat)
+        optimized, result = measure(engine, True, code, repeat)
+        assert result == expected, (result, expected)
+        print(f"{engine:8} sin optimizar: {plain:6.3f} s   optimizado: {optimized:6.3f} s   ({plain / optimized:4.2f}x)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000)
@@ -0,0 +1,73 @@
+"""Mide memoria máxima y tiempo hasta la primera declaración del parser sobre un programa generado."""
+import sys  # Argumentos de la línea de órdenes
+import time  # Medición de tiempos
+import tracemalloc  # Medición de memoria
+
+import paths  # noqa: F401  Añade src a sys.path
+from lexer import TokenArray, lexer
+from simpyl_parser import SimpylParser
+
+
+def generate_program(forms):
+    """Genera un programa con `forms` formas de nivel superior de varios tipos."""
+    lines = []
+    for index in range(forms):
+        if index % 4 == 0:
+            lines.append(f"(define f{index} (a b) (+ (* a {index}) b))")
+        elif index % 4 == 1:
+            lines.append(f"(x{index % 100} = (f{index - 1} {index} 2))")
+        elif index % 4 == 2:
+            lines.append(f"(if (> x{index % 100} 10) (print \"mayor\") (print \"menor\"))")
+        else:
+            lines.append(f"(while (< i {index}) (i = (+ i 1)))")
+    return "\n".join(lines)
+
+
+def eager_parse(code):
+    """Comportamiento anterior: todos los tokens en una lista antes de analizar."""
+    return SimpylParser(lexer).parse_tokens(list(lexer(code)))
+
+
+def peak_memory(function, *args):
+    """Devuelve la memoria máxima (MB) usada por una llamada."""
+    tracemalloc.start()
+    result = function(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    del result
+    return peak / (1024 * 1024)
+
+
+def elapsed(function, *args):
+    """Devuelve los segundos que tarda una llamada."""
+    start = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - start
+
+
+def first_statement_eager(code):
+    tokens = list(lexer(code))
+    parser = SimpylParser(lexer)
+    parser.start(tokens)
+    return parser.parse_expression()
+
+
+def first_statement_lazy(code):
+    return next(SimpylParser(lexer).parse_iter(code))
+
+
+def main(forms=100_000):
+    code = generate_program(forms)
+    print(f"Programa generado: {forms} formas, {len(code) / (1024 * 1024):.1f} MB de código")
+    print(f"Primera declaración (lista de tokens): {elapsed(first_statement_eager, code) * 1000:9.2f} ms")
+    print(f"Primera declaración (parser perezoso): {elapsed(first_statement_lazy, code) * 1000:9.2f} ms")
+    print(f"Análisis completo (lista de tokens):   {elapsed(eager_parse, code):9.2f} s")
+    print(f"Análisis completo (parser perezoso):   {elapsed(SimpylParser(lexer).parse, code):9.2f} s")
+    print(f"Memoria máxima (lista de tokens):      {peak_memory(eager_parse, code):9.1f} MB")
+    print(f"Memoria máxima (parser perezoso):      {peak_memory(SimpylParser(lexer).parse, code):9.1f} MB")
+    print(f"Tokens guardados como lista de tuplas: {peak_memory(lambda: list(lexer(code))):9.1f} MB")
+    print(f"Tokens guardados en TokenArray:        {peak_memory(TokenArray.from_source, code):9.1f} MB")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
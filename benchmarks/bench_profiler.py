@@ -0,0 +1,66 @@
+"""Mide el coste del perfilador: sin perfilador, con el perfilador desactivado y con el perfilador activo."""
+import gc  # Recolección entre mediciones
+import sys  # Argumentos de la línea de órdenes
+import time  # Medición de tiempos
+
+import paths  # noqa: F401  Añade src a sys.path
+from lexer import lexer
+from simpyl_compiler import SimpylCompiler
+from simpyl_parser import SimpylParser
+from simpyl_profiler import Profiler
+from simpyl_vm import SimpylVM
+
+PROGRAM = """
+(define fib (n) (if (< n 2) n (+ (fib (- n 1)) (fib (- n 2)))))
+(define cuenta (n acc) (if (== n 0) acc (cuenta (- n 1) (+ acc 1))))
+(resultado = (+ (fib {n}) (cuenta 100000 0)))
+"""
+
+
+def run(engine, statements, profiler):
+    """Compila y ejecuta el programa y devuelve los segundos de ejecución."""
+    variables = {}
+    gc.collect()
+    if engine == "closure":
+        forms = SimpylCompiler(variables, {}, profiler=profiler).compile_program(statements)
+        start = time.perf_counter()
+        for form in forms:
+            form(None)
+    else:
+        vm = SimpylVM(variables, profiler=profiler)
+        code = vm.compile(statements)
+        start = time.perf_counter()
+        vm.execute(code)
+    return time.perf_counter() - start
+
+
+def best_of(repeat, engine, statements, profilers):
+    """Mejor tiempo de cada configuración; las ejecuciones se alternan para repartir el ruido de la máquina."""
+    times = [[] for _ in profilers]
+    for _ in range(repeat):
+        for position, profiler in enumerate(profilers):
+            times[position].append(run(engine, statements, profiler))
+    return [min(samples) for samples in times]
+
+
+def same_bytecode(statements):
+    """Comprueba que el perfilador desactivado no cambia el bytecode de ninguna función."""
+    def listing(profiler):
+        vm = SimpylVM({}, profiler=profiler)
+        program = vm.compile(statements)
+        return [program.code.tobytes()] + [const.code.tobytes() for const in program.consts if hasattr(const, "code")]
+    return listing(None) == listing(Profiler(enabled=False))
+
+
+def main(n=22, repeat=7):
+    statements = SimpylParser(lexer).parse(PROGRAM.format(n=n))
+    print(f"fib({n}) + bucle en cola de 100000 iteraciones, mejor de {repeat}")
+    print(f"Bytecode idéntico con el perfilador desactivado: {'sí' if same_bytecode(statements) else 'no'}")
+    for engine in ("closure", "vm"):
+        baseline, disabled, enabled = best_of(repeat, engine, statements, [None, Profiler(enabled=False), Profiler()])
+        print(f"{engine:8} sin perfilador: {baseline:7.3f} s   desactivado: {disabled:7.3f} s "
+              f"({(disabled / baseline - 1) * 100:+5.1f}%)   activo: {enabled:7.3f} s ({(enabled / baseline - 1) * 100:+5.1f}%)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 22)
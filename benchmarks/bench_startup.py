@@ -0,0 +1,74 @@
+"""Mide el arranque de `python src/simpyl.py script` y la restauración de una instantánea frente a ejecutar el preludio."""
+import os  # Rutas de los scripts generados
+import statistics  # Mediana de las mediciones
+import subprocess  # Un proceso nuevo por arranque
+import sys  # Argumentos de la línea de órdenes y ejecutable de Python
+import tempfile  # Directorio de los archivos generados
+import time  # Medición de tiempos
+
+from paths import SRC  # Importarlo añade src a sys.path
+from simpyl_interpreter import SimpylInterpreter
+
+SCRIPT = "(x = 2)\n(print (* x 21))\n"
+REGEX_SCRIPT = "(define x 2)\n(print (x * 21))\n"  # El mismo programa con la sintaxis del motor regex, el de por defecto
+
+
+def generate_prelude(functions):
+    """Preludio con `functions` definiciones de funciones y algunas variables."""
+    lines = [f"(define f{index} (a b) (if (> a b) (- a b) (+ (* a {index}) b)))" for index in range(functions)]
+    lines += [f"(c{index} = {index})" for index in range(functions // 10)]
+    return "\n".join(lines)
+
+
+def startup(command, directory, repeat):
+    """Mediana y mínimo en milisegundos de `repeat` arranques de `command`."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(command, cwd=directory, check=True, capture_output=True)
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times), min(times)
+
+
+def main(repeat=30, functions=500):
+    with tempfile.TemporaryDirectory() as directory:
+        script = os.path.join(directory, "hola.spy")
+        with open(script, "w", encoding="utf-8") as file:
+            file.write(SCRIPT)
+        regex_script = os.path.join(directory, "hola_regex.spy")
+        with open(regex_script, "w", encoding="utf-8") as file:
+            file.write(REGEX_SCRIPT)
+        launcher = os.path.join(SRC, "simpyl.py")
+        commands = [
+            ("python -c pass", [sys.executable, "-c", "pass"]),
+            ("simpyl.py (motor regex, por defecto)", [sys.executable, launcher, regex_script]),
+            ("simpyl_interpreter.py --engine vm", [sys.executable, os.path.join(SRC, "simpyl_interpreter.py"), "--engine", "vm", script]),
+            ("simpyl.py --engine vm", [sys.executable, launcher, "--engine", "vm", script]),
+            ("simpyl.py --engine vm --no-cache", [sys.executable, launcher, "--engine", "vm", "--no-cache", script]),
+            ("simpyl.py --engine closure", [sys.executable, launcher, "--engine", "closure", script]),
+        ]
+        subprocess.run(commands[3][1], cwd=directory, check=True, capture_output=True)  # Crea la caché .spyc
+        print(f"Arranque, mediana (mínimo) de {repeat} ejecuciones:")
+        for name, command in commands:
+            median, best = startup(command, directory, repeat)
+            print(f"  {name:36} {median:7.1f} ms ({best:.1f} ms)")
+
+        prelude = generate_prelude(functions)
+        snapshot = os.path.join(directory, "preludio.spys")
+        for engine in ("closure", "vm"):
+            interpreter = SimpylInterpreter(engine=engine)
+            start = time.perf_counter()
+            interpreter.run_source(prelude)
+            run_time = time.perf_counter() - start
+            interpreter.save_snapshot(snapshot)
+            start = time.perf_counter()
+            restored = SimpylInterpreter(engine=engine)
+            restored.load_snapshot(snapshot)
+            restore_time = time.perf_counter() - start
+            assert restored.run_source("(f7 3 4)") == interpreter.run_source("(f7 3 4)")
+            print(f"Preludio de {functions} funciones ({engine}): ejecutar {run_time * 1000:6.1f} ms, "
+                  f"restaurar la instantánea {restore_time * 1000:6.1f} ms")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 30)
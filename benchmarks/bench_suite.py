@@ -0,0 +1,218 @@
+"""Batería de benchmarks del lexer, del parser y del intérprete con resultados en JSON y comparación de regresiones.
+
+    python benchmarks/bench_suite.py run --output base.json
+    python benchmarks/bench_suite.py run --output nuevo.json
+    python benchmarks/bench_suite.py compare base.json nuevo.json --threshold 0.10
+
+`compare` termina con código 1 si el rendimiento de alguna carga baja más del umbral o si alguna carga
+no puede compararse: falta en uno de los archivos o se midió con otro tamaño (--scale distinto).
+"""
+import argparse  # Línea de comandos
+import gc  # Recolección entre repeticiones
+import json  # Resultados legibles por máquina
+import platform  # Descripción de la máquina
+import sys  # Código de salida
+import time  # Medición de tiempos
+
+import paths  # noqa: F401  Añade src a sys.path
+from lexer import lexer
+from simpyl_interpreter import SimpylInterpreter
+from simpyl_parser import SimpylParser
+
+
+def generate_wide(forms):
+    """Programa con `forms` formas de nivel superior variadas: definiciones, asignaciones, condicionales y bucles."""
+    lines = []
+    for index in range(forms):
+        if index % 4 == 0:
+            lines.append(f"(define f{index} (a b) (+ (* a {index}) b))")
+        elif index % 4 == 1:
+            lines.append(f"(x{index % 100} = (f{index - 1} {index} 2))")
+        elif index % 4 == 2:
+            lines.append(f"(if (> x{index % 100} 10) (print \"mayor\") (print \"menor\"))")
+        else:
+            lines.append(f"(while (< i {index}) (i = (+ i 1)))")
+    return "\n".join(lines)
+
+
+def generate_deep(forms, depth):
+    """Programa con `forms` expresiones anidadas `depth` niveles."""
+    expression = "x"
+    for level in range(depth):
+        expression = f"(if (> x {level}) (+ {expression} 1) {level})" if level % 2 else f"(* {expression} 2)"
+    return "\n".join(f"(y{index} = {expression})" for index in range(forms))
+
+
+def generate_definitions(forms):
+    """Programa que alterna definiciones de funciones y llamadas a ellas con condicionales."""
+    lines = []
+    for index in range(forms // 2):
+        lines.append(f"(define f{index} (a b) (if (> a b) (- a b) (+ (* a {index}) b)))")
+        lines.append(f"(x = (f{index} {index} 2))")
+    return "\n".join(lines)
+
+
+def fib_calls(n):
+    """Llamadas que hace fib(n) con la definición recursiva."""
+    a, b = 1, 1
+    for _ in range(n):
+        a, b = b, a + b + 1
+    return a
+
+
+LOOP = "(i = 0) (t = 0) (while (< i {n}) (t = (+ t (* i 2))) (i = (+ i 1))) t"
+RECURSION = "(define fib (n) (if (< n 2) n (+ (fib (- n 1)) (fib (- n 2))))) (fib {n})"
+CONDITIONALS = ("(i = 0) (t = 0) (while (< i {n}) "
+                "(if (== (% i 3) 0) (t = (+ t 1)) (if (== (% i 3) 1) (t = (- t 1)) (t = (+ t 2)))) (i = (+ i 1))) t")
+
+
+def count_tokens(code):
+    return sum(1 for _ in lexer(code))
+
+
+def run_interpreter(engine):
+    """Ejecuta un programa completo en un intérprete nuevo: análisis, compilación y ejecución."""
+    def run(code):
+        result = SimpylInterpreter(engine=engine).run_source(code)
+        if isinstance(result, str) and result.startswith("Error"):
+            raise RuntimeError(result)
+        return result
+    return run
+
+
+def run_regex_commands(commands):
+    """Despacha comandos de una línea con el motor regex, el camino original del intérprete."""
+    interpreter = SimpylInterpreter(engine="regex")
+    for command in commands:
+        interpreter.execute_command(command)
+
+
+def prepare_tokens(scale):
+    code = generate_wide(2000 * scale)
+    return code, count_tokens(code)
+
+
+def prepare_commands(scale):
+    commands = []
+    for index in range(500 * scale):
+        commands.append(f"(define x{index % 50} {index})")
+        commands.append(f"(if (x{index % 50} > 5) (1) (0))")
+    return commands, len(commands)
+
+
+class Workload:
+    """Carga de trabajo: `prepare(escala)` genera la entrada y sus unidades; se mide `run(entrada)`."""
+
+    def __init__(self, name, unit, prepare, run):
+        self.name = name  # Nombre estable, clave de la comparación
+        self.unit = unit  # Qué se cuenta en el rendimiento (tokens, formas, iteraciones...)
+        self.prepare = prepare  # escala -> (entrada, unidades)
+        self.run = run  # entrada -> resultado
+
+
+def build_workloads():
+    """Cargas de trabajo de la batería; la escala multiplica el tamaño de las entradas generadas."""
+    workloads = [
+        Workload("lexer.tokens", "tokens", prepare_tokens, count_tokens),
+        Workload("parser.wide", "formas", lambda scale: (generate_wide(2000 * scale), 2000 * scale), SimpylParser(lexer).parse),
+        Workload("parser.deep", "formas", lambda scale: (generate_deep(100 * scale, 60), 100 * scale), SimpylParser(lexer).parse),
+        Workload("regex.commands", "comandos", prepare_commands, run_regex_commands),
+    ]
+    for engine in ("closure", "vm"):
+        run = run_interpreter(engine)
+        workloads += [
+            Workload(f"{engine}.loop", "iteraciones", lambda scale: (LOOP.format(n=50_000 * scale), 50_000 * scale), run),
+            Workload(f"{engine}.recursion", "llamadas", lambda scale: (RECURSION.format(n=18 + scale), fib_calls(18 + scale)), run),
+            Workload(f"{engine}.definitions", "formas", lambda scale: (generate_definitions(1000 * scale), 1000 * scale), run),
+            Workload(f"{engine}.conditionals", "iteraciones",
+                     lambda scale: (CONDITIONALS.format(n=30_000 * scale), 30_000 * scale), run),
+        ]
+    return workloads
+
+
+def measure(workload, scale, repeat):
+    """Mejor tiempo de `repeat` ejecuciones y rendimiento en unidades por segundo."""
+    data, units = workload.prepare(scale)
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        workload.run(data)
+        times.append(time.perf_counter() - start)
+    best = min(times)
+    return {"unit": workload.unit, "units": units, "seconds": best, "median": sorted(times)[len(times) // 2],
+            "throughput": units / best}
+
+
+def run_suite(args):
+    results = {}
+    for workload in build_workloads():
+        if args.filter and args.filter not in workload.name:
+            continue
+        result = results[workload.name] = measure(workload, args.scale, args.repeat)
+        print(f"{workload.name:24} {result['seconds']:9.4f} s  {result['throughput']:14.0f} {workload.unit}/s")
+    report = {
+        "meta": {"python": platform.python_version(), "implementation": platform.python_implementation(),
+                 "machine": platform.machine(), "system": platform.system(), "scale": args.scale,
+                 "repeat": args.repeat, "time": time.strftime("%Y-%m-%dT%H:%M:%S")},
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2, ensure_ascii=False)
+        print(f"Resultados guardados en '{args.output}'.")
+    return 0
+
+
+def compare(args):
+    """Compara dos archivos de resultados; devuelve 1 si alguna carga pierde más de `threshold` de rendimiento,
+    falta en uno de los archivos o se midió con un tamaño distinto, porque entonces no puede compararse."""
+    with open(args.base, encoding="utf-8") as file:
+        base = json.load(file)["results"]
+    with open(args.new, encoding="utf-8") as file:
+        new = json.load(file)["results"]
+    regressions = []
+    incomparable = []  # Cargas que faltan en un archivo o tienen otro tamaño
+    for name in sorted(base.keys() | new.keys()):
+        if name not in base or name not in new:
+            incomparable.append(name)
+            print(f"{name:24} {'sólo en ' + (args.new if name in new else args.base)}  NO COMPARABLE")
+            continue
+        if base[name]["units"] != new[name]["units"]:
+            incomparable.append(name)
+            print(f"{name:24} tamaño distinto ({base[name]['units']} y {new[name]['units']} {base[name]['unit']})  NO COMPARABLE")
+            continue
+        ratio = new[name]["throughput"] / base[name]["throughput"]
+        regressed = ratio < 1 - args.threshold
+        if regressed:
+            regressions.append(name)
+        print(f"{name:24} {base[name]['throughput']:14.0f} -> {new[name]['throughput']:14.0f} "
+              f"{base[name]['unit']}/s  ({(ratio - 1) * 100:+6.1f}%){'  REGRESIÓN' if regressed else ''}")
+    if incomparable:
+        print(f"{len(incomparable)} cargas sin comparar (falta una medición o cambió --scale): {', '.join(incomparable)}")
+    if regressions:
+        print(f"{len(regressions)} regresiones de más del {args.threshold * 100:.0f}%: {', '.join(regressions)}")
+    if incomparable or regressions:
+        return 1
+    print(f"Sin regresiones de más del {args.threshold * 100:.0f}%.")
+    return 0
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmarks del lexer, el parser y el intérprete de Simpyl")
+    commands = arg_parser.add_subparsers(dest="command", required=True)
+    run_parser = commands.add_parser("run", help="ejecuta la batería")
+    run_parser.add_argument("--scale", type=int, default=1, help="multiplica el tamaño de las entradas generadas")
+    run_parser.add_argument("--repeat", type=int, default=5, help="repeticiones de cada carga; se guarda la mejor")
+    run_parser.add_argument("--filter", help="sólo las cargas cuyo nombre contiene este texto")
+    run_parser.add_argument("--output", help="archivo JSON donde guardar los resultados")
+    compare_parser = commands.add_parser("compare", help="compara dos archivos de resultados")
+    compare_parser.add_argument("base", help="resultados de referencia")
+    compare_parser.add_argument("new", help="resultados nuevos")
+    compare_parser.add_argument("--threshold", type=float, default=0.10, help="pérdida de rendimiento tolerada (0.10 = 10%%)")
+    args = arg_parser.parse_args()
+    return run_suite(args) if args.command == "run" else compare(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,54 @@
+"""Compara el recorrido elemento a elemento con las operaciones de vectores sobre una serie numérica."""
+import sys  # Argumentos de la línea de órdenes
+import time  # Medición de tiempos
+
+import paths  # noqa: F401  Añade src a sys.path
+import simpyl_vector
+from lexer import lexer
+from simpyl_compiler import SimpylCompiler
+from simpyl_parser import SimpylParser
+from simpyl_vm import SimpylVM
+
+# Suma de cuadrados de los elementos pares, con un bucle y con vectores
+LOOP_PROGRAM = """
+(i = 0) (total = 0)
+(while (< i n)
+  (if (== (% i 2) 0) (total = (+ total (* i i))))
+  (i = (+ i 1)))
+"""
+VECTOR_PROGRAM = """
+(define cuadrado (x) (* x x))
+(define par (x) (== (% x 2) 0))
+(total = (sum (map cuadrado (filter par datos))))
+"""
+
+
+def run(engine, source, variables):
+    """Ejecuta un programa con el motor indicado y devuelve los segundos que tarda."""
+    statements = SimpylParser(lexer).parse(source)
+    start = time.perf_counter()
+    if engine == "closure":
+        for form in SimpylCompiler(variables, {}).compile_program(statements):
+            form(None)
+    else:
+        vm = SimpylVM(variables)
+        vm.execute(vm.compile(statements))
+    return time.perf_counter() - start
+
+
+def main(size=1_000_000):
+    backend = "NumPy" if simpyl_vector.load_numpy() is not None else "Python puro"
+    print(f"Serie de {size} elementos, vectores con {backend}")
+    expected = None
+    for engine in ("closure", "vm"):
+        variables = {"n": size}
+        loop_time = run(engine, LOOP_PROGRAM, variables)
+        expected = variables["total"]
+        variables = {"datos": simpyl_vector.vector(range(size))}
+        vector_time = run(engine, VECTOR_PROGRAM, variables)
+        assert variables["total"] == expected, (variables["total"], expected)
+        print(f"{engine:8} bucle: {loop_time:8.3f} s   vectores: {vector_time:8.3f} s   ({loop_time / vector_time:.0f}x)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,9 @@
+"""Rutas del proyecto para los benchmarks: al importarlo, los módulos de src quedan accesibles."""
+import os  # Rutas del proyecto
+import sys  # Para acceder a los módulos de src
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))  # Raíz del repositorio
+SRC = os.path.join(ROOT, "src")  # Código del intérprete
+
+if SRC not in sys.path:
+    sys.path.insert(0, SRC)
@@ -1,5 +1,5 @@
 __version__ = "0.1.0"
 __author__ = "T4NG4N4"
 
-from .lexer import Lexer
+from .lexer import lexer
 from .simpyl_interpreter import SimpylInterpreter  # O `interpreter.py` si lo renombraste
@@ -0,0 +1,11 @@
+"""Punto de entrada de la línea de comandos: python src/simpyl.py [opciones] script.spy
+
+Python vuelve a compilar en cada arranque el archivo que se ejecuta como script, porque no usa
+__pycache__ para él; este lanzador es mínimo e importa simpyl_interpreter ya compilado.
+"""
+import sys
+
+from simpyl_interpreter import main
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,285 @@
+import sys  # Internado de nombres repetidos
+
+try:
+    from .lexer import lexer  # Importación dentro del paquete
+    from .simpyl_parser import SimpylParser
+except ImportError:
+    from lexer import lexer  # Importación al ejecutar el archivo directamente
+    from simpyl_parser import SimpylParser
+
+
+class Node:
+    """Nodo compacto del AST: atributos en __slots__ y tipo como entero (`kind`).
+
+    Cada subclase declara en `fields` sus atributos en el orden de las claves del diccionario que
+    genera SimpylParser, en `keys` esas claves (sólo cambian en If, porque "else" es una palabra
+    reservada de Python) y en `children` los atributos que contienen nodos o listas de nodos.
+    `line` es None en los nodos que no empiezan con un paréntesis.
+    """
+
+    __slots__ = ("line",)
+    type = None  # Valor de "type" en el diccionario
+    kind = -1  # Índice en NODE_CLASSES, asignado al final del módulo
+    fields = ()
+    keys = ()
+    children = ()
+
+    def __init__(self, *values, line=None):
+        for name, value in zip(self.fields, values):
+            setattr(self, name, value)
+        self.line = line
+
+    def to_dict(self):
+        return to_dict(self)
+
+    def __eq__(self, other):
+        """Igualdad estructural, la misma que tienen los diccionarios equivalentes."""
+        return (type(self) is type(other) and self.line == other.line
+                and all(getattr(self, name) == getattr(other, name) for name in self.fields))
+
+    __hash__ = None  # Los nodos son mutables, como los diccionarios
+
+    def __repr__(self):
+        values = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.fields)
+        line = f", line={self.line}" if self.line is not None else ""
+        return f"{type(self).__name__}({values}{line})"
+
+
+class Number(Node):
+    __slots__ = ("value",)  # Texto del número tal como se escribió
+    type, fields = "number", ("value",)
+
+
+class String(Node):
+    __slots__ = ("value",)  # Texto de la cadena con sus comillas
+    type, fields = "string", ("value",)
+
+
+class Boolean(Node):
+    __slots__ = ("value",)  # "true" o "false"
+    type, fields = "boolean", ("value",)
+
+
+class Null(Node):
+    __slots__ = ()
+    type = "null"
+
+
+class Identifier(Node):
+    __slots__ = ("value",)  # Nombre de la variable, o el operador usado como valor
+    type, fields = "identifier", ("value",)
+
+
+class Vector(Node):
+    __slots__ = ("items",)
+    type, fields, children = "vector", ("items",), ("items",)
+
+
+class Operation(Node):
+    __slots__ = ("operator", "left", "right")
+    type, fields, children = "operation", ("operator", "left", "right"), ("left", "right")
+
+
+class Call(Node):
+    __slots__ = ("name", "args")
+    type, fields, children = "call", ("name", "args"), ("args",)
+
+
+class Assignment(Node):
+    __slots__ = ("name", "value")
+    type, fields, children = "assignment", ("name", "value"), ("value",)
+
+
+class FunctionDefinition(Node):
+    __slots__ = ("name", "params", "body", "memo")  # `memo` sólo aparece en el diccionario si es True
+    type, fields, children = "function_definition", ("name", "params", "body", "memo"), ("body",)
+
+    def __init__(self, name, params, body, memo=False, line=None):
+        super().__init__(name, params, body, memo, line=line)
+
+
+class Block(Node):
+    __slots__ = ("body",)
+    type, fields, children = "block", ("body",), ("body",)
+
+
+class If(Node):
+    __slots__ = ("condition", "then", "orelse")  # `orelse` es None si no hay rama else
+    type, fields, children = "if", ("condition", "then", "orelse"), ("condition", "then", "orelse")
+    keys = ("condition", "then", "else")
+
+
+class While(Node):
+    __slots__ = ("condition", "body")
+    type, fields, children = "while", ("condition", "body"), ("condition", "body")
+
+
+class Print(Node):
+    __slots__ = ("args",)
+    type, fields, children = "print", ("args",), ("args",)
+
+
+# Tipos de nodo internados como enteros pequeños, igual que TOKEN_KINDS y TOKEN_IDS en el lexer
+NODE_CLASSES = [Number, String, Boolean, Null, Identifier, Vector, Operation, Call, Assignment,
+                FunctionDefinition, Block, If, While, Print]
+for index, node_class in enumerate(NODE_CLASSES):
+    node_class.kind = index
+    node_class.keys = node_class.keys or node_class.fields
+del index, node_class
+NODE_KINDS = [node_class.type for node_class in NODE_CLASSES]  # Identificador -> "type"
+NODE_IDS = {name: index for index, name in enumerate(NODE_KINDS)}  # "type" -> identificador
+INTERNED_FIELDS = {"value", "name", "operator"}  # Textos que se repiten mucho en un programa (salvo en String)
+
+
+def from_dict(data):
+    """Convierte un nodo del AST en diccionarios (o una lista de ellos) en nodos compactos.
+
+    Los nombres, operadores y números se internan: las apariciones repetidas comparten el mismo texto.
+    """
+    if isinstance(data, list):
+        return [from_dict(item) for item in data]
+    node_class = NODE_CLASSES[NODE_IDS[data["type"]]]
+    node = object.__new__(node_class)
+    for name, key in zip(node_class.fields, node_class.keys):
+        value = data.get(key)
+        if isinstance(value, dict):
+            value = from_dict(value)
+        elif isinstance(value, list):
+            value = [from_dict(item) if isinstance(item, dict) else sys.intern(item) for item in value]
+        elif isinstance(value, str) and name in INTERNED_FIELDS and node_class is not String:
+            value = sys.intern(value)
+        elif name == "memo":
+            value = bool(value)
+        setattr(node, name, value)
+    node.line = data.get("line")
+    return node
+
+
+def to_dict(node):
+    """Convierte nodos compactos (o una lista de ellos) en el diccionario equivalente de SimpylParser."""
+    if isinstance(node, list):
+        return [to_dict(item) for item in node]
+    data = {"type": node.type}
+    for name, key in zip(node.fields, node.keys):
+        value = getattr(node, name)
+        if isinstance(value, Node):
+            value = to_dict(value)
+        elif isinstance(value, list):
+            value = [to_dict(item) if isinstance(item, Node) else item for item in value]
+        elif name == "memo":
+            if not value:
+                continue
+        data[key] = value
+    if node.line is not None:
+        data["line"] = node.line
+    return data
+
+
+def parse_compact(code, parser=None):
+    """Analiza el código y devuelve las declaraciones como nodos compactos.
+
+    Cada declaración se convierte en cuanto el parser la termina, así que los diccionarios de una
+    forma se liberan antes de analizar la siguiente.
+    """
+    parser = parser or SimpylParser(lexer)
+    return [from_dict(statement) for statement in parser.parse_iter(code)]
+
+
+def iter_children(node):
+    """Nodos hijos de un nodo, en el orden del código."""
+    for name in node.children:
+        value = getattr(node, name)
+        if isinstance(value, list):
+            yield from value
+        elif value is not None:
+            yield value
+
+
+def walk(node):
+    """Recorre un nodo (o una lista de nodos) y todos sus descendientes en preorden, sin recursión."""
+    pending = list(reversed(node)) if isinstance(node, list) else [node]
+    while pending:
+        current = pending.pop()
+        yield current
+        for name in reversed(current.children):
+            value = getattr(current, name)
+            if isinstance(value, list):
+                pending.extend(reversed(value))
+            elif value is not None:
+                pending.append(value)
+
+
+def count_nodes(node):
+    return sum(1 for _ in walk(node))
+
+
+class NodeVisitor:
+    """Recorre el AST compacto llamando a `visit_<tipo>` (por ejemplo `visit_operation`) en cada nodo.
+
+    El método de cada tipo se busca una sola vez al crear el visitante y se elige por el entero `kind`,
+    sin comparar textos. Los tipos sin método propio usan `generic_visit`, que visita los hijos.
+    """
+
+    def __init__(self):
+        self.dispatch = [getattr(self, f"visit_{name}", self.generic_visit) for name in NODE_KINDS]
+
+    def visit(self, node):
+        if isinstance(node, list):
+            return [self.dispatch[item.kind](item) for item in node]
+        return self.dispatch[node.kind](node)
+
+    def generic_visit(self, node):
+        dispatch = self.dispatch
+        for child in iter_children(node):
+            dispatch[child.kind](child)
+
+
+def test_ast():
+    """Comprueba la conversión de ida y vuelta con los diccionarios del parser, el internado y los recorridos."""
+    parser = SimpylParser(lexer)
+    code = """
+    -5
+    (define-memo f (a b) (if (> a -1) (+ a b) (- a 2.5)))
+    (define g (n) (while (< n 10) (n = (+ n 1))) (print n "a ( b"))
+    (v = [1, -2 3])
+    (if (== x null) (print true false))
+    (total = (reduce + v))
+    (f 1 (g 2))
+    """
+    statements = parser.parse(code)
+    nodes = parse_compact(code)
+    assert nodes == from_dict(statements) and to_dict(nodes) == statements, to_dict(nodes)
+    assert nodes[0] == Number("-5") and nodes[0].line is None  # Un '-' suelto seguido de un número es un número negativo
+    assert nodes[1].memo and not nodes[2].memo and "memo" not in to_dict(nodes[2])
+    assert nodes[4].orelse is None and to_dict(nodes[4])["else"] is None
+
+    names = [node.value for node in walk(nodes) if type(node) is Identifier and node.value == "a"]
+    assert len(names) == 3 and all(name is nodes[1].params[0] for name in names)  # Nombres internados
+
+    def count_dicts(data):
+        if isinstance(data, list):
+            return sum(count_dicts(item) for item in data)
+        if not isinstance(data, dict):
+            return 0
+        return 1 + sum(count_dicts(value) for key, value in data.items() if key != "type")
+
+    assert count_nodes(nodes) == count_dicts(statements)
+    assert [node.kind for node in walk(nodes[3])] == [Assignment.kind, Vector.kind, Number.kind, Number.kind, Number.kind]
+
+    class OperationCounter(NodeVisitor):
+        def __init__(self):
+            super().__init__()
+            self.operators = []
+
+        def visit_operation(self, node):
+            self.operators.append(node.operator)
+            self.generic_visit(node)
+
+    counter = OperationCounter()
+    counter.visit(nodes)
+    assert counter.operators == [">", "+", "-", "<", "+", "=="], counter.operators
+    print("OK: AST compacto equivalente a los diccionarios del parser, internado y recorridos")
+
+
+if __name__ == "__main__":
+    test_ast()
@@ -0,0 +1,305 @@
+import collections  # Cola de los lotes en curso
+import contextlib  # Redirección de la salida de cada script
+import io  # Búfer donde se recoge la salida
+import os  # Número de procesadores
+import signal  # Temporizador de los scripts
+import time  # Duración de cada script
+import traceback  # Para capturar y mostrar trazas de errores
+from concurrent.futures import ProcessPoolExecutor  # Grupo de procesos de trabajo
+from concurrent.futures.process import BrokenProcessPool  # Un proceso de trabajo terminó de forma anormal
+
+try:
+    from .simpyl_interpreter import (  # Importación dentro del paquete
+        MemoryManager, SimpylInterpreter, SimpylMemoryError, check_max_depth, logger,
+    )
+    from .simpyl_cache import ScriptCache
+    from .simpyl_memo import DEFAULT_MAX_BYTES, DEFAULT_MAX_ENTRIES
+except ImportError:
+    from simpyl_interpreter import (  # Importación al ejecutar el archivo directamente
+        MemoryManager, SimpylInterpreter, SimpylMemoryError, check_max_depth, logger,
+    )
+    from simpyl_cache import ScriptCache
+    from simpyl_memo import DEFAULT_MAX_BYTES, DEFAULT_MAX_ENTRIES
+
+MAX_CHUNK_SIZE = 32  # Scripts que se envían juntos a un proceso, para repartir el coste de la comunicación
+WINDOW = 4  # Lotes en curso por proceso: acota la memoria de los resultados pendientes
+
+
+class ScriptTimeout(BaseException):
+    """El script superó su tiempo máximo.
+
+    Hereda de BaseException, como KeyboardInterrupt, para que no la capturen los manejadores de
+    errores del intérprete y el script se detenga de inmediato.
+    """
+
+
+class BatchResult:
+    """Resultado de un script del lote: salida, valor de la última forma, error y duración."""
+
+    __slots__ = ("path", "status", "stdout", "result", "error", "elapsed")
+
+    def __init__(self, path, status, stdout="", result=None, error=None, elapsed=0.0):
+        self.path = path  # Ruta del script
+        self.status = status  # "ok", "error", "timeout" o "crash"
+        self.stdout = stdout  # Todo lo que el script escribió en la salida estándar
+        self.result = result  # Valor de la última forma como texto (None si no tiene)
+        self.error = error  # Descripción del error, si lo hubo
+        self.elapsed = elapsed  # Segundos de ejecución
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+# Estado de cada proceso de trabajo: se crea una vez y se reutiliza para todos sus scripts
+worker_interpreter = None
+worker_timeout = None
+
+
+def on_timeout(signum, frame):
+    raise ScriptTimeout()
+
+
+def init_worker(settings, timeout):
+    """Crea el intérprete del proceso de trabajo a partir de la configuración del lote."""
+    global worker_interpreter, worker_timeout
+    cache = ScriptCache(cache_dir=settings["cache_dir"]) if settings["use_cache"] else None
+    memory = MemoryManager(limit=settings["memory_limit"], policy=settings["gc_policy"])
+    worker_interpreter = SimpylInterpreter(engine=settings["engine"], cache=cache,
+                                           max_depth=settings["max_depth"], memory=memory, optimize=settings["optimize"])
+    worker_interpreter.memo_manager.max_entries = settings["memo_entries"]
+    worker_interpreter.memo_manager.max_bytes = settings["memo_bytes"]
+    worker_interpreter.memory_manager.start()
+    worker_timeout = timeout if hasattr(signal, "setitimer") else None  # Sin SIGALRM no hay límite de tiempo
+    if worker_timeout:
+        signal.signal(signal.SIGALRM, on_timeout)
+
+
+def execute_script(interpreter, path, output):
+    """Ejecuta un script escribiendo su salida en `output` y devuelve (estado, resultado, error)."""
+    try:
+        with contextlib.redirect_stdout(output):
+            with open(path, "r", encoding="utf-8") as file:
+                code = file.read()
+            value = interpreter.execute_source(code, path)  # Los errores llegan aquí, también con el motor regex
+            interpreter.safe_point()
+            return "ok", str(value) if value is not None else None, None
+    except SimpylMemoryError as e:
+        return "error", None, f"Error de memoria: {e}"
+    except RecursionError as e:
+        return "error", None, interpreter.describe_recursion_error(e)
+    except Exception as e:
+        logger.error(f"Error al ejecutar el script del lote: {path}\n{e}", exc_info=True)
+        return "error", None, traceback.format_exc()
+
+
+def run_script(interpreter, path, timeout=None):
+    """Ejecuta un script con un intérprete ya creado y devuelve su BatchResult.
+
+    El temporizador puede saltar en cualquier punto, también mientras se atiende un error del
+    script: el `finally` lo desactiva antes que nada y el `except` exterior recoge el
+    ScriptTimeout venga de donde venga, incluido el propio `finally`.
+    """
+    interpreter.reset()
+    output = io.StringIO()
+    start = time.perf_counter()
+    try:
+        try:
+            if timeout:
+                signal.setitimer(signal.ITIMER_REAL, timeout)
+            status, result, error = execute_script(interpreter, path, output)
+        finally:
+            if timeout:
+                signal.setitimer(signal.ITIMER_REAL, 0)
+    except ScriptTimeout:
+        status, result, error = "timeout", None, f"Tiempo agotado tras {timeout} s"
+    return BatchResult(path, status, output.getvalue(), result, error, time.perf_counter() - start)
+
+
+def run_chunk(paths):
+    """Tarea de un proceso de trabajo: ejecuta varios scripts seguidos con el mismo intérprete.
+
+    Un ScriptTimeout que escape de run_script no debe llegar al proceso de trabajo, que moriría
+    y arrastraría al resto del lote: se registra como tiempo agotado de ese script.
+    """
+    results = []
+    for path in paths:
+        try:
+            results.append(run_script(worker_interpreter, path, worker_timeout))
+        except ScriptTimeout:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            results.append(BatchResult(path, "timeout", error=f"Tiempo agotado tras {worker_timeout} s"))
+    return results
+
+
+def read_manifest(path):
+    """Rutas de un manifiesto: una por línea; se ignoran las líneas vacías y las que empiezan por '#'.
+
+    Las rutas relativas se resuelven desde el directorio del manifiesto.
+    """
+    base = os.path.dirname(os.path.abspath(path))
+    paths = []
+    with open(path, "r", encoding="utf-8") as file:
+        for line in file:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                paths.append(os.path.join(base, line))
+    return paths
+
+
+class BatchRunner:
+    """Ejecuta muchos scripts de Simpyl en un grupo de procesos de trabajo que se mantienen calientes.
+
+    Cada proceso importa el intérprete y crea un SimpylInterpreter una sola vez; entre un script y
+    el siguiente sólo se restablece su estado con `reset`. Los scripts se envían en lotes de hasta
+    MAX_CHUNK_SIZE y los resultados se devuelven en el orden de entrada. Con `recycle_after`, el
+    grupo se sustituye por uno nuevo cuando sus procesos han recibido de media ese número de
+    scripts, lo que acota la memoria que puedan acumular; el grupo anterior termina lo que ya
+    tenía asignado. (El max_tasks_per_child de ProcessPoolExecutor se bloquea en Python 3.11
+    cuando hay muchas tareas en cola.) Si un proceso muere, los scripts de su lote se repiten de uno en uno para
+    identificar el culpable, que se marca como "crash".
+    """
+
+    def __init__(self, jobs=None, timeout=None, recycle_after=None, chunk_size=None, engine="vm",
+                 max_depth=None, memory_limit=None, gc_policy="safe-points", cache_dir=None, use_cache=True,
+                 memo_entries=DEFAULT_MAX_ENTRIES, memo_bytes=DEFAULT_MAX_BYTES, optimize=False):
+        check_max_depth(engine, max_depth)  # Antes de crear los procesos, que fallarían todos al arrancar
+        self.jobs = jobs or os.cpu_count() or 1  # Procesos de trabajo
+        self.timeout = timeout  # Segundos máximos por script (None: sin límite)
+        self.recycle_after = recycle_after  # Scripts por proceso antes de sustituirlo (None: nunca)
+        self.chunk_size = chunk_size  # Scripts por tarea (None: se calcula según el tamaño del lote)
+        self.settings = {
+            "engine": engine,
+            "max_depth": max_depth,
+            "memory_limit": memory_limit,
+            "gc_policy": gc_policy,
+            "cache_dir": cache_dir,
+            "use_cache": use_cache,
+            "memo_entries": memo_entries,
+            "memo_bytes": memo_bytes,
+            "optimize": optimize,
+        }
+        self.executor = None  # Grupo de procesos actual
+        self.retired = []  # Grupos sustituidos que aún terminan sus lotes
+        self.assigned = 0  # Scripts enviados al grupo actual
+
+    def start(self):
+        """Arranca un grupo de procesos nuevo."""
+        self.executor = ProcessPoolExecutor(self.jobs, initializer=init_worker, initargs=(self.settings, self.timeout))
+        self.assigned = 0
+
+    def retire(self):
+        """Sustituye el grupo de procesos; el anterior termina los lotes que ya tenía y se cierra solo."""
+        self.executor.shutdown(wait=False)
+        self.retired.append(self.executor)
+        self.start()
+
+    def restart(self):
+        """Sustituye el grupo de procesos después de que uno de ellos muera."""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.start()
+
+    def close(self):
+        for executor in self.retired + [self.executor]:
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+        self.retired = []
+        self.executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def submit(self, chunk):
+        """Envía un lote al grupo actual, rotándolo antes si sus procesos ya ejecutaron `recycle_after` scripts."""
+        if self.recycle_after and self.assigned >= self.recycle_after * self.jobs:
+            self.retire()
+        self.assigned += len(chunk)
+        return chunk, self.executor, self.executor.submit(run_chunk, chunk)
+
+    def run(self, paths):
+        """Genera el BatchResult de cada script en el mismo orden que `paths`."""
+        paths = list(paths)
+        chunk_size = self.chunk_size or max(1, min(MAX_CHUNK_SIZE, len(paths) // (self.jobs * WINDOW)))
+        if self.recycle_after:
+            chunk_size = min(chunk_size, self.recycle_after)
+        chunks = [paths[index:index + chunk_size] for index in range(0, len(paths), chunk_size)]
+        self.start()
+        pending = collections.deque()
+        submitted = 0
+        try:
+            while pending or submitted < len(chunks):
+                while submitted < len(chunks) and len(pending) < self.jobs * WINDOW:
+                    pending.append(self.submit(chunks[submitted]))
+                    submitted += 1
+                chunk, executor, future = pending.popleft()
+                try:
+                    results = future.result()
+                except BrokenProcessPool:
+                    results = self.isolate(chunk)
+                    # Los demás lotes del grupo roto se pierden con él y se vuelven a enviar
+                    pending = collections.deque(self.submit(entry[0]) if entry[1] is executor else entry
+                                                for entry in pending)
+                yield from results
+        finally:
+            self.close()
+
+    def isolate(self, chunk):
+        """Repite uno a uno los scripts de un lote cuyo proceso murió; el grupo se sustituye tras cada fallo."""
+        results = []
+        self.restart()
+        for path in chunk:
+            try:
+                results.extend(self.executor.submit(run_chunk, [path]).result())
+            except BrokenProcessPool:
+                results.append(BatchResult(path, "crash", error="El proceso de trabajo terminó de forma anormal"))
+                self.restart()
+        return results
+
+
+def test_batch():
+    """Comprueba los estados ok, error y timeout de un lote y que el temporizador no escapa de run_script.
+
+    El último caso hace que el temporizador salte mientras se registra el error del script, fuera
+    del cuerpo protegido: antes el ScriptTimeout salía de run_script y mataba al proceso.
+    """
+    import tempfile  # Directorio de los scripts de prueba
+
+    scripts = {
+        "bien.spy": "(x = 6)\n(print (* x 7))\n(* x 7)\n",
+        "error.spy": "(print 1)\n(/ 1 0)\n",
+        "infinito.spy": "(i = 0)\n(while (== 0 0) (i = (+ i 1)))\n",
+        "despues.spy": "(print \"sigue\")\n",
+    }
+    with tempfile.TemporaryDirectory() as directory:
+        paths = []
+        for name, code in scripts.items():
+            paths.append(os.path.join(directory, name))
+            with open(paths[-1], "w", encoding="utf-8") as file:
+                file.write(code)
+        for engine in ("closure", "vm"):
+            with BatchRunner(jobs=1, timeout=0.5, engine=engine, use_cache=False) as runner:
+                results = {os.path.basename(result.path): result for result in runner.run(paths)}
+            assert results["bien.spy"].status == "ok" and results["bien.spy"].stdout == "42\n", results["bien.spy"].to_dict()
+            assert results["bien.spy"].result == "42"
+            assert results["error.spy"].status == "error" and results["error.spy"].stdout == "1\n"
+            assert results["infinito.spy"].status == "timeout", results["infinito.spy"].to_dict()
+            # El mismo proceso sigue vivo y ejecuta el script siguiente
+            assert results["despues.spy"].status == "ok" and results["despues.spy"].stdout == "sigue\n"
+
+        if hasattr(signal, "setitimer"):
+            interpreter = SimpylInterpreter(engine="vm")
+            previous = signal.signal(signal.SIGALRM, on_timeout)
+            logger.error = lambda *args, **kwargs: time.sleep(1)  # El error tarda más en registrarse que el límite
+            try:
+                result = run_script(interpreter, paths[1], timeout=0.1)
+            finally:
+                del logger.error
+                signal.signal(signal.SIGALRM, previous)
+            assert result.status == "timeout", result.to_dict()
+    print("OK: estados ok, error y timeout del lote y temporizador que salta al atender un error")
+
+
+if __name__ == "__main__":
+    test_batch()
@@ -0,0 +1,227 @@
+import hashlib  # Huella del contenido de los scripts
+import marshal  # Serialización rápida del AST (listas, diccionarios y cadenas)
+import os  # Rutas y reemplazo atómico de archivos
+import re  # Para leer la versión del paquete cuando se ejecuta como script
+
+try:
+    from .lexer import lexer, token_specification  # Importación dentro del paquete
+    from .simpyl_parser import SimpylParser
+except ImportError:
+    from lexer import lexer, token_specification  # Importación al ejecutar el archivo directamente
+    from simpyl_parser import SimpylParser
+
+CACHE_MAGIC = b"SPYC\x02"  # Identifica el formato de los archivos .spyc (y del AST que contienen)
+CACHE_DIRNAME = "__spycache__"  # Directorio de caché junto al script
+CACHE_SUFFIX = ".spyc"
+
+_interpreter_version = None  # Versión del intérprete, leída una sola vez
+
+
+def interpreter_version():
+    """Devuelve la versión del paquete, también cuando los módulos se ejecutan como scripts."""
+    global _interpreter_version
+    if _interpreter_version is None:
+        try:
+            from . import __version__
+            _interpreter_version = __version__
+        except ImportError:
+            init_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "__init__.py")
+            with open(init_path, "r", encoding="utf-8") as init_file:
+                _interpreter_version = re.search(r'__version__ = "(.+?)"', init_file.read()).group(1)
+    return _interpreter_version
+
+
+def cache_key(source):
+    """Huella del script: contenido, versión del intérprete y tabla de tokens del lexer."""
+    digest = hashlib.sha256()
+    digest.update(CACHE_MAGIC)
+    digest.update(interpreter_version().encode("utf-8"))
+    digest.update(repr(token_specification).encode("utf-8"))
+    digest.update(source.encode("utf-8"))
+    return digest.digest()
+
+
+def script_cache_path(path):
+    """Ruta de la caché de un script dentro de `__spycache__`, junto al propio script."""
+    directory, filename = os.path.split(os.path.abspath(path))
+    return os.path.join(directory, CACHE_DIRNAME, filename + CACHE_SUFFIX)
+
+
+class ScriptCache:
+    """Caché persistente del AST de los scripts Simpyl en archivos .spyc.
+
+    Sin `cache_dir`, cada script guarda su caché en `__spycache__/<nombre>.spyc` junto a él.
+    Con `cache_dir`, las entradas se nombran por su huella, así que scripts con el mismo
+    contenido comparten entrada. Las escrituras usan un archivo temporal y `os.replace`,
+    de modo que un lector concurrente ve la versión anterior completa o la nueva, nunca
+    una a medias; cualquier archivo ilegible o con otra huella se trata como un fallo de caché.
+    """
+
+    def __init__(self, cache_dir=None, parser=None):
+        self.cache_dir = cache_dir  # Directorio común de caché (opcional)
+        self.parser = parser or SimpylParser(lexer)
+        self.hits = 0  # Cargas servidas desde la caché
+        self.misses = 0  # Cargas que tuvieron que analizar el código
+
+    def cache_path(self, key, path=None):
+        """Ruta del archivo .spyc para un script."""
+        if self.cache_dir is not None:
+            return os.path.join(self.cache_dir, key.hex() + CACHE_SUFFIX)
+        if path is None:
+            return None  # Código sin archivo y sin directorio de caché: no se guarda
+        return script_cache_path(path)
+
+    def load(self, source, path=None):
+        """Devuelve el AST de `source`, leyéndolo de la caché o analizándolo y guardándolo."""
+        key = cache_key(source)
+        cache_path = self.cache_path(key, path)
+        if cache_path is not None:
+            statements = self.read(cache_path, key)
+            if statements is not None:
+                self.hits += 1
+                return statements
+        self.misses += 1
+        statements = self.parser.parse(source)
+        if cache_path is not None:
+            self.write(cache_path, key, statements)
+        return statements
+
+    def load_file(self, path):
+        """Lee un script del disco y devuelve su AST usando la caché."""
+        with open(path, "r", encoding="utf-8") as file:
+            return self.load(file.read(), path)
+
+    def read(self, cache_path, key):
+        """Lee una entrada; devuelve None si no existe, está dañada o pertenece a otra versión."""
+        try:
+            with open(cache_path, "rb") as file:
+                data = file.read()
+        except OSError:
+            return None
+        header = CACHE_MAGIC + key
+        if not data.startswith(header):
+            return None
+        try:
+            return marshal.loads(data[len(header):])
+        except (EOFError, ValueError, TypeError):
+            return None
+
+    def write(self, cache_path, key, statements):
+        """Escribe una entrada de forma atómica; los errores de escritura no impiden la ejecución."""
+        directory = os.path.dirname(cache_path)
+        try:
+            os.makedirs(directory, exist_ok=True)
+            import tempfile  # Sólo se necesita al escribir la caché
+            fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=CACHE_SUFFIX)
+            try:
+                with os.fdopen(fd, "wb") as file:
+                    file.write(CACHE_MAGIC + key)
+                    file.write(marshal.dumps(statements))
+                os.replace(temp_path, cache_path)  # Reemplazo atómico frente a otros procesos
+            except BaseException:
+                os.unlink(temp_path)
+                raise
+        except OSError:
+            return False
+        return True
+
+    def clear(self, path=None):
+        """Elimina la entrada de un script o, con `cache_dir`, todas las entradas."""
+        if self.cache_dir is None:
+            if path is not None and os.path.exists(script_cache_path(path)):
+                os.unlink(script_cache_path(path))
+            return
+        if not os.path.isdir(self.cache_dir):
+            return
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(CACHE_SUFFIX):
+                os.unlink(os.path.join(self.cache_dir, name))
+
+
+def test_cache():
+    """Comprueba la caché de scripts junto al script y en un directorio común.
+
+    Se prueban los aciertos y fallos, la invalidación al cambiar el código o la versión del
+    intérprete, las entradas dañadas, clear y la ejecución de scripts con caché en los dos motores.
+    """
+    global _interpreter_version
+    import contextlib  # Captura de la salida estándar
+    import io
+    import tempfile
+
+    try:
+        from .simpyl_interpreter import SimpylInterpreter
+    except ImportError:
+        from simpyl_interpreter import SimpylInterpreter
+
+    source = "(define doble (x) (* x 2))\n(print (doble 21))\n"
+    with tempfile.TemporaryDirectory() as directory:
+        script = os.path.join(directory, "doble.spy")
+        with open(script, "w", encoding="utf-8") as file:
+            file.write(source)
+
+        # Caché junto al script
+        cache = ScriptCache()
+        statements = cache.load_file(script)
+        assert statements == cache.parser.parse(source)
+        assert os.path.isfile(script_cache_path(script))
+        assert script_cache_path(script) == os.path.join(directory, CACHE_DIRNAME, "doble.spy" + CACHE_SUFFIX)
+        assert cache.load_file(script) == statements and (cache.hits, cache.misses) == (1, 1)
+        assert ScriptCache().load_file(script) == statements  # Otro proceso lee la misma entrada
+        assert cache.read(script_cache_path(script), cache_key(source)) == statements
+        assert cache.read(script_cache_path(script), cache_key(source + " ")) is None
+
+        # Un cambio en el código invalida la entrada, que se reescribe
+        changed = source.replace("21", "4")
+        assert cache.load(changed, script) == cache.parser.parse(changed) and cache.misses == 2
+        assert cache.load(changed, script) is not None and cache.hits == 2
+
+        # La versión del intérprete forma parte de la huella
+        version, key = interpreter_version(), cache_key(changed)
+        try:
+            _interpreter_version = version + ".dev"
+            assert cache_key(changed) != key
+            cache.load(changed, script)
+            assert cache.misses == 3
+        finally:
+            _interpreter_version = version
+        assert cache_key(source) == cache_key(source) and cache_key(source) != cache_key(changed)
+
+        # Una entrada dañada es un fallo de caché, no un error
+        with open(script_cache_path(script), "wb") as file:
+            file.write(CACHE_MAGIC + cache_key(source) + b"\xff\x00")
+        assert cache.load(source, script) == statements and cache.misses == 4
+        assert cache.load(source, script) == statements and cache.hits == 3
+        cache.clear(script)
+        assert not os.path.exists(script_cache_path(script))
+        cache.clear(script)  # Borrar una entrada que no existe no es un error
+
+        # Código sin archivo: sin directorio común no se guarda
+        assert cache.cache_path(cache_key(source)) is None
+        assert cache.load(source) == statements and cache.misses == 5
+
+        # Directorio común: las entradas se nombran por su huella y se comparten
+        shared = ScriptCache(cache_dir=os.path.join(directory, "cache"))
+        assert shared.load(source) == statements and shared.load_file(script) == statements
+        assert (shared.hits, shared.misses) == (1, 1)
+        assert os.listdir(shared.cache_dir) == [cache_key(source).hex() + CACHE_SUFFIX]
+        shared.load(changed)
+        assert len(os.listdir(shared.cache_dir)) == 2
+        shared.clear()
+        assert os.listdir(shared.cache_dir) == []
+        ScriptCache(cache_dir=os.path.join(directory, "no-existe")).clear()
+
+        # Scripts ejecutados con caché: la segunda ejecución la usa y el resultado no cambia
+        for engine in ("closure", "vm"):
+            cache = ScriptCache(cache_dir=os.path.join(directory, engine))
+            for hits in (0, 1):
+                buffer = io.StringIO()
+                with contextlib.redirect_stdout(buffer):
+                    SimpylInterpreter(engine=engine, cache=cache).run_file(script)
+                assert buffer.getvalue() == "42\n", (engine, buffer.getvalue())
+                assert cache.hits == hits, engine
+    print("OK: caché de scripts")
+
+
+if __name__ == "__main__":
+    test_cache()
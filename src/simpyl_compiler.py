@@ -0,0 +1,534 @@
+import operator  # Implementaciones nativas de los operadores aritméticos y de comparación
+
+try:
+    from .simpyl_memo import MemoizedFunction, memoize  # Importación dentro del paquete
+    from .simpyl_vector import VECTOR_BUILTINS, SimpylVector, vector_result
+except ImportError:
+    from simpyl_memo import MemoizedFunction, memoize  # Importación al ejecutar el archivo directamente
+    from simpyl_vector import VECTOR_BUILTINS, SimpylVector, vector_result
+
+# Operadores binarios de Simpyl y su implementación en Python
+OPERATORS = {
+    '+': operator.add,
+    '-': operator.sub,
+    '*': operator.mul,
+    '/': operator.truediv,
+    '%': operator.mod,
+    '==': operator.eq,
+    '!=': operator.ne,
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+}
+
+# Nodos que propagan la posición de cola a alguno de sus hijos o que pueden ser llamadas en cola
+TAIL_NODES = ("if", "block", "call")
+
+# Funciones predefinidas disponibles en cualquier programa
+BUILTINS = {
+    'abs': abs,
+    'len': len,
+    'max': max,
+    'min': min,
+    'round': round,
+    'str': str,
+    'int': int,
+    'float': float,
+    **VECTOR_BUILTINS,
+}
+
+
+def parse_number(text):
+    """Convierte el texto de un token NUMBER en int o float."""
+    try:
+        return int(text)
+    except ValueError:
+        return float(text)
+
+
+def parse_string(text):
+    """Quita las comillas de un token STRING y resuelve sus secuencias de escape."""
+    if "\\" not in text:
+        return text[1:-1]  # Sin secuencias de escape no hace falta el módulo ast
+    import ast  # Se carga con la primera cadena que tiene escapes
+    return ast.literal_eval(text)
+
+
+def global_value(name, variables, functions):
+    """Valor de un nombre global: variable, función de usuario, función predefinida u operador."""
+    if name in variables:
+        return variables[name]
+    function = functions.get(name) or BUILTINS.get(name) or OPERATORS.get(name)
+    if function is None:
+        raise NameError(f"Variable '{name}' no definida")
+    return function
+
+
+def node_lines(node):
+    """Devuelve las líneas donde empiezan las formas de un nodo, incluidas las de sus hijos."""
+    lines = set()
+    pending = [node]
+    while pending:
+        current = pending.pop()
+        if isinstance(current, list):
+            pending.extend(current)
+        elif isinstance(current, dict):
+            if "line" in current:
+                lines.add(current["line"])
+            pending.extend(value for value in current.values() if isinstance(value, (dict, list)))
+    return lines
+
+
+def assigned_names(node):
+    """Devuelve los nombres asignados dentro de un cuerpo, incluidos los de las funciones que define.
+
+    No entra en las funciones anidadas: sus variables son locales a ellas.
+    """
+    names = []
+    pending = [node]
+    while pending:
+        current = pending.pop()
+        if isinstance(current, list):
+            pending.extend(reversed(current))
+        elif isinstance(current, dict):
+            if current.get("type") in ("assignment", "function_definition") and current["name"] not in names:
+                names.append(current["name"])
+            if current.get("type") != "function_definition":
+                pending.extend(value for value in reversed(list(current.values())) if isinstance(value, (dict, list)))
+    return names
+
+
+class Unbound:
+    """Marcador de variables locales y globales sin valor asignado."""
+
+    def __repr__(self):
+        return "<sin valor>"
+
+
+UNBOUND = Unbound()
+
+
+DEFAULT_MAX_DEPTH = 2_000_000  # Llamadas anidadas (no en cola) permitidas por defecto en la VM
+
+SAFE_POINT_STEPS = 10_000  # Vueltas de bucle y llamadas entre dos puntos seguros dentro de una forma
+
+
+class SimpylRecursionError(RecursionError):
+    """Se superó la profundidad máxima de llamadas anidadas de un programa Simpyl."""
+
+
+class SimpylBudgetError(Exception):
+    """El programa agotó su presupuesto de pasos o de tiempo y se canceló."""
+
+
+class TailCall:
+    """Llamada en posición de cola pendiente: la ejecuta el bucle de SimpylFunction sin crecer la pila."""
+
+    __slots__ = ("function", "args")
+
+    def __init__(self, function, args):
+        self.function = function  # Función que se llamará
+        self.args = args  # Argumentos ya evaluados
+
+
+class Frame:
+    """Marco de una llamada: valores de las variables locales en una lista de tamaño fijo."""
+
+    __slots__ = ("values", "parent")
+
+    def __init__(self, values, parent):
+        self.values = values  # Parámetros y variables locales, en el orden que fijó el compilador
+        self.parent = parent  # Marco en el que se definió la función (None en el nivel superior)
+
+
+class SimpylFunction:
+    """Función de usuario compilada: conserva sus parámetros, el closure de su cuerpo y su marco de definición."""
+
+    def __init__(self, name, params, body, nslots, parent=None, vectorized=None):
+        self.name = name  # Nombre de la función
+        self.params = params  # Lista de nombres de parámetros
+        self.body = body  # Closure que evalúa el cuerpo recibiendo el marco de la llamada
+        self.extra_slots = nslots - len(params)  # Variables locales que no son parámetros
+        self.parent = parent  # Marco léxico exterior
+        self.vectorized = vectorized  # Resultado de vector_result: si map y filter pueden pasarle vectores completos
+
+    def __call__(self, *args):
+        function = self
+        pending = None  # (caché, clave) de las funciones memorizadas llamadas en cola que esperan el resultado
+        while True:  # Trampolín: las llamadas en posición de cola se resuelven aquí, sin anidar llamadas de Python
+            if len(args) != len(function.params):
+                raise TypeError(f"La función '{function.name}' espera {len(function.params)} argumentos, pero recibió {len(args)}")
+            values = list(args)
+            if function.extra_slots:
+                values.extend([UNBOUND] * function.extra_slots)
+            result = function.body(Frame(values, function.parent))
+            if result.__class__ is not TailCall:
+                break
+            function = result.function
+            args = result.args
+            if function.__class__ is MemoizedFunction:  # Se resuelve aquí para que la recursión en cola no anide
+                found, result, key = function.lookup(args)
+                if found:
+                    break
+                if key is not None:
+                    if pending is None:
+                        pending = []
+                    pending.append((function.cache, key))
+                function = function.function
+            if function.__class__ is not SimpylFunction:  # Funciones predefinidas, de Python o perfiladas
+                result = function(*args)
+                break
+        if pending is not None:
+            for cache, key in pending:
+                cache.store(key, result)
+        return result
+
+    def __repr__(self):
+        return f"<función {self.name}({' '.join(self.params)})>"
+
+
+class ProfiledFunction(SimpylFunction):
+    """Función compilada con el perfilador activo: su trampolín abre y cierra la medición en cada salto.
+
+    Cada vuelta del trampolín mide sólo el cuerpo de la función que ejecuta. Una llamada en cola a
+    una función predefinida o de Python se hace con la medición de la función que la llama abierta,
+    igual que si no estuviera en posición de cola. Los errores los cierra Profiler.exit_to.
+    """
+
+    def __init__(self, name, params, body, nslots, parent, vectorized, profiler, key):
+        super().__init__(name, params, body, nslots, parent, vectorized)
+        self.profiler = profiler  # Profiler que recibe las mediciones
+        self.key = key  # Clave (nombre, línea) de la función en el perfilador
+
+    def __call__(self, *args):
+        function = self
+        pending = None  # (caché, clave) de las funciones memorizadas llamadas en cola que esperan el resultado
+        while True:
+            if len(args) != len(function.params):
+                raise TypeError(f"La función '{function.name}' espera {len(function.params)} argumentos, pero recibió {len(args)}")
+            values = list(args)
+            if function.extra_slots:
+                values.extend([UNBOUND] * function.extra_slots)
+            profiler = function.profiler if function.__class__ is ProfiledFunction else None
+            if profiler is not None:
+                profiler.enter(function.key)
+            result = function.body(Frame(values, function.parent))
+            if result.__class__ is TailCall:
+                callee = result.function
+                if callee.__class__ is MemoizedFunction:
+                    found, value, key = callee.lookup(result.args)
+                    if found:
+                        result = value
+                    else:
+                        if key is not None:
+                            if pending is None:
+                                pending = []
+                            pending.append((callee.cache, key))
+                        callee = result.function = callee.function
+                if (result.__class__ is TailCall and callee.__class__ is not SimpylFunction
+                        and callee.__class__ is not ProfiledFunction):
+                    result = callee(*result.args)  # Se mide dentro de la función que hace la llamada
+            if profiler is not None:
+                profiler.exit()
+            if result.__class__ is not TailCall:
+                break
+            function = result.function
+            args = result.args
+        if pending is not None:
+            for cache, key in pending:
+                cache.store(key, result)
+        return result
+
+
+class SimpylCompiler:
+    """Compila el AST de SimpylParser una sola vez en un árbol de closures de Python.
+
+    Cada closure recibe el marco de la llamada en curso (None en el nivel superior) y devuelve
+    el valor del nodo. Al compilar, cada variable local recibe una dirección (profundidad, índice):
+    cuántos marcos hay que subir y qué posición ocupa en la lista de valores. Los nombres que no
+    son locales de ninguna función se buscan en el diccionario de variables globales. Una función
+    definida dentro de otra es una variable local de ésta y conserva su marco para leer sus variables.
+
+    Las funciones definidas con 'define-memo' se envuelven con `memo(nombre, función)`. Con un
+    `profiler` activo, el cuerpo de cada función se compila entre sus llamadas a `enter` y `exit`.
+    Con un `debugger`, sólo las declaraciones y funciones que contienen un punto de interrupción
+    se compilan en su variante de depuración, que llama a `debugger.hook` antes de cada forma.
+    Con `safe_point`, cada bucle lo llama cada SAFE_POINT_STEPS vueltas y cada función cada
+    SAFE_POINT_STEPS llamadas, para que el intérprete controle la memoria sin esperar al final
+    de la forma.
+    """
+
+    def __init__(self, variables, functions, memo=memoize, profiler=None, debugger=None, safe_point=None):
+        self.variables = variables  # Variables globales del intérprete
+        self.functions = functions  # Funciones de usuario (nombre -> invocable)
+        self.memo = memo  # Envoltorio de las funciones memorizadas
+        self.profiler = profiler  # Perfilador (opcional); sólo se instrumenta mientras está activo
+        self.debugger = debugger  # Depurador (opcional)
+        self.safe_point = safe_point  # Invocable de los puntos seguros dentro de una forma (opcional)
+        self.debugging = False  # Se está compilando la variante de depuración
+        self.scopes = []  # Ámbitos de las funciones que se están compilando: (nombre -> índice, nº de parámetros)
+
+    def compile_program(self, statements):
+        """Compila una lista de declaraciones de nivel superior."""
+        return [self.compile_statement(statement) for statement in statements]
+
+    def compile_statement(self, node):
+        """Compila una declaración de nivel superior, en su variante de depuración si la necesita."""
+        self.debugging = self.debugger is not None and self.debugger.wants(node)
+        try:
+            return self.compile(node)
+        finally:
+            self.debugging = False
+
+    def compile(self, node, tail=False):
+        """Despacha la compilación según el tipo de nodo.
+
+        `tail` indica que el valor del nodo es el resultado de la función que lo contiene; las
+        llamadas en esa posición se compilan como TailCall.
+        """
+        method = getattr(self, f"compile_{node['type']}", None)
+        if method is None:
+            raise SyntaxError(f"Tipo de nodo no soportado: {node['type']}")
+        if tail and node["type"] in TAIL_NODES:
+            compiled = method(node, tail=True)
+        else:
+            compiled = method(node)
+        if self.debugging and "line" in node and node["type"] != "function_definition":
+            return self.debug_form(compiled, node["line"])  # Definir una función no se pausa; su cuerpo sí
+        return compiled
+
+    def debug_form(self, compiled, line):
+        """Variante de depuración de una forma: avisa al depurador antes de evaluarla."""
+        hook = self.debugger.hook
+        names = self.scopes[-1][0] if self.scopes else {}
+        read_global = self.variables.get
+
+        def debug_hook(frame):
+            hook(line, names, frame.values if frame is not None else (), read_global)
+            return compiled(frame)
+        return debug_hook
+
+    def resolve(self, name):
+        """Devuelve la dirección (profundidad, índice) de una variable local, o None si es global."""
+        for depth, (scope, nparams) in enumerate(reversed(self.scopes)):
+            if name in scope:
+                return depth, scope[name]
+        return None
+
+    def compile_number(self, node):
+        value = parse_number(node["value"])  # Se convierte una sola vez, no en cada ejecución
+        return lambda frame: value
+
+    def compile_string(self, node):
+        value = parse_string(node["value"])  # Se interpreta una sola vez, no en cada ejecución
+        return lambda frame: value
+
+    def compile_boolean(self, node):
+        value = node["value"] == "true"
+        return lambda frame: value
+
+    def compile_null(self, node):
+        return lambda frame: None
+
+    def compile_identifier(self, node):
+        name = node["value"]
+        address = self.resolve(name)
+        if address is None:
+            variables = self.variables
+            functions = self.functions
+
+            def load_global(frame):
+                try:
+                    return variables[name]
+                except KeyError:  # Las funciones también son valores: (map doble v)
+                    return global_value(name, variables, functions)
+            return load_global
+
+        depth, index = address
+        if depth == 0 and index < self.scopes[-1][1]:
+            return lambda frame: frame.values[index]  # Los parámetros siempre tienen valor
+
+        def load_local(frame):
+            for _ in range(depth):
+                frame = frame.parent
+            value = frame.values[index]
+            if value is UNBOUND:
+                raise NameError(f"Variable '{name}' no definida")
+            return value
+        return load_local
+
+    def compile_vector(self, node):
+        items = [self.compile(item) for item in node["items"]]
+        if all(item["type"] == "number" for item in node["items"]):
+            value = SimpylVector.from_values([parse_number(item["value"]) for item in node["items"]])
+            return lambda frame: value  # Vector constante: se construye una sola vez
+        return lambda frame: SimpylVector.from_values([item(frame) for item in items])
+
+    def compile_assignment(self, node):
+        name = node["name"]
+        value = self.compile(node["value"])
+        if not self.scopes:  # Nivel superior: variable global
+            variables = self.variables
+
+            def assign_global(frame):
+                result = variables[name] = value(frame)
+                return result
+            return assign_global
+
+        index = self.scopes[-1][0][name]  # Las variables asignadas en una función son locales a ella
+
+        def assign_local(frame):
+            result = frame.values[index] = value(frame)
+            return result
+        return assign_local
+
+    def compile_operation(self, node):
+        op = OPERATORS.get(node["operator"])
+        if op is None:
+            raise SyntaxError(f"Operador no soportado: {node['operator']}")
+        left = self.compile(node["left"])
+        right = self.compile(node["right"])
+        return lambda frame: op(left(frame), right(frame))
+
+    def compile_if(self, node, tail=False):
+        condition = self.compile(node["condition"])
+        then_branch = self.compile(node["then"], tail)
+        else_branch = self.compile(node["else"], tail) if node["else"] is not None else (lambda frame: None)
+
+        def conditional(frame):
+            if condition(frame):
+                return then_branch(frame)
+            return else_branch(frame)
+        return conditional
+
+    def compile_while(self, node):
+        condition = self.compile(node["condition"])
+        body = self.compile(node["body"])
+        safe_point = self.safe_point
+        if safe_point is None:
+            def loop(frame):
+                while condition(frame):
+                    body(frame)
+            return loop
+        steps = range(SAFE_POINT_STEPS)
+
+        def checked_loop(frame):  # Cada bucle cuenta sus vueltas por tramos, sin un contador en cada vuelta
+            while True:
+                for _ in steps:
+                    if not condition(frame):
+                        return None
+                    body(frame)
+                safe_point()
+        return checked_loop
+
+    def checked(self, compiled):
+        """Cuerpo de función que llama a `safe_point` cada SAFE_POINT_STEPS llamadas a la función."""
+        safe_point = self.safe_point
+        countdown = SAFE_POINT_STEPS
+
+        def checked_body(frame):
+            nonlocal countdown
+            countdown -= 1
+            if not countdown:
+                countdown = SAFE_POINT_STEPS
+                safe_point()
+            return compiled(frame)
+        return checked_body
+
+    def compile_block(self, node, tail=False):
+        init = [self.compile(expression) for expression in node["body"][:-1]]
+        last = self.compile(node["body"][-1], tail)
+
+        def block(frame):
+            for expression in init:
+                expression(frame)
+            return last(frame)
+        return block
+
+    def compile_print(self, node):
+        args = [self.compile(arg) for arg in node["args"]]
+
+        def print_values(frame):
+            print(*[arg(frame) for arg in args])
+        return print_values
+
+    def compile_call(self, node, tail=False):
+        name = node["name"]
+        args = [self.compile(arg) for arg in node["args"]]
+        if self.resolve(name) is not None:  # Parámetro o variable local: se llama al valor que tenga, (f x)
+            load = self.compile_identifier({"type": "identifier", "value": name})
+
+            def call_local(frame):
+                return load(frame)(*[arg(frame) for arg in args])
+
+            def tail_call_local(frame):
+                return TailCall(load(frame), [arg(frame) for arg in args])
+            return tail_call_local if tail else call_local
+
+        functions = self.functions
+        variables = self.variables
+
+        def call(frame):
+            # La función se resuelve en cada llamada para admitir recursión y redefiniciones
+            function = functions.get(name) or variables.get(name) or BUILTINS.get(name)
+            if function is None:
+                raise NameError(f"Función '{name}' no definida")
+            return function(*[arg(frame) for arg in args])
+
+        def tail_call(frame):
+            function = functions.get(name) or variables.get(name) or BUILTINS.get(name)
+            if function is None:
+                raise NameError(f"Función '{name}' no definida")
+            return TailCall(function, [arg(frame) for arg in args])  # El llamador la ejecuta sin anidarla
+        return tail_call if tail else call
+
+    def compile_function_definition(self, node):
+        name = node["name"]
+        params = node["params"]
+        scope = {param: index for index, param in enumerate(params)}
+        for local_name in assigned_names(node["body"]):  # Las variables asignadas en el cuerpo son locales
+            scope.setdefault(local_name, len(scope))
+        nslots = len(scope)
+        self.scopes.append((scope, len(params)))
+        debugging = self.debugging
+        self.debugging = self.debugger is not None and self.debugger.wants(node)
+        try:
+            body = self.compile(node["body"], tail=True)
+        finally:
+            self.scopes.pop()
+            self.debugging = debugging
+        if self.safe_point is not None:
+            body = self.checked(body)
+        vectorized = vector_result(params, node["body"])
+        if self.profiler is not None and self.profiler.enabled:
+            profiler, key = self.profiler, (name, node.get("line"))
+
+            def make_function(frame):  # Las llamadas y los saltos del trampolín se miden
+                return ProfiledFunction(name, params, body, nslots, frame, vectorized, profiler, key)
+        else:
+            def make_function(frame):
+                return SimpylFunction(name, params, body, nslots, frame, vectorized)
+        if self.scopes:  # Función anidada: es una variable local de la función que la contiene
+            index = self.scopes[-1][0][name]
+            memo = self.memo if node.get("memo") else None
+
+            def define_local(frame):
+                function = make_function(frame)
+                function = frame.values[index] = memo(name, function) if memo is not None else function
+                return function
+            return define_local
+
+        functions = self.functions
+        if node.get("memo"):
+            memo = self.memo
+
+            def define_memo(frame):
+                function = functions[name] = memo(name, make_function(frame))
+                return function
+            return define_memo
+
+        def define(frame):
+            function = functions[name] = make_function(frame)
+            return function
+        return define
@@ -0,0 +1,337 @@
+import bisect  # Búsqueda de la primera forma afectada por una edición
+
+try:
+    from .lexer import TOKEN_IDS, TokenArray, lexer, scan  # Importación dentro del paquete
+    from .simpyl_parser import SimpylParser
+except ImportError:
+    from lexer import TOKEN_IDS, TokenArray, lexer, scan  # Importación al ejecutar el archivo directamente
+    from simpyl_parser import SimpylParser
+
+
+def shift_lines(node, delta):
+    """Copia un nodo del AST sumando `delta` a la línea de cada forma."""
+    copy = {}
+    for key, value in node.items():
+        if key == "line":
+            value += delta
+        elif isinstance(value, dict):
+            value = shift_lines(value, delta)
+        elif isinstance(value, list):
+            value = [shift_lines(item, delta) if isinstance(item, dict) else item for item in value]
+        copy[key] = value
+    return copy
+
+
+class SourceForm:
+    """Forma de nivel superior de un documento: su posición, sus tokens y su AST.
+
+    Las posiciones de los tokens son relativas al inicio de la forma y sus líneas, relativas a la
+    primera línea de la forma, así que una edición anterior sólo cambia `start` y `line`.
+    """
+
+    __slots__ = ("start", "end", "line", "tokens", "nodes", "parsed_line", "error", "name", "unclosed")
+
+    def __init__(self, start, end, line, tokens):
+        self.start = start  # Posición del primer carácter en el documento
+        self.end = end  # Posición siguiente al último carácter
+        self.line = line  # Línea donde empieza
+        self.tokens = tokens  # TokenArray con el texto de la forma en `source`
+        self.nodes = []  # Declaraciones del AST (una por forma), con las líneas de `parsed_line`
+        self.parsed_line = line  # Línea de inicio con la que se numeraron los nodos
+        self.error = None  # SyntaxError de la forma, si no pudo analizarse
+        self.name = None  # Nombre de la función que define, si es una definición
+        self.unclosed = False  # Contiene '"' o '/*' sin cerrar: una edición posterior puede cerrarlos
+
+    @property
+    def text(self):
+        return self.tokens.source
+
+    def statements(self):
+        """Declaraciones de la forma con las líneas actuales; sólo se renumeran si la forma se ha movido."""
+        if self.parsed_line != self.line:
+            self.nodes = [shift_lines(node, self.line - self.parsed_line) for node in self.nodes]
+            self.parsed_line = self.line
+        return self.nodes
+
+    def signature(self):
+        """Tipos y valores de los tokens: iguales si la forma sólo cambió en espacios o comentarios."""
+        return bytes(self.tokens.kinds), tuple(value for kind, value, line in self.tokens)
+
+    def __repr__(self):
+        return f"<forma línea {self.line}: {self.text[:40]!r}>"
+
+
+class DocumentChanges:
+    """Resultado de una edición: definiciones de funciones afectadas y formas reanalizadas o reutilizadas."""
+
+    __slots__ = ("added", "removed", "modified", "reparsed", "reused")
+
+    def __init__(self, added, removed, modified, reparsed, reused):
+        self.added = added  # Funciones que antes no estaban definidas
+        self.removed = removed  # Funciones que ya no están definidas
+        self.modified = modified  # Funciones cuya definición cambió (no basta con moverla)
+        self.reparsed = reparsed  # Formas nuevas, analizadas en esta edición
+        self.reused = reused  # Formas anteriores conservadas sin volver a analizarlas
+
+    @property
+    def definitions(self):
+        """Nombres de todas las funciones cuya definición vigente cambió."""
+        return self.added | self.removed | self.modified
+
+    def __repr__(self):
+        return (f"<cambios añadidas={sorted(self.added)} eliminadas={sorted(self.removed)} "
+                f"modificadas={sorted(self.modified)} reanalizadas={len(self.reparsed)} reutilizadas={self.reused}>")
+
+
+class IncrementalDocument:
+    """Texto de un programa Simpyl analizado forma a forma, para el modo interactivo y los editores.
+
+    Tras cada edición sólo se vuelve a analizar léxica y sintácticamente la zona dañada: se empieza
+    al final de la forma anterior a la edición y se avanza hasta que el análisis vuelve a encontrar,
+    después de la edición, el comienzo de una forma anterior sin cambios. El resto de formas se
+    conserva. Los errores de sintaxis no interrumpen el análisis: quedan en la forma afectada.
+    """
+
+    def __init__(self, text=""):
+        self.text = ""
+        self.forms = []  # SourceForm en orden de aparición
+        self.parser = SimpylParser(lexer)
+        if text:
+            self.edit(0, 0, text)
+
+    def edit(self, start, end, new_text):
+        """Sustituye el texto entre `start` y `end` por `new_text` y devuelve los DocumentChanges."""
+        if not 0 <= start <= end <= len(self.text):
+            raise ValueError(f"Edición fuera del documento: {start}-{end} de {len(self.text)} caracteres")
+        old_text = self.text
+        text = self.text = old_text[:start] + new_text + old_text[end:]
+        delta = len(new_text) - (end - start)
+        forms = self.forms
+
+        # La primera forma afectada es la que termina en la edición o después (tocarla puede unir tokens)
+        first = bisect.bisect_left([form.end for form in forms], start)
+        for index in range(first):
+            if forms[index].unclosed:  # Una comilla o un comentario sin cerrar puede cerrarse con esta edición
+                first = index
+                break
+        boundary = min(start, forms[first].start) if first < len(forms) else start
+        # Sin separación, sus tokens pueden unirse ("1e" + "1"); un '-' suelto puede ser el signo de un número nuevo
+        while first and (forms[first - 1].end == boundary or forms[first - 1].text == "-"):
+            first -= 1
+            boundary = forms[first].start
+        starts = [form.start for form in forms]
+        if first:
+            previous = forms[first - 1]
+            position, line = previous.end, previous.line + previous.tokens.lines[-1]  # Línea de su último token
+        else:
+            position, line = 0, 1
+
+        new_forms, last, line_delta = self.scan(text, position, line, start + len(new_text), delta, old_text, starts)
+        removed_forms = forms[first:last]
+        reused = forms[last:]
+        for form in reused:
+            form.start += delta
+            form.end += delta
+            form.line += line_delta
+
+        names = {form.name for form in removed_forms + new_forms if form.name is not None}
+        before = self.effective_definitions(names)
+        forms[first:last] = new_forms
+        after = self.effective_definitions(names)
+        added = {name for name in names if name in after and name not in before}
+        removed = {name for name in names if name in before and name not in after}
+        modified = {name for name in names if name in before and name in after
+                    and before[name] is not after[name] and before[name].signature() != after[name].signature()}
+        return DocumentChanges(added, removed, modified, new_forms, len(forms) - len(new_forms))
+
+    def replace(self, text):
+        """Sustituye todo el texto, editando sólo la parte que cambió; para editores que envían el documento entero."""
+        old_text = self.text
+        prefix = 0
+        limit = min(len(old_text), len(text))
+        while prefix < limit and old_text[prefix] == text[prefix]:
+            prefix += 1
+        suffix = 0
+        while suffix < limit - prefix and old_text[-1 - suffix] == text[-1 - suffix]:
+            suffix += 1
+        return self.edit(prefix, len(old_text) - suffix, text[prefix:len(text) - suffix])
+
+    def scan(self, text, position, line, edit_end, delta, old_text, starts):
+        """Analiza formas desde `position` hasta enlazar con una forma anterior o llegar al final.
+
+        `edit_end` es el final de la edición en el texto nuevo y `starts`, el comienzo de las formas
+        en el texto anterior. Devuelve las formas nuevas, el índice de la primera forma reutilizada y
+        cuántas líneas se ha desplazado (el lexer no cuenta los saltos de línea dentro de las cadenas).
+        """
+        new_forms = []
+        depth = 0
+        tokens = None
+        form_start = form_line = None
+        errors = []
+        unclosed = False
+        sign_end = None  # Final de un '-' de nivel superior que aún puede ser el signo de un número
+        for kind, value, token_line, match in scan(text, line, position):
+            start, end = match.span()
+            if sign_end is not None:
+                if kind != 'NUMBER':  # No es un signo: el '-' es una forma por sí mismo
+                    new_forms.append(self.parse_form(text, form_start, sign_end, form_line, tokens, errors, unclosed))
+                    form_start = None
+                    errors = []
+                sign_end = None
+            if form_start is None:
+                if start >= edit_end:
+                    index = bisect.bisect_left(starts, start - delta)
+                    if (index < len(starts) and starts[index] == start - delta
+                            and (start == 0 or text[start - 1] == old_text[start - delta - 1])):
+                        # A partir de aquí el texto y el análisis coinciden con los anteriores
+                        return new_forms, index, token_line - self.forms[index].line
+                form_start, form_line = start, token_line
+                tokens = TokenArray()
+            if value == '"' or (value == '/' and text.startswith('*', end)):
+                unclosed = True
+            if kind == 'MISMATCH':
+                errors.append(SyntaxError(f'Carácter no esperado "{value}" en la línea {token_line}'))
+            tokens.append(TOKEN_IDS[kind], start - form_start, end - form_start, token_line - form_line)
+            if kind == 'LPAREN' or kind == 'LBRACKET':
+                depth += 1
+            elif kind == 'RPAREN' or kind == 'RBRACKET':
+                depth -= 1
+                if depth < 0:
+                    errors.append(SyntaxError(f"Cierre de '{value}' sin abrir en la línea {token_line}"))
+                    depth = 0
+            if depth == 0:
+                if kind == 'ARITHMETIC_OP' and value == '-':
+                    sign_end = end  # Como en el parser, '-' seguido de un número es un número negativo: -5
+                    continue
+                new_forms.append(self.parse_form(text, form_start, end, form_line, tokens, errors, unclosed))
+                form_start = None
+                errors = []
+                unclosed = False
+        if sign_end is not None:  # El documento termina en un '-' suelto
+            new_forms.append(self.parse_form(text, form_start, sign_end, form_line, tokens, errors, unclosed))
+        elif form_start is not None:
+            errors.append(SyntaxError(f"Falta un paréntesis de cierre en la forma que empieza en la línea {form_line}"))
+            new_forms.append(self.parse_form(text, form_start, len(text), form_line, tokens, errors, unclosed))
+        return new_forms, len(self.forms), 0
+
+    def parse_form(self, text, start, end, line, tokens, errors, unclosed):
+        """Crea la SourceForm y analiza su AST; los errores quedan en la forma."""
+        tokens.source = text[start:end]
+        form = SourceForm(start, end, line, tokens)
+        form.unclosed = unclosed
+        if errors:
+            form.error = errors[0]
+            return form
+        try:
+            form.nodes = self.parser.parse_tokens((kind, value, line + offset) for kind, value, offset in tokens)
+        except SyntaxError as e:
+            form.error = e
+            return form
+        if len(form.nodes) == 1 and form.nodes[0]["type"] == "function_definition":
+            form.name = form.nodes[0]["name"]
+        return form
+
+    def effective_definitions(self, names):
+        """Última forma que define cada uno de `names`, que es la definición vigente al ejecutar el documento."""
+        definitions = {}
+        if names:
+            for form in self.forms:
+                if form.name in names:
+                    definitions[form.name] = form
+        return definitions
+
+    def definitions(self):
+        """Nombre -> SourceForm de la definición vigente de cada función."""
+        return {form.name: form for form in self.forms if form.name is not None}
+
+    def errors(self):
+        """Errores de sintaxis del documento, en orden."""
+        return [form.error for form in self.forms if form.error is not None]
+
+    def statements(self):
+        """AST completo del documento, como el de SimpylParser.parse; lanza el primer error de sintaxis."""
+        statements = []
+        for form in self.forms:
+            if form.error is not None:
+                raise form.error
+            statements.extend(form.statements())
+        return statements
+
+    def form_at(self, offset):
+        """Forma que contiene la posición `offset`, o None si está entre dos formas."""
+        index = bisect.bisect_right([form.start for form in self.forms], offset) - 1
+        if index >= 0 and offset < self.forms[index].end:
+            return self.forms[index]
+        return None
+
+
+def test_incremental():
+    """Comprueba que el documento incremental y read_forms dan el mismo AST que el parser completo.
+
+    Incluye un '-' de nivel superior, que el parser une al número siguiente (-5), cadenas y
+    comentarios con paréntesis cortados entre dos bloques, y ediciones al azar.
+    """
+    import io  # Archivos en memoria para read_forms
+    import random
+
+    try:
+        from .simpyl_reader import read_forms
+    except ImportError:
+        from simpyl_reader import read_forms
+
+    parser = SimpylParser(lexer)
+
+    def parse_all(text):
+        try:
+            return parser.parse(text)
+        except SyntaxError:
+            return SyntaxError
+
+    def parse_document(document):
+        try:
+            return document.statements()
+        except SyntaxError:
+            return SyntaxError
+
+    programs = [
+        "-5",
+        "(x = 1) -5 (print x)",
+        "-\n  5\n(print 1)",
+        "- (x)",
+        "- - 5",
+        "(y = 2)\n-",
+        '(print "a ( b" /* ) ( */ "x    y")\n(define f (a) (- a 1))\n(f -2.5)',
+        "(if (> x -1) (print -1) (print 1e3))",
+    ]
+    for program in programs:
+        expected = parser.parse(program)
+        assert IncrementalDocument(program).statements() == expected, program
+        for chunk_size in (1, 2, 3, 7, 64):
+            forms = list(read_forms(io.StringIO(program), chunk_size))
+            statements = [node for form in forms for node in parser.parse_tokens(form.tokens)]
+            assert statements == expected, (program, chunk_size, forms)
+    assert parser.parse("-5") == [{"type": "number", "value": "-5"}]
+
+    # Un '-' suelto que pasa a ser el signo de un número, y al revés
+    document = IncrementalDocument("(a = 1)\n- (x)\n(print a)")
+    document.edit(10, 13, "5")
+    assert document.statements() == parser.parse(document.text), document.forms
+    document.edit(document.text.index("5"), document.text.index("5") + 1, "(y)")
+    assert document.statements() == parser.parse(document.text), document.forms
+
+    # Ediciones al azar: el resultado, o el error de sintaxis, debe coincidir siempre con el del parser
+    pieces = ["-", "5", "-5", " ", "\n", "(", ")", "(x = 1)", "(print -2)", '"', "/*", "*/", "(define f (a) (- a 1))"]
+    generator = random.Random(18)
+    document = IncrementalDocument()
+    for _ in range(3000):
+        start = generator.randint(0, len(document.text))
+        end = min(len(document.text), start + generator.choice((0, 0, 1, 2, 5)))
+        document.edit(start, end, generator.choice(pieces) if generator.random() < 0.7 else "")
+        assert parse_document(document) == parse_all(document.text), document.text
+        if len(document.text) > 300:
+            document.replace("")
+    print("OK: documento incremental y lectura por bloques coinciden con el parser, también con '-5' suelto")
+
+
+if __name__ == "__main__":
+    test_incremental()
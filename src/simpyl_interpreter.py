@@ -1,45 +1,294 @@
 import re  # Librería para manejar expresiones regulares
 import gc  # Gestión de memoria y recolección de basura
-import psutil  # Para obtener información sobre el uso de memoria y CPU
-import traceback  # Para capturar y mostrar trazas de errores
-import importlib  # Para importar módulos dinámicamente
-import ast  # Para evaluar expresiones de forma segura
-import json  # Para trabajar con estructuras de datos JSON (listas y diccionarios)
-import logging  # Para registrar errores sin mostrarlos en pantalla
-import pdb  # Depurador interactivo de Python
-import pytest  # Librería para pruebas unitarias
 import sys  # Para acceder a argumentos del sistema
+import os  # Para consultar el tamaño de los archivos
+import time  # Duración de las pausas del recolector
+# importlib, json, tracemalloc y asyncio se importan en las funciones que los usan, y la VM, la caché
+# de scripts, el perfilador y el optimizador al activar el motor o la opción que los necesita, para
+# que el arranque sólo cargue lo que necesita el primer comando
 
-# Configuración del sistema de logs
-logging.basicConfig(level=logging.ERROR, filename="simpyl.log", filemode="w")
+try:
+    from .lexer import TokenArray, lexer  # Importación dentro del paquete
+    from .simpyl_parser import SimpylParser
+    from .simpyl_compiler import (
+        BUILTINS, DEFAULT_MAX_DEPTH, UNBOUND, SimpylBudgetError, SimpylCompiler, SimpylRecursionError, node_lines,
+    )
+    from .simpyl_reader import read_forms
+    from .simpyl_memo import DEFAULT_MAX_BYTES, DEFAULT_MAX_ENTRIES, MemoCache, MemoizedFunction
+    from .simpyl_vector import SimpylVector, to_vector
+except ImportError:
+    from lexer import TokenArray, lexer  # Importación al ejecutar el archivo directamente
+    from simpyl_parser import SimpylParser
+    from simpyl_compiler import (
+        BUILTINS, DEFAULT_MAX_DEPTH, UNBOUND, SimpylBudgetError, SimpylCompiler, SimpylRecursionError, node_lines,
+    )
+    from simpyl_reader import read_forms
+    from simpyl_memo import DEFAULT_MAX_BYTES, DEFAULT_MAX_ENTRIES, MemoCache, MemoizedFunction
+    from simpyl_vector import SimpylVector, to_vector
+
+class ErrorLog:
+    """Registro de errores "simpyl". `logging` y `traceback` sólo se importan con el primer error, así que
+    importar el intérprete no escribe nada ni paga su coste: la línea de comandos llama a configure_logging
+    y las aplicaciones que lo integran configuran el registro "simpyl" de `logging` como cualquier otro."""
+
+    def __init__(self):
+        self.filename = None  # Archivo de configure_logging, abierto al registrar el primer error
+        self.logger = None
+
+    def error(self, message, exc_info=False):
+        if self.logger is None:
+            import logging
+            self.logger = logging.getLogger("simpyl")
+            self.logger.addHandler(logging.NullHandler())
+            if self.filename:
+                handler = logging.FileHandler(self.filename, encoding="utf-8")
+                handler.setFormatter(logging.Formatter(logging.BASIC_FORMAT))
+                self.logger.addHandler(handler)
+                self.logger.setLevel(logging.ERROR)
+        self.logger.error(message, exc_info=exc_info)
+
+
+logger = ErrorLog()
+
+
+def configure_logging(filename="simpyl.log"):
+    """Guarda los errores en `filename`, que se vacía al empezar, como hace la línea de comandos."""
+    open(filename, "w", encoding="utf-8").close()
+    logger.filename = filename
+
+
+def format_exc():
+    """format_exc() importando `traceback` sólo cuando hay un error que mostrar."""
+    import traceback
+    return traceback.format_exc()
+
+
+class SimpylMemoryError(MemoryError):
+    """El script superó el presupuesto de memoria configurado."""
+
+
+# Políticas del recolector de basura: "safe-points" deja automáticas las generaciones jóvenes, hace las
+# colecciones completas sólo en los puntos seguros y congela los objetos que sobreviven a ellas;
+# "python" deja el recolector automático de CPython
+GC_POLICIES = ("safe-points", "python")
+
+# Umbral de la generación 2 mientras las colecciones completas se hacen sólo en los puntos seguros
+NO_FULL_COLLECTION = 1 << 30
+
+
+def format_size(size):
+    """Tamaño en bytes como texto legible."""
+    if size < 1024 * 1024:
+        return f"{size / 1024:.1f} KB"
+    return f"{size / (1024 * 1024):.1f} MB"
+
+
+def resident_memory():
+    """Memoria residente del proceso en bytes, o None si el sistema no permite leerla.
+
+    En Linux se lee la actual de /proc; en otros sistemas con el módulo resource se usa la
+    máxima alcanzada, que sólo crece.
+    """
+    try:
+        with open("/proc/self/statm", "rb") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource  # No existe en Windows
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024  # macOS la da en bytes y Linux en KB
+
+
+SAMPLE_SIZE = 64  # Elementos medidos de cada lista o diccionario grande; el resto se extrapola
+MAX_SIZE_DEPTH = 8  # Niveles de anidamiento que se recorren al estimar un valor
+
+
+def value_size(value, depth=0):
+    """Estima los bytes de un valor de Simpyl, incluidos sus elementos.
+
+    De las colecciones grandes sólo se mide una muestra repartida a lo largo de la colección,
+    así que el coste no depende de su tamaño.
+    """
+    size = sys.getsizeof(value)
+    if isinstance(value, SimpylVector):
+        data = value.data
+        return size + (data.nbytes if hasattr(data, "nbytes") else value_size(data, depth + 1))
+    if depth >= MAX_SIZE_DEPTH:
+        return size
+    if isinstance(value, dict):
+        items = list(value.keys()) + list(value.values()) if len(value) <= SAMPLE_SIZE else None
+        if items is None:  # Muestra de claves y valores sin copiar el diccionario entero
+            step = len(value) // SAMPLE_SIZE
+            sample = [item for index, pair in enumerate(value.items()) if index % step == 0 for item in pair]
+            return size + int(sum(value_size(item, depth + 1) for item in sample) * len(value) * 2 / len(sample))
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        items = value if not isinstance(value, (set, frozenset)) else list(value)
+    else:
+        return size
+    if not items:
+        return size
+    step = max(1, len(items) // SAMPLE_SIZE)
+    sample = items[::step]
+    return size + int(sum(value_size(item, depth + 1) for item in sample) * len(items) / len(sample))
 
 
 class MemoryManager:
-    """Maneja la memoria y ejecuta la recolección de basura cuando el uso de memoria excede un umbral."""
-    
-    def __init__(self, threshold=100, check_interval=10):
-        self.memory_threshold = threshold  # Umbral de memoria en MB
-        self.check_interval = check_interval  # Frecuencia de chequeo en comandos ejecutados
+    """Controla la memoria del intérprete: presupuesto por script y política del recolector de basura.
 
-    def monitor_memory(self, command_count):
-        """Monitorea el uso de memoria y ejecuta la recolección de basura si es necesario."""
-        if command_count % self.check_interval == 0:
-            process = psutil.Process()
-            memory_usage = process.memory_info().rss / (1024 * 1024)
+    El uso es lo que ha crecido la memoria residente del proceso desde que empezó el script. Con
+    `trace=True` se usa tracemalloc, que mide todas las asignaciones de Python a costa de
+    ralentizar la ejecución; si el sistema no permite leer la memoria residente, se estima con
+    contadores de las variables globales y las cachés de memorización.
+    Las comprobaciones y las colecciones completas se hacen en puntos seguros: entre una forma y
+    la siguiente y, dentro de una forma, cada SAFE_POINT_STEPS vueltas de bucle y llamadas.
+    """
 
-            # Ajusta el umbral de recolección de basura dinámicamente
-            if memory_usage > self.memory_threshold:
-                print(f"Uso de memoria alto: {memory_usage:.2f} MB. Ejecutando recolección de basura.")
-                gc.collect()
-                gc.set_threshold(int(memory_usage * 0.8))  # Ajusta umbral dinámicamente
+    def __init__(self, limit=None, policy="safe-points", trace=False, thresholds=(10_000, 10, 10)):
+        if policy not in GC_POLICIES:
+            raise ValueError(f"Política de recolección desconocida '{policy}'. Opciones: {', '.join(GC_POLICIES)}")
+        self.limit = limit  # Presupuesto en bytes (None: sin límite)
+        self.policy = policy  # Política del recolector de basura
+        self.trace = trace  # Medir con tracemalloc en lugar de con la memoria residente
+        # Umbrales de las generaciones 0 y 1 del recolector automático y de la 2 en los puntos seguros
+        self.thresholds = thresholds
+        self.sizes = {}  # nombre de variable -> ((id del valor, longitud), bytes estimados)
+        self.owned = 0  # Bytes estimados de las variables globales
+        self.baseline = 0  # Memoria residente al empezar el script
+        self.current = 0  # Uso medido en el último punto seguro
+        self.peak = 0  # Uso máximo observado
+        self.collections = [0, 0, 0]  # Colecciones hechas en puntos seguros, por generación
+        self.pauses = []  # Duración en segundos de cada colección
+        self.started = False
+        self.gc_thresholds = None  # Umbrales del recolector antes de start
+        self.tracing = False  # tracemalloc lo inició start
+
+    def start(self):
+        """Aplica la política al empezar un script o una sesión interactiva; stop deshace exactamente estos cambios."""
+        if self.started:
+            return
+        self.started = True
+        self.tracing = False
+        if self.trace:
+            import tracemalloc  # Sólo se carga si se pide medir todas las asignaciones
+            if not tracemalloc.is_tracing():  # Si la aplicación ya lo usaba, no se detiene al terminar
+                tracemalloc.start()
+                self.tracing = True
+        if self.policy == "safe-points":
+            self.gc_thresholds = gc.get_threshold()
+            gc.collect()
+            gc.freeze()  # Los objetos del propio intérprete no vuelven a recorrerse
+            # Las generaciones jóvenes siguen recogiendo los ciclos de vida corta durante la ejecución;
+            # las colecciones completas, las que recorren todos los objetos, quedan para los puntos seguros
+            gc.set_threshold(self.thresholds[0], self.thresholds[1], NO_FULL_COLLECTION)
+        self.baseline = resident_memory() or 0
+
+    def stop(self):
+        """Restaura el recolector como estaba antes de start."""
+        if not self.started:
+            return
+        self.started = False
+        if self.policy == "safe-points":
+            gc.unfreeze()  # Lo congelado en start y en los puntos seguros vuelve a poder recogerse
+            gc.set_threshold(*self.gc_thresholds)
+        if self.tracing:
+            import tracemalloc
+            tracemalloc.stop()
+            self.tracing = False
+
+    def usage(self, variables, extra=0):
+        """Bytes usados por el script; `extra` suma otras estructuras del intérprete, como las cachés,
+        cuando el uso se estima con contadores."""
+        if self.trace:
+            import tracemalloc
+            return tracemalloc.get_traced_memory()[0]
+        resident = resident_memory()
+        if resident is not None:
+            return max(0, resident - self.baseline)
+        sizes = self.sizes
+        for name in [name for name in sizes if name not in variables]:  # Variables eliminadas
+            self.owned -= sizes.pop(name)[1]
+        for name, value in variables.items():
+            cached = sizes.get(name)
+            signature = (id(value), len(value) if hasattr(value, "__len__") else 0)
+            if cached is None or cached[0] != signature:
+                size = value_size(value)
+                self.owned += size - (cached[1] if cached else 0)
+                sizes[name] = (signature, size)
+        return self.owned + extra
+
+    def collect(self):
+        """Colección en un punto seguro: la completa, cuando toca según el umbral de la generación 2,
+        y las jóvenes si se acumularon, por ejemplo con el recolector automático desactivado."""
+        if self.policy != "safe-points":
+            return None
+        count = gc.get_count()
+        generation = None
+        for candidate in (2, 1, 0):
+            if count[candidate] > self.thresholds[candidate]:
+                generation = candidate
+                break
+        if generation is None:
+            return None
+        start = time.perf_counter()
+        gc.collect(generation)
+        if generation == 2:
+            gc.freeze()  # Lo que sobrevive a una colección completa es de larga vida
+        self.pauses.append(time.perf_counter() - start)
+        self.collections[generation] += 1
+        return generation
+
+    def reset(self):
+        """Olvida las mediciones del script anterior cuando el intérprete se reutiliza para otro."""
+        self.sizes.clear()
+        self.owned = self.current = self.peak = 0
+        if self.started:
+            if self.policy == "safe-points":
+                gc.unfreeze()  # Lo que el script anterior dejó congelado vuelve a poder recogerse
+            self.baseline = resident_memory() or 0
+
+    def safe_point(self, variables, extra=0):
+        """Recoge basura si toca y comprueba el presupuesto; lanza SimpylMemoryError si se supera."""
+        self.collect()
+        used = self.current = self.usage(variables, extra)
+        self.peak = max(self.peak, used)
+        if self.limit is not None and used > self.limit:
+            raise SimpylMemoryError(f"El script usa {format_size(used)} y el límite es {format_size(self.limit)}")
+
+    def stats(self):
+        """Resumen legible del uso de memoria y de las pausas del recolector."""
+        pauses = self.pauses
+        longest = max(pauses) * 1000 if pauses else 0.0
+        mode = "tracemalloc" if self.trace else "memoria residente" if resident_memory() is not None else "contadores"
+        limit = format_size(self.limit) if self.limit is not None else "sin límite"
+        return (f"Memoria ({mode}): {format_size(self.current)} en uso, máximo {format_size(self.peak)}, límite {limit}\n"
+                f"Recolector ({self.policy}): {sum(self.collections)} colecciones en puntos seguros "
+                f"(generaciones 0/1/2: {'/'.join(map(str, self.collections))}), pausa máxima {longest:.2f} ms")
+
+
+class DebuggerQuit(Exception):
+    """El usuario detuvo el programa desde el depurador."""
 
 
 class Debugger:
-    """Proporciona herramientas de depuración, como puntos de interrupción e inspección de variables."""
-    
+    """Proporciona herramientas de depuración, como puntos de interrupción e inspección de variables.
+
+    `line_table` asocia cada línea de una función de nivel superior con su definición, a partir
+    de las líneas que el lexer anota en el AST. Los compiladores preguntan a `wants` qué formas
+    necesitan su variante de depuración: sólo las que contienen un punto de interrupción llaman a
+    `hook` antes de cada forma, y el resto del programa se compila igual que sin depurador. Al
+    cambiar los puntos de interrupción el intérprete recompila únicamente las funciones afectadas.
+    """
+
     def __init__(self):
         self.debug_mode = False  # Estado del modo de depuración
         self.breakpoints = {}  # Diccionario de puntos de interrupción
+        self.watches = {}  # Variables globales vigiladas -> último valor visto
+        self.stepping = False  # Pausar en la siguiente forma instrumentada o declaración
+        self.line_table = {}  # Línea -> definición de la función de nivel superior que la contiene
+        self.input = input  # Lectura de las órdenes durante una pausa
 
     def enable_debug(self):
         self.debug_mode = True
@@ -47,6 +296,7 @@ class Debugger:
 
     def disable_debug(self):
         self.debug_mode = False
+        self.stepping = False
         print("Modo de depuración deshabilitado.")
 
     def add_breakpoint(self, line):
@@ -65,30 +315,166 @@ class Debugger:
         else:
             print(f"Variable '{var_name}' no encontrada.")
 
+    @property
+    def active(self):
+        """Indica si las declaraciones de nivel superior deben ejecutarse una a una para pausar entre ellas."""
+        return self.debug_mode and (self.stepping or bool(self.watches))
+
+    def register(self, node):
+        """Añade a la tabla de líneas una definición de función de nivel superior."""
+        for line in node_lines(node):
+            self.line_table[line] = node
+
+    def wants(self, node):
+        """Indica si un nodo contiene un punto de interrupción y debe compilarse en su variante de depuración."""
+        return self.debug_mode and bool(self.breakpoints) and not self.breakpoints.keys().isdisjoint(node_lines(node))
+
+    def hook(self, line, names, values, read_global):
+        """Llamada desde la variante de depuración antes de evaluar la forma de la línea `line`.
+
+        `names` asigna a cada variable local su posición en `values`; `read_global` lee las globales.
+        """
+        if self.stepping or line in self.breakpoints:
+            self.stepping = False
+            self.pause(line, names, values, read_global)
+        elif self.watches:
+            self.check_watches(line, read_global)
+
+    def watch(self, name, read_global):
+        self.watches[name] = read_global(name)
+        print(f"Vigilando la variable '{name}'.")
+
+    def unwatch(self, name):
+        if self.watches.pop(name, UNBOUND) is not UNBOUND:
+            print(f"La variable '{name}' ya no se vigila.")
+
+    def check_watches(self, line, read_global):
+        """Pausa si alguna variable vigilada cambió de valor desde la última comprobación."""
+        changed = []
+        for name, old in self.watches.items():
+            new = read_global(name)
+            try:
+                different = bool(new != old)
+            except (TypeError, ValueError):  # Los vectores se comparan elemento a elemento
+                different = new is not old
+            if different:
+                self.watches[name] = new
+                changed.append(f"{name}: {old} -> {new}")
+        if changed:
+            print(f"Cambio en la línea {line}: " + ", ".join(changed))
+            self.pause(line, {}, (), read_global)
+
+    def pause(self, line, names, values, read_global):
+        """Detiene la ejecución y atiende órdenes hasta que el usuario continúa."""
+        local_values = {name: values[index] for name, index in names.items()
+                        if index < len(values) and values[index] is not UNBOUND}
+        print(f"Pausa en la línea {line}. Órdenes: c(ontinuar), s (paso), p nombre, l (locales), w nombre, q (salir)")
+        while True:
+            try:
+                command = self.input("(depuración) ").strip()
+            except EOFError:
+                return  # Sin entrada interactiva se continúa
+            name = command.partition(" ")[2].strip()
+            if command in ("c", "continuar", ""):
+                return
+            if command in ("s", "paso"):
+                self.stepping = True
+                return
+            if command in ("q", "salir"):
+                raise DebuggerQuit(f"Ejecución detenida en la línea {line}.")
+            if command in ("l", "locales"):
+                print(", ".join(f"{key} = {value}" for key, value in local_values.items()) or "Sin variables locales.")
+            elif command.startswith("p ") and name:
+                value = local_values[name] if name in local_values else read_global(name)
+                print(f"{name} = {value}")
+            elif command.startswith("w ") and name:
+                self.watch(name, read_global)
+            else:
+                print("Órdenes: c(ontinuar), s (paso), p nombre, l (locales), w nombre, q (salir)")
+
 
 class FunctionManager:
     """Maneja la definición y almacenamiento de funciones dentro del intérprete."""
     
     def __init__(self):
         self.functions = {}  # Diccionario de funciones definidas por el usuario
+        self.sources = {}  # Código Python de cada función, para guardarlo en las instantáneas
+        # Espacio de nombres propio para el código de las funciones: no se mezclan con los globales del módulo
+        # ni con las funciones de otros intérpretes
+        self.namespace = {"__builtins__": dict(BUILTINS)}
 
-    def define_function(self, command):
-        """Define una función en Simpyl y la almacena en el entorno global."""
+    def define_function(self, command, strict=False):
+        """Define una función en Simpyl y la almacena en el entorno global.
+
+        Con `strict`, los errores se lanzan en lugar de devolverse como mensaje.
+        """
         try:
-            match = re.match(r'\(define \((\w+) (\((.*?)\))\)\s*(.*?)\)', command)
+            match = re.match(r'\(define \((\w+) (\((.*?)\))\)\s*(.*)\)$', command)  # El cuerpo llega hasta el último paréntesis
             if not match:
+                if strict:
+                    raise SyntaxError(f"Error de sintaxis en la definición de la función: {command}")
                 return "Error de sintaxis en la definición de la función. Asegúrese de que la sintaxis sea correcta."
 
             func_name, params, param_list, body = match.groups()
             param_list = [p.strip() for p in param_list.split()] if param_list else []
             function_code = f"def {func_name}({', '.join(param_list)}):\n    {body}"
 
-            exec(function_code, globals())  # Ejecuta y almacena la función en el entorno global
-            self.functions[func_name] = function_code
+            exec(function_code, self.namespace)  # Ejecuta la definición en el espacio de nombres del intérprete
+            self.functions[func_name] = self.namespace[func_name]
+            self.sources[func_name] = function_code
             return f"Función '{func_name}' definida correctamente."
         except Exception as e:
-            logging.error(f"Error al definir la función: {command}\n{e}", exc_info=True)
-            return f"Error al definir la función: {traceback.format_exc()}"
+            if strict:
+                raise
+            logger.error(f"Error al definir la función: {command}\n{e}", exc_info=True)
+            return f"Error al definir la función: {format_exc()}"
+
+
+class MemoManager:
+    """Maneja las cachés de resultados de las funciones definidas con 'define-memo'."""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_entries = max_entries  # Límite de entradas de cada función
+        self.max_bytes = max_bytes  # Límite de bytes estimados de cada función
+        self.caches = {}  # nombre de función -> MemoCache
+        self.keep = False  # Reutilizar la caché existente al recompilar la misma definición
+
+    def wrap(self, name, function):
+        """Envuelve una función pura; al redefinirla se descartan los resultados de la versión anterior.
+
+        Con `keep` se conserva la caché que ya tuviera: el depurador recompila la misma definición
+        para añadirle o quitarle sus puntos de interrupción y los resultados guardados siguen valiendo.
+        """
+        cache = self.caches.get(name) if self.keep else None
+        if cache is None:
+            cache = self.caches[name] = MemoCache(self.max_entries, self.max_bytes)
+        return MemoizedFunction(name, function, cache)
+
+    def size(self):
+        """Bytes estimados de todas las cachés."""
+        return sum(cache.size for cache in self.caches.values())
+
+    def stats(self):
+        """Devuelve un resumen legible del uso de cada caché."""
+        if not self.caches:
+            return "No hay funciones memorizadas."
+        lines = []
+        for name, cache in self.caches.items():
+            stats = cache.stats()
+            lines.append(f"{name}: {stats['entries']} entradas, {stats['bytes']} bytes, "
+                         f"{stats['hits']} aciertos, {stats['misses']} fallos, {stats['evictions']} expulsiones")
+        return "\n".join(lines)
+
+    def clear(self, name=None):
+        """Vacía la caché de una función o, sin nombre, la de todas."""
+        if name is None:
+            for cache in self.caches.values():
+                cache.clear()
+            return "Cachés de memorización vaciadas."
+        if name not in self.caches:
+            return f"La función '{name}' no está memorizada."
+        self.caches[name].clear()
+        return f"Caché de '{name}' vaciada."
 
 
 class ModuleManager:
@@ -100,27 +486,115 @@ class ModuleManager:
     def load_module(self, module_name):
         """Importa dinámicamente un módulo si está disponible."""
         try:
+            import importlib  # Sólo lo necesita (import)
             module = importlib.import_module(module_name)
             self.loaded_modules[module_name] = module
             print(f"Módulo '{module_name}' cargado con éxito.")
         except ModuleNotFoundError:
-            logging.error(f"Error: El módulo '{module_name}' no se encuentra.")
+            logger.error(f"Error: El módulo '{module_name}' no se encuentra.")
             return f"Error: El módulo '{module_name}' no se encuentra."
         except Exception as e:
-            logging.error(f"Error al cargar el módulo '{module_name}': {e}", exc_info=True)
-            return f"Error al cargar el módulo '{module_name}': {traceback.format_exc()}"
+            logger.error(f"Error al cargar el módulo '{module_name}': {e}", exc_info=True)
+            return f"Error al cargar el módulo '{module_name}': {format_exc()}"
+
+
+# Motores de ejecución disponibles: "regex" despacha cada comando con expresiones regulares y eval,
+# "closure" compila el AST de SimpylParser una sola vez en closures de Python y
+# "vm" lo traduce a bytecode de registros que ejecuta SimpylVM
+ENGINES = ("regex", "closure", "vm")
+
+# Comandos del intérprete que se atienden igual en todos los motores
+META_COMMAND = re.compile(r'\((import|inspect|enable-debug|disable-debug|add-breakpoint|remove-breakpoint|watch|unwatch|step|'
+                          r'memo-stats|memo-clear|'
+                          r'enable-profile|disable-profile|profile-report|profile-dump|memory-stats)\b')
+
+SNAPSHOT_MAGIC = b"SPYS\x01"  # Cabecera de los archivos de instantánea
+
+# Pasos (saltos y llamadas) que run_async ejecuta antes de ceder el control al bucle de eventos
+SLICE_STEPS = 1_000
+
+# Con caché activa, los archivos menores que este tamaño se cargan enteros para aprovecharla;
+# los mayores se leen forma a forma con memoria constante
+STREAMING_THRESHOLD = 1 << 20
+
+
+def check_max_depth(engine, max_depth):
+    """Lanza ValueError si se pide una profundidad máxima a un motor que no puede aplicarla."""
+    if max_depth is not None and engine != "vm":
+        raise ValueError(f"--max-depth sólo se aplica al motor vm: el motor {engine} anida las llamadas "
+                         f"que no están en posición de cola en la pila de Python, limitada por sys.getrecursionlimit()")
 
 
 class SimpylInterpreter:
     """Interpreta y ejecuta comandos del lenguaje Simpyl."""
     
-    def __init__(self):
+    def __init__(self, engine="regex", cache=None, max_depth=None, memory=None, optimize=False):
+        if engine not in ENGINES:
+            raise ValueError(f"Motor desconocido '{engine}'. Opciones: {', '.join(ENGINES)}")
+        check_max_depth(engine, max_depth)
+        self.engine = engine  # Motor de ejecución seleccionado
         self.variables = {}  # Diccionario de variables
-        self.memory_manager = MemoryManager()
+        self.memory_manager = memory or MemoryManager()  # Presupuesto de memoria y política del recolector
         self.debugger = Debugger()
         self.function_manager = FunctionManager()
         self.module_manager = ModuleManager()
+        self.memo_manager = MemoManager()
+        self.profiler = None  # Profiler, creado con (enable-profile) o --profile
+        self.optimizer = None  # SimpylOptimizer, sólo con --optimize
+        if optimize:
+            try:
+                from .simpyl_optimizer import SimpylOptimizer
+            except ImportError:
+                from simpyl_optimizer import SimpylOptimizer
+            self.optimizer = SimpylOptimizer()
+        self.parser = SimpylParser(lexer)
+        self.compiler = SimpylCompiler(self.variables, self.function_manager.functions,
+                                       memo=self.memo_manager.wrap, debugger=self.debugger,
+                                       safe_point=self.check_memory)
+        self.max_depth = max_depth if max_depth is not None else DEFAULT_MAX_DEPTH  # Llamadas anidadas permitidas en la VM
+        self.virtual_machine = None  # SimpylVM, creada la primera vez que se usa self.vm
+        self.script_cache = cache  # ScriptCache opcional con el AST de los scripts ya analizados
         self.command_count = 0  # Contador de comandos ejecutados
+        self.definitions = {}  # Nombre -> AST de las funciones definidas en el nivel superior, para las instantáneas
+        self.strict = False  # Los comandos del motor regex lanzan sus errores en lugar de devolver el mensaje
+
+    @property
+    def vm(self):
+        """Máquina virtual del motor vm; se importa y se crea la primera vez que se usa."""
+        if self.virtual_machine is None:
+            try:
+                from .simpyl_vm import SimpylVM
+            except ImportError:
+                from simpyl_vm import SimpylVM
+            self.virtual_machine = SimpylVM(self.variables, max_depth=self.max_depth, memo=self.memo_manager.wrap,
+                                            profiler=self.profiler, debugger=self.debugger,
+                                            safe_point=self.check_memory)
+        return self.virtual_machine
+
+    @property
+    def profiling(self):
+        """Indica si el código que se compile ahora debe medirse."""
+        return self.profiler is not None and self.profiler.enabled
+
+    def reset(self):
+        """Vuelve al estado inicial para ejecutar otro script en el mismo proceso sin repetir el arranque.
+
+        Se conservan la configuración, la caché de scripts y los módulos ya importados.
+        """
+        self.variables.clear()  # El compilador y la VM comparten este diccionario
+        self.function_manager.functions.clear()
+        self.function_manager.sources.clear()
+        self.definitions.clear()
+        if self.optimizer is not None:
+            self.optimizer.clear()
+        self.function_manager.namespace = {"__builtins__": dict(BUILTINS)}
+        self.memo_manager.caches.clear()
+        if self.profiler is not None:
+            self.profiler.clear()
+        if self.virtual_machine is not None:
+            self.virtual_machine.reset()
+        self.memory_manager.reset()
+        self.command_count = 0
 
     def execute_command(self, command):
         """Ejecuta un comando ingresado por el usuario."""
@@ -129,68 +603,454 @@ class SimpylInterpreter:
             if command.startswith("(import"):
                 module_name = command.split('("')[1].rstrip('")')
                 return self.module_manager.load_module(module_name)
-            elif command.startswith("(define ("):
-                return self.function_manager.define_function(command)
-            elif re.match(r'\(define \w+', command):
-                return self.handle_variable_assignment(command)
-            elif command.startswith("(print"):
-                return self.handle_print(command)
-            elif re.match(r'\(if ', command):
-                return self.handle_conditional(command)
             elif re.match(r'\(inspect ', command):
                 return self.handle_inspect(command)
             elif command.startswith("(enable-debug)"):
                 self.debugger.enable_debug()
+                self.patch_functions(self.debugger.breakpoints)
             elif command.startswith("(disable-debug)"):
                 self.debugger.disable_debug()
+                self.patch_functions(self.debugger.breakpoints)
             elif re.match(r'\(add-breakpoint ', command):
                 line = re.findall(r'\d+', command)[0]
                 self.debugger.add_breakpoint(int(line))
+                self.patch_functions([int(line)])
             elif re.match(r'\(remove-breakpoint ', command):
                 line = re.findall(r'\d+', command)[0]
                 self.debugger.remove_breakpoint(int(line))
+                self.patch_functions([int(line)])
+            elif re.match(r'\(watch ', command):
+                self.debugger.watch(re.match(r'\(watch (\w+)\)', command).group(1), self.read_global)
+            elif re.match(r'\(unwatch ', command):
+                self.debugger.unwatch(re.match(r'\(unwatch (\w+)\)', command).group(1))
+            elif command.startswith("(step)"):
+                if not self.debugger.debug_mode:
+                    return "Active primero el modo de depuración con (enable-debug)."
+                self.debugger.stepping = True
+                return "Se pausará antes de la siguiente declaración."
+            elif command.startswith("(enable-profile)"):
+                return self.enable_profile()
+            elif command.startswith("(disable-profile)"):
+                if self.profiler is not None:
+                    self.profiler.enabled = False
+                return "Perfilado deshabilitado para el código nuevo."
+            elif command.startswith("(profile-report)"):
+                return self.profiler.report() if self.profiler is not None else "No hay datos de perfilado."
+            elif re.match(r'\(profile-dump ', command):
+                if self.profiler is None:
+                    return "No hay datos de perfilado."
+                path = re.match(r'\(profile-dump "(.*?)"\)', command).group(1)
+                self.profiler.write_collapsed(path)
+                return f"Pilas colapsadas guardadas en '{path}'."
+            elif command.startswith("(memory-stats)"):
+                return self.memory_manager.stats()
+            elif command.startswith("(memo-stats)"):
+                return self.memo_manager.stats()
+            elif re.match(r'\(memo-clear\b', command):
+                match = re.match(r'\(memo-clear\s+(\w+)\s*\)', command)
+                return self.memo_manager.clear(match.group(1) if match else None)
+            elif self.engine != "regex":
+                return self.run_source(command)
+            elif command.startswith("(define ("):
+                return self.function_manager.define_function(command, strict=self.strict)
+            elif re.match(r'\(define \w+', command):
+                return self.handle_variable_assignment(command)
+            elif command.startswith("(print"):
+                return self.handle_print(command)
+            elif re.match(r'\(if ', command):
+                return self.handle_conditional(command)
+            elif self.strict:
+                raise SyntaxError(f"Comando no reconocido: {command}")
             else:
                 return "Comando no reconocido. Por favor, revise la sintaxis."
+        except DebuggerQuit as e:
+            return str(e)
+        except SimpylMemoryError:
+            raise
+        except Exception as e:
+            if self.strict:
+                raise
+            logger.error(f"Error al ejecutar comando: {command}\n{e}", exc_info=True)
+            return f"Error al ejecutar el comando: {format_exc()}"
+
+    def run_source(self, code, path=None):
+        """Analiza y compila un programa completo una sola vez y lo ejecuta con el motor seleccionado.
+
+        Si el intérprete tiene una caché de scripts, el AST se toma de ella. `path` indica el archivo
+        de origen para guardar la caché junto a él. Devuelve el valor de la última forma de nivel superior.
+        """
+        try:
+            return self.execute_source(code, path)
+        except (DebuggerQuit, SimpylMemoryError):  # La memoria se controla en el punto seguro que llamó run_file
+            raise
+        except RecursionError as e:
+            logger.error(f"Recursión demasiado profunda al ejecutar el programa: {e}")
+            return self.describe_recursion_error(e)
+        except Exception as e:
+            logger.error(f"Error al ejecutar el programa:\n{code}\n{e}", exc_info=True)
+            return f"Error al ejecutar el programa: {format_exc()}"
+
+    def execute_source(self, code, path=None):
+        """Ejecuta un programa completo y devuelve el valor de la última forma; los errores se propagan.
+
+        Con el motor regex, el programa se ejecuta línea a línea en modo estricto: un comando
+        que falla o que no se reconoce lanza su excepción en lugar de devolver el mensaje.
+        """
+        if self.engine != "regex":
+            return self.execute_statements(self.load_statements(code, path))
+        strict, self.strict = self.strict, True
+        try:
+            result = None
+            for line in code.splitlines():
+                if line.strip():
+                    result = self.execute_command(line)
+            return result
+        finally:
+            self.strict = strict
+
+    def load_statements(self, code, path=None):
+        """Analiza un programa o toma su AST de la caché de scripts."""
+        if self.script_cache is not None:
+            return self.script_cache.load(code, path)
+        return self.parser.parse(code)
+
+    async def run_async(self, code, budget=None, timeout=None, slice_steps=SLICE_STEPS, path=None):
+        """Versión asíncrona de run_source para ejecutar scripts dentro de un bucle de asyncio.
+
+        El programa se ejecuta en la VM por tramos de `slice_steps` pasos (cada salto y cada
+        llamada es un paso) y cede el control al bucle de eventos entre un tramo y otro, así que
+        varios scripts pueden compartir el proceso aunque alguno no termine nunca. Con `budget`
+        (pasos) o `timeout` (segundos de reloj) el script se cancela con SimpylBudgetError al
+        superarlos. Las funciones llamadas desde map, filter o reduce no pueden ceder el control,
+        pero sus pasos se descuentan del mismo presupuesto y también se cancelan al vencer el
+        tiempo. El resultado y los mensajes de error son los mismos que los de run_source.
+        """
+        if self.engine != "vm":
+            raise ValueError("run_async necesita el motor vm (engine='vm')")
+        import asyncio  # Sólo lo necesitan las aplicaciones que integran el intérprete en un bucle de eventos
+        try:
+            from .simpyl_vm import Suspension
+        except ImportError:
+            from simpyl_vm import Suspension
+        self.vm.limit(budget, timeout, slice_steps)
+        try:
+            statements = self.load_statements(code, path)
+            self.register_definitions(statements)
+            statements = self.optimize(statements)
+            state = self.vm.start(self.vm.compile(statements))
+            while True:
+                result = self.vm.resume(state, slice_steps)  # Lanza SimpylBudgetError al superar los límites
+                if result.__class__ is not Suspension:
+                    return result
+                state = result
+                await asyncio.sleep(0)  # Deja avanzar a las demás tareas
+        except (SimpylBudgetError, SimpylMemoryError, DebuggerQuit):
+            raise
+        except RecursionError as e:
+            logger.error(f"Recursión demasiado profunda al ejecutar el programa: {e}")
+            return self.describe_recursion_error(e)
         except Exception as e:
-            logging.error(f"Error al ejecutar comando: {command}\n{e}", exc_info=True)
-            return f"Error al ejecutar el comando: {traceback.format_exc()}"
+            logger.error(f"Error al ejecutar el programa:\n{code}\n{e}", exc_info=True)
+            return f"Error al ejecutar el programa: {format_exc()}"
+        finally:
+            self.vm.limit()
+            self.forget_temporaries()
+
+    def save_snapshot(self, path):
+        """Guarda el estado preparado del intérprete para restaurarlo en otro proceso con load_snapshot.
+
+        Se guardan el AST de las funciones de nivel superior (no hace falta volver a analizarlas),
+        el código de las funciones del motor regex, los módulos cargados con (import) y las
+        variables globales que pueden serializarse.
+        """
+        import pickle  # Sólo se necesita para las instantáneas
+        try:
+            from .simpyl_cache import interpreter_version
+        except ImportError:
+            from simpyl_cache import interpreter_version
+        variables = {}
+        for name, value in self.variables.items():
+            try:
+                pickle.dumps(value)
+            except Exception:
+                continue  # Funciones y otros valores que no pueden guardarse
+            variables[name] = value
+        snapshot = {
+            "version": interpreter_version(),
+            "definitions": list(self.definitions.values()),
+            "sources": dict(self.function_manager.sources),
+            "modules": list(self.module_manager.loaded_modules),
+            "variables": variables,
+        }
+        with open(path, "wb") as file:
+            file.write(SNAPSHOT_MAGIC)
+            pickle.dump(snapshot, file, protocol=pickle.HIGHEST_PROTOCOL)
+        return f"Instantánea guardada en '{path}' ({len(snapshot['definitions']) + len(snapshot['sources'])} funciones)."
+
+    def load_snapshot(self, path):
+        """Restaura una instantánea de save_snapshot sin volver a analizar ni a ejecutar el preludio.
+
+        La instantánea se lee con pickle: sólo deben cargarse archivos de confianza.
+        """
+        import pickle
+        try:
+            from .simpyl_cache import interpreter_version
+        except ImportError:
+            from simpyl_cache import interpreter_version
+        with open(path, "rb") as file:
+            if file.read(len(SNAPSHOT_MAGIC)) != SNAPSHOT_MAGIC:
+                raise ValueError(f"'{path}' no es una instantánea de Simpyl")
+            snapshot = pickle.load(file)
+        if snapshot["version"] != interpreter_version():
+            raise ValueError(f"La instantánea '{path}' es de la versión {snapshot['version']} del intérprete")
+        if snapshot["modules"]:
+            import importlib
+            for module_name in snapshot["modules"]:
+                self.module_manager.loaded_modules[module_name] = importlib.import_module(module_name)
+        self.variables.update(snapshot["variables"])
+        for name, function_code in snapshot["sources"].items():
+            exec(function_code, self.function_manager.namespace)
+            self.function_manager.functions[name] = self.function_manager.namespace[name]
+            self.function_manager.sources[name] = function_code
+        if self.engine != "regex" and snapshot["definitions"]:
+            self.execute_statements(snapshot["definitions"])  # Sólo compila y registra las funciones
+
+    def enable_profile(self):
+        """Activa el perfilado del código que se compile a partir de ahora."""
+        if self.engine == "regex":
+            return "El perfilador necesita el motor closure o vm (--engine)."
+        if self.profiler is None:
+            try:
+                from .simpyl_profiler import Profiler
+            except ImportError:
+                from simpyl_profiler import Profiler
+            self.profiler = self.compiler.profiler = Profiler()
+            if self.virtual_machine is not None:
+                self.virtual_machine.profiler = self.profiler
+        self.profiler.enabled = True
+        return "Perfilado habilitado."
+
+    def execute_statements(self, statements):
+        """Compila y ejecuta declaraciones ya analizadas con el motor seleccionado; los errores se propagan."""
+        self.register_definitions(statements)
+        statements = self.optimize(statements)
+        try:
+            if self.debugger.active:
+                return self.execute_debug(statements)
+            if self.profiling:
+                return self.execute_profiled(statements)
+            if self.engine == "vm":
+                return self.vm.execute(self.vm.compile(statements))
+            result = None
+            for form in self.compiler.compile_program(statements):
+                result = form(None)  # El nivel superior no tiene marco local
+            return result
+        finally:
+            self.forget_temporaries()
+
+    def register_definitions(self, statements):
+        """Guarda las funciones de nivel superior, tal como se escribieron, para las instantáneas y el depurador."""
+        for statement in statements:
+            if statement["type"] == "function_definition":
+                self.definitions[statement["name"]] = statement
+                self.debugger.register(statement)
+
+    def forget_temporaries(self):
+        """Borra las variables globales que el optimizador creó para los bucles de nivel superior."""
+        names = self.optimizer.global_temps if self.optimizer is not None else None
+        if names:
+            for name in names:
+                self.variables.pop(name, None)
+            if self.engine == "vm":
+                self.vm.forget_globals(names)
+            self.optimizer.global_temps = []
+
+    def optimize(self, statements):
+        """Optimiza las declaraciones antes de compilarlas. Con el perfilador o el depurador activos
+        no se optimiza, para que los informes y las pausas correspondan al programa tal como se escribió,
+        pero las funciones que copiaron una función que se redefine se compilan de nuevo igualmente."""
+        if self.optimizer is None:
+            return statements
+        if self.profiling or self.debugger.debug_mode:
+            return self.optimizer.invalidate(statements) + statements
+        return self.optimizer.optimize(statements)
+
+    def execute_profiled(self, statements):
+        """Ejecuta cada declaración de nivel superior por separado midiéndola como una forma."""
+        try:
+            from .simpyl_profiler import form_label
+        except ImportError:
+            from simpyl_profiler import form_label
+        result = None
+        for statement in statements:
+            depth = len(self.profiler.stack)
+            self.profiler.enter((form_label(statement), statement.get("line")))
+            try:
+                if self.engine == "vm":
+                    result = self.vm.execute(self.vm.compile([statement]))
+                else:
+                    result = self.compiler.compile_statement(statement)(None)
+            finally:
+                self.profiler.exit_to(depth)  # También cierra las funciones interrumpidas por un error
+        return result
+
+    def execute_debug(self, statements):
+        """Ejecuta cada declaración de nivel superior por separado para pausar entre ellas
+        al ir paso a paso o cuando cambia una variable vigilada."""
+        result = None
+        for statement in statements:
+            line = statement.get("line")
+            if self.debugger.stepping and not self.debugger.wants(statement):
+                self.debugger.stepping = False  # Las declaraciones instrumentadas pausan en su propio hook
+                self.debugger.pause(line, {}, (), self.read_global)
+            if self.engine == "vm":
+                result = self.vm.execute(self.vm.compile([statement]))
+            else:
+                result = self.compiler.compile_statement(statement)(None)
+            if self.debugger.watches:
+                self.debugger.check_watches(line, self.read_global)
+        return result
+
+    def read_global(self, name):
+        """Valor actual de una variable global, también mientras la VM está ejecutando."""
+        if self.engine == "vm":
+            return self.vm.read_global(name)
+        return self.variables.get(name)
+
+    def patch_functions(self, lines):
+        """Vuelve a definir las funciones que contienen alguna de las líneas para que pasen a su
+        variante de depuración, o vuelvan a la normal, sin tocar el resto del programa."""
+        if self.engine == "regex":
+            return
+        definitions = {}
+        for line in lines:
+            node = self.debugger.line_table.get(line)
+            if node is not None:
+                definitions[id(node)] = node
+        self.memo_manager.keep = True  # La definición no cambia: sus resultados memorizados se conservan
+        try:
+            for node in definitions.values():
+                if self.engine == "vm":
+                    self.vm.execute(self.vm.compile([node]))
+                else:
+                    self.compiler.compile_statement(node)(None)
+        finally:
+            self.memo_manager.keep = False
+
+    def execute_form(self, form):
+        """Ejecuta una forma leída por read_forms y devuelve el mensaje que deba mostrarse."""
+        if META_COMMAND.match(form.text):
+            text = form.text if "\n" not in form.text else " ".join(form.text.split())
+            return self.execute_command(text)  # Los comandos del intérprete se escriben en una sola línea
+        try:
+            self.execute_statements(self.parser.parse_tokens(form.tokens))
+        except (DebuggerQuit, SimpylMemoryError):
+            raise
+        except Exception as e:
+            return self.form_error(e, form.line, form.text)
+
+    def execute_line(self, command, line):
+        """Ejecuta una entrada del modo interactivo con sus tokens numerados como la línea `line`,
+        para que cada entrada tenga su propia línea en los puntos de interrupción y los mensajes."""
+        command = command.strip()
+        if self.engine == "regex" or META_COMMAND.match(command):
+            return self.execute_command(command)
+        try:
+            return self.execute_statements(self.parser.parse_tokens(TokenArray.from_source(command, line)))
+        except DebuggerQuit as e:
+            return str(e)
+        except SimpylMemoryError:
+            raise
+        except Exception as e:
+            return self.form_error(e, line, command)
+
+    def execute_statement(self, statement):
+        """Ejecuta una declaración de nivel superior ya analizada, con los mismos mensajes de error que execute_form."""
+        try:
+            self.execute_statements([statement])
+        except (DebuggerQuit, SimpylMemoryError):
+            raise
+        except Exception as e:
+            return self.form_error(e, statement.get("line"), statement["type"])
+
+    def form_error(self, error, line, text):
+        """Registra el error de una forma de nivel superior y devuelve su mensaje; se llama desde el bloque except."""
+        if isinstance(error, RecursionError):
+            logger.error(f"Recursión demasiado profunda en la forma de la línea {line}: {error}")
+            return f"Error en la forma de la línea {line}: {self.describe_recursion_error(error)}"
+        logger.error(f"Error en la forma de la línea {line}: {text}\n{error}", exc_info=True)
+        return f"Error en la forma de la línea {line}: {format_exc()}"
+
+    def load_cached(self, code, path):
+        """Declaraciones de un archivo tomadas de la caché de scripts, o None si debe leerse forma a forma:
+        si tiene comandos del intérprete o un error de sintaxis, que sólo debe afectar a su forma."""
+        if META_COMMAND.search(code):
+            return None
+        try:
+            return self.load_statements(code, path)
+        except Exception:
+            return None
+
+    def describe_recursion_error(self, error):
+        """Mensaje para una recursión demasiado profunda, sin la traza de miles de marcos."""
+        if isinstance(error, SimpylRecursionError):
+            return f"Error de recursión: {error}"
+        # El motor de closures usa la pila de Python en las llamadas que no están en posición de cola
+        return ("Error de recursión: se agotó la pila de Python. Escriba la recursión en posición de cola "
+                "o use --engine vm, cuya profundidad sólo limita --max-depth.")
 
     def handle_variable_assignment(self, command):
         """Maneja la asignación de variables."""
         try:
-            var_name, expression = re.match(r'\(define (\w+) (.*?)\)', command).groups()
+            var_name, expression = re.match(r'\(define (\w+) (.*)\)$', command).groups()
             value = self.evaluate_expression(expression)
             self.variables[var_name] = value
             return f"{var_name} asignado con valor {value}"
         except Exception as e:
-            logging.error(f"Error en asignación de variable: {command}\n{e}", exc_info=True)
-            return f"Error al asignar variable: {traceback.format_exc()}"
+            if self.strict:
+                raise
+            logger.error(f"Error en asignación de variable: {command}\n{e}", exc_info=True)
+            return f"Error al asignar variable: {format_exc()}"
 
     def evaluate_expression(self, expression):
         """Evalúa una expresión matemática o lógica de forma segura."""
         try:
             if expression.startswith("[") or expression.startswith("{"):
-                return json.loads(expression)  # Soporte para listas y diccionarios
-            return eval(expression, {"__builtins__": None}, self.variables)
+                import json  # Sólo lo necesitan los literales de listas y diccionarios
+            if expression.startswith("["):
+                value = json.loads(expression)
+                try:
+                    return to_vector(value)  # Las listas de números son vectores
+                except TypeError:
+                    return value  # Listas con otros valores
+            if expression.startswith("{"):
+                return json.loads(expression)  # Soporte para diccionarios
+            return eval(expression, self.function_manager.namespace, self.variables)
         except Exception as e:
-            logging.error(f"Error al evaluar expresión: {expression}\n{e}", exc_info=True)
-            return f"Expresión inválida: {traceback.format_exc()}"
+            if self.strict:
+                raise
+            logger.error(f"Error al evaluar expresión: {expression}\n{e}", exc_info=True)
+            return f"Expresión inválida: {format_exc()}"
 
     def handle_print(self, command):
         """Maneja el comando print."""
         try:
-            expression = re.match(r'\(print \((.*?)\)\)', command).groups()[0]
+            expression = re.match(r'\(print \((.*)\)\)$', command).groups()[0]
             value = self.evaluate_expression(expression)
             print(value)
         except Exception as e:
-            logging.error(f"Error en comando print: {command}\n{e}", exc_info=True)
-            return f"Error en comando print: {traceback.format_exc()}"
+            if self.strict:
+                raise
+            logger.error(f"Error en comando print: {command}\n{e}", exc_info=True)
+            return f"Error en comando print: {format_exc()}"
 
     def handle_conditional(self, command):
         """Maneja la estructura condicional if-else."""
         try:
             match = re.match(r'\(if \((.*?)\)\s*\((.*?)\)\s*\((.*?)\)\)', command)
             if not match:
+                if self.strict:
+                    raise SyntaxError(f"Error de sintaxis en la declaración if-else: {command}")
                 return "Error de sintaxis en la declaración if-else."
 
             condition, then_expr, else_expr = match.groups()
@@ -199,8 +1059,10 @@ class SimpylInterpreter:
             else:
                 return self.evaluate_expression(else_expr)
         except Exception as e:
-            logging.error(f"Error en la declaración if-else: {command}\n{e}", exc_info=True)
-            return f"Error en la declaración if-else: {traceback.format_exc()}"
+            if self.strict:
+                raise
+            logger.error(f"Error en la declaración if-else: {command}\n{e}", exc_info=True)
+            return f"Error en la declaración if-else: {format_exc()}"
 
     def handle_inspect(self, command):
         """Maneja el comando inspect."""
@@ -208,51 +1070,223 @@ class SimpylInterpreter:
             var_name = re.match(r'\(inspect (.*?)\)', command).groups()[0]
             return self.debugger.inspect_variable(self.variables, var_name)
         except Exception as e:
-            logging.error(f"Error en comando inspect: {command}\n{e}", exc_info=True)
-            return f"Error en comando inspect: {traceback.format_exc()}"
+            logger.error(f"Error en comando inspect: {command}\n{e}", exc_info=True)
+            return f"Error en comando inspect: {format_exc()}"
+
+    def safe_point(self):
+        """Punto seguro entre dos formas: recolección de basura y control del presupuesto de memoria."""
+        self.command_count += 1
+        self.memory_manager.safe_point(self.variables, self.memo_manager.size())
+
+    def check_memory(self):
+        """Punto seguro dentro de una forma, que los motores llaman cada SAFE_POINT_STEPS vueltas de bucle y llamadas."""
+        if self.memory_manager.started:
+            self.memory_manager.safe_point(self.variables, self.memo_manager.size())
 
     def run_interactive(self):
         """Ejecuta el intérprete en modo interactivo."""
         print("Bienvenido a Simpyl. Escriba 'exit' para salir.")
+        started = not self.memory_manager.started  # Si ya estaba activa (un proceso de lotes), se mantiene
+        self.memory_manager.start()
+        try:
+            self.interactive_loop()
+        finally:
+            if started:
+                self.memory_manager.stop()
+
+    def interactive_loop(self):
+        """Lee y ejecuta comandos hasta 'exit'. Cada entrada cuenta como una línea, empezando por la 1,
+        que es la que se indica en (add-breakpoint LÍNEA); en modo de depuración el indicador la muestra."""
+        line = 0
         while True:
             try:
-                command = input("Simpyl> ")
+                line += 1
+                command = input(f"Simpyl [{line}]> " if self.debugger.debug_mode else "Simpyl> ")
                 if command.lower() == "exit":
                     print("Saliendo de Simpyl...")
                     break
-                result = self.execute_command(command)
+                result = self.execute_line(command, line)
                 if result:
                     print(result)
-                self.command_count += 1
-                self.memory_manager.monitor_memory(self.command_count)
+                self.safe_point()
+            except SimpylMemoryError as e:
+                print(f"Error de memoria: {e}")
             except KeyboardInterrupt:
                 print("\nSaliendo de Simpyl...")
                 break
             except Exception:
-                logging.error("Error fatal en el intérprete.", exc_info=True)
+                logger.error("Error fatal en el intérprete.", exc_info=True)
                 print("Error interno en Simpyl.")
 
     def run_file(self, filename):
-        """Ejecuta un archivo de Simpyl."""
+        """Ejecuta un archivo de Simpyl forma a forma; las formas pueden ocupar varias líneas.
+
+        Con el motor regex, cada línea es un comando.
+        """
+        started = not self.memory_manager.started  # Si ya estaba activa (un proceso de lotes), se mantiene
+        self.memory_manager.start()
         try:
+            if (self.engine != "regex" and self.script_cache is not None
+                    and os.path.getsize(filename) < STREAMING_THRESHOLD):
+                with open(filename, "r", encoding="utf-8") as file:
+                    # El AST completo se toma de la caché o se analiza y se guarda en ella
+                    statements = self.load_cached(file.read(), filename)
+                if statements is not None:
+                    for statement in statements:
+                        result = self.execute_statement(statement)
+                        if result:
+                            print(result)
+                        self.safe_point()
+                    return
             with open(filename, "r", encoding="utf-8") as file:
-                for line in file:
-                    result = self.execute_command(line.strip())
+                if self.engine == "regex":  # Cada línea es un comando, que puede contener código de Python
+                    for line in file:
+                        if line.strip():
+                            result = self.execute_command(line)
+                            if result:
+                                print(result)
+                            self.safe_point()
+                    return
+                for form in read_forms(file):
+                    result = self.execute_form(form)
                     if result:
                         print(result)
-                    self.command_count += 1
-                    self.memory_manager.monitor_memory(self.command_count)
+                    self.safe_point()
+        except SimpylMemoryError as e:
+            print(f"Error de memoria: {e}")  # El script se detiene en el punto seguro que superó el límite
+        except DebuggerQuit as e:
+            print(e)
         except FileNotFoundError:
             print(f"Error: No se encontró el archivo '{filename}'.")
         except Exception as e:
-            logging.error(f"Error al ejecutar archivo: {filename}\n{e}", exc_info=True)
-            print(f"Error interno al ejecutar archivo: {traceback.format_exc()}")
+            logger.error(f"Error al ejecutar archivo: {filename}\n{e}", exc_info=True)
+            print(f"Error interno al ejecutar archivo: {format_exc()}")
+        finally:
+            if started:
+                self.memory_manager.stop()
 
-if __name__ == "__main__":
-    interpreter = SimpylInterpreter()
+def main(argv=None):
+    """Línea de comandos del intérprete."""
+    import argparse  # Sólo se necesita al ejecutar desde la línea de comandos
+
+    configure_logging()
+
+    arg_parser = argparse.ArgumentParser(description="Intérprete del lenguaje Simpyl")
+    arg_parser.add_argument("filenames", nargs="*", metavar="filename",
+                            help="archivos Simpyl a ejecutar; sin ninguno se abre el modo interactivo")
+    arg_parser.add_argument("--engine", choices=ENGINES, default="regex", help="motor de ejecución")
+    arg_parser.add_argument("--cache-dir", help="directorio común para los archivos .spyc (por defecto, __spycache__ junto al script)")
+    arg_parser.add_argument("--no-cache", action="store_true", help="no leer ni escribir archivos .spyc")
+    arg_parser.add_argument("--max-depth", type=int,
+                            help=f"llamadas anidadas permitidas en el motor vm (por defecto {DEFAULT_MAX_DEPTH})")
+    arg_parser.add_argument("--memory-limit", type=float, help="presupuesto de memoria del script en MB")
+    arg_parser.add_argument("--gc-policy", choices=GC_POLICIES, default="safe-points", help="política del recolector de basura")
+    arg_parser.add_argument("--memory-trace", action="store_true", help="medir la memoria con tracemalloc (más preciso y más lento)")
+    arg_parser.add_argument("--profile", action="store_true", help="perfila formas y funciones y muestra un informe al terminar")
+    arg_parser.add_argument("--profile-output", help="archivo donde guardar las pilas colapsadas para un flame graph")
+    arg_parser.add_argument("--break", dest="breakpoints", type=int, action="append", default=[], metavar="LÍNEA",
+                            help="activa la depuración con un punto de interrupción en la línea indicada (repetible)")
+    arg_parser.add_argument("--watch", action="append", default=[], metavar="VARIABLE",
+                            help="activa la depuración y pausa cuando cambia la variable global (repetible)")
+    arg_parser.add_argument("--memo-entries", type=int, default=DEFAULT_MAX_ENTRIES, help="entradas máximas en la caché de cada función memorizada")
+    arg_parser.add_argument("--memo-bytes", type=int, default=DEFAULT_MAX_BYTES, help="bytes estimados máximos en la caché de cada función memorizada")
+    arg_parser.add_argument("--jobs", type=int, help="ejecuta los archivos en lote con N procesos de trabajo")
+    arg_parser.add_argument("--manifest", help="archivo con las rutas de los scripts del lote, una por línea")
+    arg_parser.add_argument("--timeout", type=float, help="segundos máximos de cada script del lote")
+    arg_parser.add_argument("--recycle-after", type=int, help="scripts que ejecuta cada proceso del lote antes de sustituirlo")
+    arg_parser.add_argument("--batch-output", help="archivo JSON Lines con el resultado de cada script del lote")
+    arg_parser.add_argument("--optimize", action="store_true",
+                            help="optimiza el AST antes de compilarlo (motores closure y vm)")
+    arg_parser.add_argument("--optimize-dump", action="store_true", help="optimiza y muestra el programa antes y después de optimizarlo")
+    arg_parser.add_argument("--snapshot", help="restaura una instantánea (preludio, módulos y variables) antes de ejecutar")
+    arg_parser.add_argument("--save-snapshot", help="guarda una instantánea del intérprete al terminar")
+    args = arg_parser.parse_args(argv)
+    try:
+        check_max_depth(args.engine, args.max_depth)
+    except ValueError as e:
+        arg_parser.error(str(e))
+
+    limit = int(args.memory_limit * 1024 * 1024) if args.memory_limit is not None else None
+    if args.jobs or args.manifest or len(args.filenames) > 1:
+        import json  # Resultados del lote en JSON Lines
+        try:
+            from .simpyl_batch import BatchRunner, read_manifest  # Modo por lotes
+        except ImportError:
+            from simpyl_batch import BatchRunner, read_manifest
+
+        paths = args.filenames + (read_manifest(args.manifest) if args.manifest else [])
+        runner = BatchRunner(jobs=args.jobs, timeout=args.timeout, recycle_after=args.recycle_after,
+                             engine=args.engine, max_depth=args.max_depth, memory_limit=limit,
+                             gc_policy=args.gc_policy, cache_dir=args.cache_dir, use_cache=not args.no_cache,
+                             memo_entries=args.memo_entries, memo_bytes=args.memo_bytes, optimize=args.optimize or args.optimize_dump)
+        counts = dict.fromkeys(("ok", "error", "timeout", "crash"), 0)
+        start = time.perf_counter()
+        output = open(args.batch_output, "w", encoding="utf-8") if args.batch_output else None
+        try:
+            for result in runner.run(paths):
+                counts[result.status] += 1
+                sys.stdout.write(result.stdout)
+                if result.error:
+                    print(f"{result.path}: {result.error}")
+                if output is not None:
+                    output.write(json.dumps(result.to_dict(), ensure_ascii=False) + "\n")
+        finally:
+            if output is not None:
+                output.close()
+        print(f"{len(paths)} scripts en {time.perf_counter() - start:.2f} s: {counts['ok']} correctos, "
+              f"{counts['error']} con errores, {counts['timeout']} sin terminar a tiempo, {counts['crash']} fallos del proceso")
+        return 1 if counts["ok"] < len(paths) else 0
+
+    cache = None
+    if not args.no_cache and args.engine != "regex":  # El motor regex no analiza el programa y no usa la caché
+        try:
+            from .simpyl_cache import ScriptCache  # hashlib sólo se carga si se usa la caché
+        except ImportError:
+            from simpyl_cache import ScriptCache
+        cache = ScriptCache(cache_dir=args.cache_dir)
+    memory = MemoryManager(limit=limit, policy=args.gc_policy, trace=args.memory_trace)
+    interpreter = SimpylInterpreter(engine=args.engine, cache=cache, max_depth=args.max_depth, memory=memory,
+                                    optimize=args.optimize or args.optimize_dump)
+    if args.optimize_dump:
+        interpreter.optimizer.dump = True
+    interpreter.memo_manager.max_entries = args.memo_entries
+    interpreter.memo_manager.max_bytes = args.memo_bytes
+
+    if args.profile or args.profile_output:
+        message = interpreter.enable_profile()
+        if not interpreter.profiling:
+            print(message)
 
-    if len(sys.argv) > 1:
-        filename = sys.argv[1]
-        interpreter.run_file(filename)
+    if args.breakpoints or args.watch:
+        interpreter.debugger.debug_mode = True
+        interpreter.debugger.breakpoints.update(dict.fromkeys(args.breakpoints, True))
+        interpreter.debugger.watches.update(dict.fromkeys(args.watch))
+
+    if args.snapshot:
+        try:
+            interpreter.load_snapshot(args.snapshot)
+        except Exception as e:
+            print(f"No se pudo restaurar la instantánea: {e}")
+            return 1
+
+    if args.filenames:
+        interpreter.run_file(args.filenames[0])
     else:
         interpreter.run_interactive()
+
+    if interpreter.profiler is not None and interpreter.profiler.entries:
+        print(interpreter.profiler.report())
+        if args.profile_output:
+            interpreter.profiler.write_collapsed(args.profile_output)
+            print(f"Pilas colapsadas guardadas en '{args.profile_output}'.")
+
+    if args.optimize_dump:
+        print(interpreter.optimizer.report())
+
+    if args.save_snapshot:
+        print(interpreter.save_snapshot(args.save_snapshot))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
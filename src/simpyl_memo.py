@@ -0,0 +1,159 @@
+import sys  # Para estimar el tamaño de las entradas
+from collections import OrderedDict  # Orden de uso para la expulsión LRU
+
+DEFAULT_MAX_ENTRIES = 100_000  # Entradas por función
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024  # Bytes estimados por función
+
+
+def entry_size(key, value):
+    """Estimación barata del tamaño de una entrada: tamaño superficial de la clave, sus pares y el valor.
+
+    Los tipos de la clave son compartidos y no se cuentan.
+    """
+    return sys.getsizeof(key) + sum(sys.getsizeof(pair) + sys.getsizeof(pair[1]) for pair in key) + sys.getsizeof(value)
+
+
+class MemoCache:
+    """Caché LRU de resultados de una función pura, limitada por número de entradas y por bytes estimados."""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_entries = max_entries  # Máximo de entradas
+        self.max_bytes = max_bytes  # Máximo de bytes estimados
+        self.entries = OrderedDict()  # tupla de (tipo, argumento) -> (valor, tamaño)
+        self.size = 0  # Bytes estimados ocupados
+        self.hits = 0  # Llamadas resueltas desde la caché
+        self.misses = 0  # Llamadas que ejecutaron la función
+        self.evictions = 0  # Entradas expulsadas por falta de espacio
+
+    def lookup(self, key):
+        """Devuelve (True, valor) si la clave está en la caché y la marca como usada recientemente."""
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return False, None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return True, entry[0]
+
+    def store(self, key, value):
+        """Guarda un resultado y expulsa las entradas menos usadas hasta respetar los límites."""
+        size = entry_size(key, value)
+        if size > self.max_bytes:
+            return  # Un valor mayor que todo el presupuesto no se guarda
+        previous = self.entries.pop(key, None)
+        if previous is not None:
+            self.size -= previous[1]
+        self.entries[key] = (value, size)
+        self.size += size
+        while len(self.entries) > self.max_entries or self.size > self.max_bytes:
+            _, (_, evicted_size) = self.entries.popitem(last=False)
+            self.size -= evicted_size
+            self.evictions += 1
+
+    def clear(self):
+        """Vacía la caché; los contadores se conservan."""
+        self.entries.clear()
+        self.size = 0
+
+    def stats(self):
+        """Resumen de uso de la caché."""
+        return {
+            "entries": len(self.entries),
+            "bytes": self.size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class MemoizedFunction:
+    """Envuelve una función de usuario pura y guarda sus resultados según sus argumentos y sus tipos."""
+
+    def __init__(self, name, function, cache):
+        self.name = name  # Nombre de la función
+        self.function = function  # Función original
+        self.cache = cache  # MemoCache de esta función
+
+    def lookup(self, args):
+        """Busca los argumentos en la caché y devuelve (encontrado, valor, clave).
+
+        La clave guarda el tipo de cada argumento, porque 2 y 2.0 o True y 1 son iguales como
+        claves de un diccionario pero pueden dar resultados distintos. Es None si los argumentos
+        no son hashables (por ejemplo listas): esa llamada se ejecuta sin caché. La VM y los
+        trampolines del compilador usan este método para resolver llamadas sin anidar su bucle.
+        """
+        key = tuple([(type(arg), arg) for arg in args])
+        try:
+            found, value = self.cache.lookup(key)
+        except TypeError:
+            return False, None, None
+        return found, value, key
+
+    def __call__(self, *args):
+        found, value, key = self.lookup(args)
+        if found:
+            return value
+        value = self.function(*args)
+        if key is not None:
+            self.cache.store(key, value)
+        return value
+
+    def __repr__(self):
+        return f"<función memorizada {self.name}>"
+
+
+def memoize(name, function):
+    """Envoltorio por defecto de los compiladores cuando no hay un gestor de memorización."""
+    return MemoizedFunction(name, function, MemoCache())
+
+
+def test_memo():
+    """Comprueba la expulsión LRU, las claves con tipos y la recursión en cola de las funciones memorizadas."""
+    import contextlib  # Captura de la salida estándar
+    import io
+
+    try:
+        from .simpyl_interpreter import SimpylInterpreter
+    except ImportError:
+        from simpyl_interpreter import SimpylInterpreter
+
+    cache = MemoCache(max_entries=2)
+    for name in "abac":  # "a" se usa de nuevo antes de que llegue "c": se expulsa "b"
+        key = ((str, name),)
+        if not cache.lookup(key)[0]:
+            cache.store(key, name.upper())
+    assert list(cache.entries) == [((str, "a"),), ((str, "c"),)] and cache.evictions == 1, cache.stats()
+    cache = MemoCache(max_bytes=entry_size(((int, 1),), 1) * 3)
+    for number in range(10):
+        cache.store(((int, number),), number)
+    assert len(cache.entries) == 3 and cache.size <= cache.max_bytes, cache.stats()
+
+    text = MemoizedFunction("texto", str, MemoCache())
+    # Iguales como claves de un diccionario, pero con resultados distintos
+    assert [text(2), text(2.0), text(True), text(1)] == ["2", "2.0", "True", "1"]
+    assert text.cache.stats()["entries"] == 4
+    length = MemoizedFunction("longitud", len, MemoCache())
+    assert length([1, 2]) == 2 and not length.cache.entries  # Los argumentos no hashables no se guardan
+
+    source = """
+    (define-memo cuenta (n acc) (if (== n 0) acc (cuenta (- n 1) (+ acc 1))))
+    (print (cuenta 50000 0))
+    (define-memo texto (x) (str x))
+    (print (texto 2) (texto 2.0) (texto (== 1 1)) (texto 1))
+    """
+    for engine in ("closure", "vm"):
+        for profile in (False, True):
+            interpreter = SimpylInterpreter(engine=engine)
+            if profile:
+                interpreter.enable_profile()
+            buffer = io.StringIO()
+            with contextlib.redirect_stdout(buffer):
+                interpreter.execute_statements(interpreter.parser.parse(source))
+            assert buffer.getvalue() == "50000\n2 2.0 True 1\n", (engine, profile, buffer.getvalue())
+            # Cada llamada en cola guarda su propio resultado
+            assert interpreter.memo_manager.caches["cuenta"].stats()["entries"] == 50_001, (engine, profile)
+    print("OK: caché LRU, claves con tipos y recursión en cola memorizada en los motores closure y vm")
+
+
+if __name__ == "__main__":
+    test_memo()
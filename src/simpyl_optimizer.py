@@ -0,0 +1,479 @@
+try:
+    from .simpyl_compiler import OPERATORS, assigned_names, parse_number, parse_string  # Importación dentro del paquete
+except ImportError:
+    from simpyl_compiler import OPERATORS, assigned_names, parse_number, parse_string  # Importación al ejecutar el archivo directamente
+
+LITERAL_NODES = ("number", "string", "boolean", "null")
+# Nodos sin efectos secundarios: evaluarlos otra vez, antes o en otro sitio sólo puede cambiar qué error se produce
+PURE_NODES = LITERAL_NODES + ("identifier", "operation", "if")
+INLINE_MAX_NODES = 16  # Tamaño máximo del cuerpo de una función que se copia en sus llamadas
+MAX_FOLDED_STRING = 256  # Las cadenas plegadas más largas se dejan como operación
+TEMP_PREFIX = "#inv"  # Variables de las expresiones sacadas de los bucles; '#' no puede escribirse en un identificador
+
+
+def is_literal(node):
+    return node["type"] in LITERAL_NODES
+
+
+def literal_value(node):
+    """Valor de Python de un nodo literal."""
+    kind = node["type"]
+    if kind == "number":
+        return parse_number(node["value"])
+    if kind == "string":
+        return parse_string(node["value"])
+    if kind == "boolean":
+        return node["value"] == "true"
+    return None
+
+
+def literal_node(value):
+    """Nodo literal que representa `value`, o None si el valor no puede escribirse como literal."""
+    if value is None:
+        return {"type": "null"}
+    if isinstance(value, bool):
+        return {"type": "boolean", "value": "true" if value else "false"}
+    if isinstance(value, (int, float)):
+        return {"type": "number", "value": repr(value)}
+    if isinstance(value, str) and len(value) <= MAX_FOLDED_STRING and '"' not in value and "\\" not in value:
+        return {"type": "string", "value": f'"{value}"'}
+    return None
+
+
+def children(node):
+    """Nodos hijos de un nodo del AST."""
+    for value in node.values():
+        if isinstance(value, dict):
+            yield value
+        elif isinstance(value, list):
+            yield from (item for item in value if isinstance(item, dict))
+
+
+def walk(node):
+    """Recorre un nodo y todos sus descendientes."""
+    pending = [node]
+    while pending:
+        current = pending.pop()
+        yield current
+        pending.extend(children(current))
+
+
+def defined_names(statements):
+    """Nombre -> número de definiciones de cada función en las declaraciones, incluidas las anidadas."""
+    definitions = {}
+    for statement in statements:
+        for current in walk(statement):
+            if current["type"] == "function_definition":
+                definitions[current["name"]] = definitions.get(current["name"], 0) + 1
+    return definitions
+
+
+def count_nodes(node):
+    return sum(1 for _ in walk(node))
+
+
+def is_pure(node):
+    """Indica si un nodo sólo contiene literales, variables, operaciones conocidas y condicionales."""
+    return all(current["type"] in PURE_NODES and (current["type"] != "operation" or current["operator"] in OPERATORS)
+               for current in walk(node))
+
+
+def identifiers(node):
+    """Nombres de las variables leídas dentro de un nodo."""
+    return {current["value"] for current in walk(node) if current["type"] == "identifier"}
+
+
+def unconditional(node):
+    """Nodos que se evalúan siempre que se evalúa `node`: no entra en las ramas de if ni en el cuerpo de while."""
+    pending = [node]
+    while pending:
+        current = pending.pop()
+        yield current
+        kind = current["type"]
+        if kind in ("if", "while"):
+            pending.append(current["condition"])
+        elif kind != "function_definition":
+            pending.extend(children(current))
+
+
+def substitute(node, values):
+    """Copia un nodo cambiando las variables de `values` por sus nodos; las copias no conservan la línea."""
+    if node["type"] == "identifier" and node["value"] in values:
+        return values[node["value"]]
+    copy = {}
+    for key, value in node.items():
+        if key == "line":
+            continue
+        if isinstance(value, dict):
+            value = substitute(value, values)
+        elif isinstance(value, list):
+            value = [substitute(item, values) if isinstance(item, dict) else item for item in value]
+        copy[key] = value
+    return copy
+
+
+def to_source(node):
+    """Escribe un nodo como código Simpyl para los volcados del optimizador.
+
+    Los bloques fuera del cuerpo de una función o de un bucle no tienen sintaxis propia y se muestran como (bloque ...).
+    """
+    kind = node["type"]
+    if kind in ("number", "string", "boolean", "identifier"):
+        return node["value"]
+    if kind == "null":
+        return "null"
+    if kind == "vector":
+        return f"[{' '.join(to_source(item) for item in node['items'])}]"
+    if kind == "operation":
+        return f"({node['operator']} {to_source(node['left'])} {to_source(node['right'])})"
+    if kind == "assignment":
+        return f"({node['name']} = {to_source(node['value'])})"
+    if kind == "print":
+        return f"(print {' '.join(to_source(arg) for arg in node['args'])})"
+    if kind == "call":
+        return f"({' '.join([node['name']] + [to_source(arg) for arg in node['args']])})"
+    if kind == "block":
+        return f"(bloque {' '.join(to_source(item) for item in node['body'])})"
+    if kind == "if":
+        branches = [node["then"]] + ([node["else"]] if node["else"] is not None else [])
+        return f"(if {to_source(node['condition'])} {' '.join(to_source(branch) for branch in branches)})"
+    body = node["body"]["body"] if node["body"]["type"] == "block" else [node["body"]]
+    body = " ".join(to_source(item) for item in body)
+    if kind == "while":
+        return f"(while {to_source(node['condition'])} {body})"
+    if kind == "function_definition":
+        keyword = "define-memo" if node.get("memo") else "define"
+        return f"({keyword} {node['name']} ({' '.join(node['params'])}) {body})"
+    return f"<{kind}>"
+
+
+class InlineFunction:
+    """Función que puede copiarse en sus llamadas: sus parámetros, su cuerpo y los parámetros que lee siempre."""
+
+    __slots__ = ("params", "body", "free_names", "always_read")
+
+    def __init__(self, node):
+        self.params = node["params"]
+        self.body = node["body"]
+        self.free_names = identifiers(self.body) - set(self.params)  # Variables globales que lee el cuerpo
+        self.always_read = {current["value"] for current in unconditional(self.body) if current["type"] == "identifier"}
+
+
+class SimpylOptimizer:
+    """Reescribe el AST de SimpylParser antes de compilarlo, sin cambiar el resultado del programa.
+
+    - Pliega las operaciones cuyos operandos son literales: (* 60 60) pasa a ser 3600.
+    - Elimina las ramas de if y los bucles while cuya condición se conoce al compilar.
+    - Copia en sus llamadas las funciones de nivel superior pequeñas y sin efectos (sólo operaciones,
+      condicionales y variables) definidas una sola vez en el programa, cuando los argumentos son
+      literales o variables. Las llamadas anteriores a la definición no se tocan. Cada función que
+      copia otra en su cuerpo queda registrada: si un programa posterior redefine la copiada, la
+      que la copió (y las que copiaron a ésta) se compila de nuevo desde su definición original,
+      al principio de ese programa y sin copiarla, así que llama a la versión vigente.
+    - Saca de los bucles while las operaciones cuyas variables no cambian dentro del bucle y que se
+      evalúan en cada vuelta. Se calculan una sola vez, en el mismo punto en que el bucle original las
+      calculaba por primera vez, en variables #inv0, #inv1... (locales dentro de las funciones); las
+      repetidas comparten variable. El intérprete borra las de nivel superior al terminar el programa.
+
+    Cada llamada a optimize recibe un programa o una forma leída por separado: las funciones de
+    formas anteriores sólo se copian en formas de nivel superior, que se ejecutan en seguida, y no en
+    el cuerpo de otras funciones. Tampoco se copian en funciones definidas dentro de una declaración
+    que no es una definición, porque no podrían compilarse de nuevo. Con `dump`, muestra cada
+    declaración antes y después de optimizarla.
+    """
+
+    def __init__(self, enabled=True, dump=False):
+        self.enabled = enabled  # Se activa con --optimize
+        self.dump = dump  # Mostrar el programa antes y después de optimizarlo
+        self.stats = dict.fromkeys(("folded", "pruned", "inlined", "hoisted"), 0)
+        self.inline = {}  # Nombre -> InlineFunction de los programas anteriores; sólo se usa en el nivel superior
+        self.program_inline = {}  # Nombre -> InlineFunction de las funciones ya definidas en el programa actual
+        # Nombre -> {función que copió su cuerpo: definición original de ésta}, para compilarla de nuevo si cambia
+        self.dependents = {}
+        self.definition = None  # Definición original de la declaración de nivel superior que se está optimizando
+        self.scopes = []  # Variables locales de las funciones que se están optimizando
+        self.temps = 0  # Variables creadas para las expresiones invariantes
+        self.global_temps = []  # Variables de los bucles de nivel superior: son globales y se borran al terminar
+
+    def optimize(self, statements):
+        """Devuelve una copia optimizada de las declaraciones de nivel superior, precedida de las
+        definiciones que deben compilarse de nuevo porque copiaron una función que el programa redefine."""
+        definitions = defined_names(statements)
+        stale = self.invalidate(statements)
+        self.program_inline = {}
+        self.scopes = []
+        self.temps = 0
+        self.global_temps = []
+        result = []
+        for statement in stale + statements:  # Las recompiladas no encuentran nada que copiar: llaman por nombre
+            self.definition = statement if statement["type"] == "function_definition" else None
+            node = self.visit(statement)
+            if node["type"] == "function_definition" and definitions.get(node["name"]) == 1 and self.can_inline(node):
+                self.program_inline[node["name"]] = InlineFunction(node)  # Sólo las formas posteriores la encuentran definida
+            if self.dump:
+                self.dump_statement(statement, node)
+            result.append(node)
+        self.definition = None
+        self.inline.update(self.program_inline)
+        return [node for node in result[:-1] if not is_literal(node)] + result[-1:]  # Los literales no tienen efecto
+
+    def invalidate(self, statements):
+        """Olvida lo que las declaraciones redefinen y devuelve, sin optimizar, las definiciones originales
+        de las funciones que copiaron alguna de ellas, directa o indirectamente, para compilarlas de nuevo.
+
+        El intérprete también la usa cuando no optimiza, con el perfilador o el depurador activos.
+        """
+        names = defined_names(statements)
+        for name in names:
+            self.inline.pop(name, None)  # La nueva definición sustituye a la de un programa anterior
+            self.forget_caller(name)  # La nueva definición registrará lo que copie
+        stale = {}
+        pending = list(names)
+        while pending:
+            for caller, definition in self.dependents.pop(pending.pop(), {}).items():
+                if caller not in stale and caller not in names:
+                    stale[caller] = definition
+                    pending.append(caller)  # Las que copiaron a ésta tienen la misma copia antigua
+        for caller in stale:
+            self.inline.pop(caller, None)
+            self.forget_caller(caller)
+        return list(stale.values())
+
+    def forget_caller(self, name):
+        """Quita una función de las listas de las que copiaron otras."""
+        for callers in self.dependents.values():
+            callers.pop(name, None)
+
+    def clear(self):
+        """Olvida las funciones de los programas anteriores, para ejecutar otro desde cero."""
+        self.inline.clear()
+        self.dependents.clear()
+
+    def dump_statement(self, before, after):
+        """Muestra una declaración que el optimizador ha cambiado."""
+        line = before.get("line", "?")
+        before, after = to_source(before), to_source(after)
+        if before != after:
+            print(f";; línea {line}\n;;   {before}\n;;   => {after}")
+
+    def report(self):
+        """Resumen de los cambios hechos por el optimizador."""
+        stats = self.stats
+        return (f"Optimizador: {stats['folded']} operaciones plegadas, {stats['pruned']} ramas eliminadas, "
+                f"{stats['inlined']} llamadas sustituidas por el cuerpo, {stats['hoisted']} expresiones sacadas de bucles.")
+
+    def can_inline(self, node):
+        body = node["body"]
+        return not node.get("memo") and count_nodes(body) <= INLINE_MAX_NODES and is_pure(body)
+
+    def visit(self, node):
+        method = getattr(self, f"optimize_{node['type']}", None)
+        return method(node) if method is not None else node
+
+    def optimize_operation(self, node):
+        left = self.visit(node["left"])
+        right = self.visit(node["right"])
+        if is_literal(left) and is_literal(right) and node["operator"] in OPERATORS:
+            try:
+                folded = literal_node(OPERATORS[node["operator"]](literal_value(left), literal_value(right)))
+            except Exception:
+                folded = None  # (/ 1 0) y otros errores se producen al ejecutar, como sin optimizar
+            if folded is not None:
+                self.stats["folded"] += 1
+                return folded
+        return dict(node, left=left, right=right)
+
+    def optimize_if(self, node):
+        condition = self.visit(node["condition"])
+        if is_literal(condition):
+            self.stats["pruned"] += 1
+            branch = node["then"] if literal_value(condition) else node["else"]
+            return self.visit(branch) if branch is not None else {"type": "null"}
+        then_branch = self.visit(node["then"])
+        else_branch = self.visit(node["else"]) if node["else"] is not None else None
+        return dict(node, condition=condition, then=then_branch, **{"else": else_branch})
+
+    def optimize_while(self, node):
+        condition = self.visit(node["condition"])
+        if is_literal(condition) and not literal_value(condition):
+            self.stats["pruned"] += 1
+            return {"type": "null"}  # El bucle no da ninguna vuelta
+        return self.hoist(dict(node, condition=condition, body=self.visit(node["body"])))
+
+    def optimize_block(self, node):
+        body = []
+        for expression in node["body"]:
+            expression = self.visit(expression)
+            body.extend(expression["body"] if expression["type"] == "block" else [expression])
+        body = [expression for expression in body[:-1] if not is_literal(expression)] + body[-1:]
+        return body[0] if len(body) == 1 else dict(node, body=body)
+
+    def optimize_assignment(self, node):
+        return dict(node, value=self.visit(node["value"]))
+
+    def optimize_vector(self, node):
+        return dict(node, items=[self.visit(item) for item in node["items"]])
+
+    def optimize_print(self, node):
+        return dict(node, args=[self.visit(arg) for arg in node["args"]])
+
+    def optimize_call(self, node):
+        args = [self.visit(arg) for arg in node["args"]]
+        function = self.program_inline.get(node["name"])
+        if function is None and not self.scopes:
+            function = self.inline.get(node["name"])  # Una forma de nivel superior se ejecuta en seguida
+        if self.scopes and self.definition is None:
+            function = None  # Una función definida dentro de otra declaración no podría compilarse de nuevo
+        if function is not None and self.can_substitute(function, args):
+            if self.scopes:  # La copia vive en una función: se compila de nuevo si cambia la copiada
+                self.dependents.setdefault(node["name"], {})[self.definition["name"]] = self.definition
+            self.stats["inlined"] += 1
+            body = self.visit(substitute(function.body, dict(zip(function.params, args))))
+            if "line" in node and not is_literal(body):
+                body = dict(body, line=node["line"])
+            return body
+        return dict(node, args=args)
+
+    def can_substitute(self, function, args):
+        """Indica si la llamada puede sustituirse por el cuerpo sin cambiar el resultado.
+
+        Cada argumento se evalúa tantas veces como aparece el parámetro, así que sólo se admiten
+        literales y variables; una variable sólo si el cuerpo la lee siempre, para que una variable
+        sin valor siga produciendo el mismo error. Las variables globales del cuerpo no pueden
+        coincidir con variables locales de la función donde se copia.
+        """
+        if len(args) != len(function.params):
+            return False  # El error de número de argumentos se produce al ejecutar
+        for param, arg in zip(function.params, args):
+            if arg["type"] == "identifier":
+                if param not in function.always_read:
+                    return False
+            elif not is_literal(arg):
+                return False
+        return not any(function.free_names & scope for scope in self.scopes)
+
+    def optimize_function_definition(self, node):
+        self.scopes.append(set(node["params"]) | set(assigned_names(node["body"])))
+        try:
+            return dict(node, body=self.visit(node["body"]))
+        finally:
+            self.scopes.pop()
+
+    def hoist(self, node):
+        """Saca del bucle las operaciones invariantes que se evalúan en cada vuelta.
+
+        Las de la condición se calculan antes del bucle: (while c cuerpo) pasa a ser
+        (if c (bloque (#inv0 = e) (while c' cuerpo'))). La primera comprobación de c ya evalúa e en
+        el mismo punto que el bucle original, así que un error se produce igual; para ello la
+        condición no puede tener efectos. Las del cuerpo pueden ir detrás de un print o de una
+        asignación, o fallar, así que no se adelantan: la variable empieza en null antes del bucle
+        y la primera vuelta calcula e donde estaba, con (if (== #inv1 null) (#inv1 = e) #inv1).
+        """
+        condition, body = node["condition"], node["body"]
+        if not is_pure(condition) or any(current["type"] == "function_definition" for current in walk(body)):
+            return node
+        assigned = set(assigned_names([condition, body]))
+        hoisted = {}  # Código de la expresión -> (variable, nodo, se calcula antes del bucle)
+        for root in (condition, body):
+            pending = [root]
+            while pending:
+                current = pending.pop()
+                if (current["type"] == "operation" and is_pure(current)
+                        and identifiers(current) and identifiers(current).isdisjoint(assigned)):
+                    key = to_source(current)
+                    if key not in hoisted:
+                        hoisted[key] = (f"{TEMP_PREFIX}{self.temps}", current, root is condition)
+                        self.temps += 1
+                    continue
+                if current["type"] in ("if", "while"):
+                    pending.append(current["condition"])
+                else:
+                    pending.extend(children(current))
+        if not hoisted:
+            return node
+        self.stats["hoisted"] += len(hoisted)
+        if not self.scopes:
+            self.global_temps.extend(name for name, _, _ in hoisted.values())
+        names = {key: (name, expression if not early else None) for key, (name, expression, early) in hoisted.items()}
+        loop = dict(node, condition=self.replace(condition, names), body=self.replace(body, names))
+        assignments = [{"type": "assignment", "name": name, "value": expression if early else {"type": "null"}}
+                       for name, expression, early in hoisted.values()]
+        if any(early for _, _, early in hoisted.values()):
+            result = {"type": "if", "condition": condition, "then": {"type": "block", "body": assignments + [loop]},
+                      "else": None}
+        else:
+            result = {"type": "block", "body": assignments + [loop]}
+        if "line" in node:
+            result["line"] = node["line"]
+        return result
+
+    def replace(self, node, names):
+        """Copia un nodo cambiando las expresiones invariantes, estén donde estén, por su variable.
+
+        `names` asigna a cada expresión su variable y, si se calcula en la primera vuelta, la expresión.
+        """
+        if node["type"] == "operation":
+            name, expression = names.get(to_source(node), (None, None))
+            if expression is not None:
+                variable = {"type": "identifier", "value": name}
+                return {"type": "if",
+                        "condition": {"type": "operation", "operator": "==", "left": variable, "right": {"type": "null"}},
+                        "then": {"type": "assignment", "name": name, "value": expression}, "else": dict(variable)}
+            if name is not None:
+                return {"type": "identifier", "value": name}
+        copy = {}
+        for key, value in node.items():
+            if isinstance(value, dict):
+                value = self.replace(value, names)
+            elif isinstance(value, list):
+                value = [self.replace(item, names) if isinstance(item, dict) else item for item in value]
+            copy[key] = value
+        return copy
+
+
+def test_optimizer():
+    """Comprueba que los programas optimizados dan la misma salida y el mismo valor que sin optimizar,
+    también cuando un programa posterior redefine una función copiada en otra."""
+    import contextlib  # Captura de la salida estándar
+    import io
+
+    try:
+        from .simpyl_interpreter import SimpylInterpreter
+    except ImportError:
+        from simpyl_interpreter import SimpylInterpreter
+
+    # Cada caso es una lista de programas que se ejecutan uno tras otro en el mismo intérprete
+    cases = [
+        ["(x = (* 60 60)) (if (> x 100) (print \"grande\") (print \"pequeño\")) (while false (print 1)) x"],
+        ["(define doble (a) (* a 2)) (define usa (b) (+ (doble b) 1)) (print (usa 5) (doble 2.5))"],
+        ["(n = 3) (i = 0) (t = 0) (while (< i 10) (t = (+ t (* n n))) (i = (+ i 1))) t"],
+        ["(define doble (a) (* a 2)) (define usa (b) (+ (doble b) 1)) (define usa2 (c) (+ (usa c) 0))",
+         "(print (usa2 5))", "(define doble (a) (* a 3))", "(print (usa 5) (usa2 5))",
+         "(define usa (b) (- b 1))", "(define doble (a) (* a 4))", "(print (usa 5) (usa2 5))"],
+        ["(define f (a) (+ a 1)) (define g (b) (f b))", "(define f (a) (- a 1))", "(g 10)"],
+    ]
+
+    def run(engine, programs, optimize):
+        interpreter = SimpylInterpreter(engine=engine, optimize=optimize)
+        buffer = io.StringIO()
+        with contextlib.redirect_stdout(buffer):
+            results = [interpreter.execute_statements(interpreter.parser.parse(program)) for program in programs]
+        plain = {name: value for name, value in interpreter.variables.items() if not callable(value)}
+        return buffer.getvalue(), [result for result in results if not callable(result)], plain, interpreter
+
+    for engine in ("closure", "vm"):
+        totals = dict.fromkeys(("folded", "pruned", "inlined", "hoisted"), 0)
+        for programs in cases:
+            expected = run(engine, programs, False)[:3]
+            *optimized, interpreter = run(engine, programs, True)
+            assert tuple(optimized) == expected, (engine, programs, optimized, expected)
+            for name, count in interpreter.optimizer.stats.items():
+                totals[name] += count
+        assert all(totals.values()), (engine, totals)  # Los casos ejercitan todas las optimizaciones
+    output = run("closure", cases[3], True)[0]
+    assert output == "11\n16 16\n4 4\n", output  # Las copias de la versión anterior de doble se compilaron de nuevo
+    print(f"OK: {len(cases)} casos con y sin optimizar iguales en los motores closure y vm")
+
+
+if __name__ == "__main__":
+    test_optimizer()
@@ -1,27 +1,55 @@
 import re  # Importa la librería re para expresiones regulares (aunque no se utiliza explícitamente aquí).
+from collections import deque  # Ventana de tokens adelantados
 
 class SimpylParser:
     def __init__(self, lexer):
         # Inicializa el parser con un lexer (analizador léxico) y establece el estado inicial.
         self.lexer = lexer
-        self.tokens = []  # Lista para almacenar los tokens generados por el lexer.
+        self.tokens = iter(())  # Iterador del que se extraen los tokens bajo demanda.
+        self.lookahead = deque()  # Tokens ya extraídos pero aún no consumidos (sólo los que se han mirado por adelantado).
         self.current_token = None  # El token actual en el análisis.
-        self.token_index = -1  # Índice que rastrea el token actual en la lista de tokens.
 
     def parse(self, code):
         """Función principal para analizar el código y construir el AST (Abstract Syntax Tree)"""
-        self.tokens = list(self.lexer(code))  # Convierte el código en una lista de tokens.
-        self.token_index = -1  # Reinicia el índice de tokens.
-        self.next_token()  # Avanza al primer token.
+        return self.parse_tokens(self.lexer(code))  # Analiza los tokens a medida que el lexer los genera.
+
+    def parse_tokens(self, tokens):
+        """Construye el AST a partir de un iterable de tokens, por ejemplo el TokenArray de una forma leída por simpyl_reader."""
+        self.start(tokens)  # Prepara la lectura de tokens.
         return self.program()  # Inicia el análisis del programa.
 
+    def parse_iter(self, code):
+        """Genera las declaraciones de nivel superior una a una, sin esperar a analizar el resto del código.
+
+        Los tokens se extraen del lexer sólo cuando se necesitan, así que la primera declaración está
+        disponible en cuanto termina su forma. El parser guarda el estado de la lectura: no deben
+        recorrerse dos generadores del mismo parser a la vez.
+        """
+        self.start(self.lexer(code))  # Prepara la lectura de tokens.
+        while self.current_token:  # Mientras haya un token por procesar.
+            yield self.parse_expression()  # Entrega cada forma en cuanto se completa.
+
+    def start(self, tokens):
+        """Reinicia el estado del parser para leer de un nuevo iterable de tokens."""
+        self.tokens = iter(tokens)  # Los tokens se extraen de uno en uno.
+        self.lookahead.clear()  # Descarta tokens adelantados de un análisis anterior.
+        self.next_token()  # Avanza al primer token.
+
     def next_token(self):
-        """Avanza al siguiente token en la lista."""
-        self.token_index += 1  # Incrementa el índice.
-        if self.token_index < len(self.tokens):  # Si hay más tokens por procesar.
-            self.current_token = self.tokens[self.token_index]  # Establece el siguiente token.
+        """Avanza al siguiente token, tomándolo de la ventana adelantada o del lexer."""
+        if self.lookahead:  # Si ya se extrajo por adelantado.
+            self.current_token = self.lookahead.popleft()
         else:
-            self.current_token = None  # Si no hay más tokens, establece como None.
+            self.current_token = next(self.tokens, None)  # Si no hay más tokens, establece como None.
+
+    def peek_token(self, offset=1):
+        """Devuelve el token situado `offset` posiciones después del actual sin consumirlo."""
+        while len(self.lookahead) < offset:  # Extrae sólo los tokens necesarios.
+            token = next(self.tokens, None)
+            if token is None:  # No hay más tokens.
+                return None
+            self.lookahead.append(token)
+        return self.lookahead[offset - 1]
 
     def expect(self, kind):
         """Verifica si el siguiente token es del tipo esperado. Si no lo es, lanza un error de sintaxis."""
@@ -36,32 +64,78 @@ class SimpylParser:
         """Analiza un programa, que puede ser una lista de expresiones."""
         statements = []  # Lista para almacenar las declaraciones analizadas.
         while self.current_token:  # Mientras haya un token por procesar.
-            statements.append(self.statement())  # Procesa una declaración y la agrega a la lista.
+            statements.append(self.parse_expression())  # Procesa una forma de nivel superior y la agrega a la lista.
         return statements  # Devuelve todas las declaraciones analizadas.
 
     def statement(self):
-        """Parsea una declaración general, que puede ser una asignación, definición de función o condicional."""
-        if self.current_token[0] == "DEFINE":  # Si el token actual es una definición de función.
+        """Parsea el contenido de una forma entre paréntesis: definición, asignación, condicional, bucle, impresión, operación o llamada."""
+        if self.current_token is None:  # Si el código termina dentro de una forma.
+            raise SyntaxError("Fin de código inesperado: falta un paréntesis de cierre")
+        kind = self.current_token[0]  # Tipo del primer token de la forma.
+        if kind in ("DEFINE", "DEFINE_MEMO"):  # Si el token actual es una definición de función.
             return self.parse_function_definition()  # Analiza la definición de función.
-        elif self.current_token[0] == "IF":  # Si el token actual es una sentencia if.
+        elif kind == "IF":  # Si el token actual es una sentencia if.
             return self.parse_if_statement()  # Analiza la sentencia if.
-        elif self.current_token[0] == "IDENTIFIER":  # Si el token actual es un identificador (asignación).
-            return self.parse_assignment()  # Analiza la asignación.
+        elif kind == "WHILE":  # Si el token actual es un bucle while.
+            return self.parse_while_statement()  # Analiza el bucle.
+        elif kind == "PRINT":  # Si el token actual es una impresión.
+            return self.parse_print()  # Analiza la impresión.
+        elif kind == "IDENTIFIER":  # Si el token actual es un identificador.
+            next_token = self.peek_token()  # Mira el siguiente token para distinguir asignación de llamada.
+            if next_token and next_token[0] == "ASSIGNMENT_OP":  # (variable = valor)
+                return self.parse_assignment()  # Analiza la asignación.
+            return self.parse_call()  # (funcion arg1 arg2 ...)
+        elif kind in ("ARITHMETIC_OP", "COMPARISON_OP"):  # Si el token es un operador (por ejemplo, '+', '-', '*', '>').
+            return self.parse_operation()  # Analiza la operación.
         else:
             raise SyntaxError(f"Declaración inesperada: {self.current_token}")  # Si el token no es válido.
 
     def parse_function_definition(self):
-        """Parsea una definición de función: (define func_name (params) (body))"""
-        self.expect("DEFINE")  # Espera y consume el token 'DEFINE'.
-        self.expect("LPAREN")  # Espera y consume el paréntesis izquierdo de la función.
-        func_name = self.expect("IDENTIFIER")  # Obtiene el nombre de la función.
-        self.expect("LPAREN")  # Espera el paréntesis izquierdo de los parámetros.
-        params = self.parse_parameters()  # Analiza los parámetros de la función.
-        self.expect("RPAREN")  # Espera y consume el paréntesis derecho de los parámetros.
-        self.expect("LPAREN")  # Espera el paréntesis izquierdo del cuerpo de la función.
-        body = self.parse_expression()  # Analiza el cuerpo de la función.
-        self.expect("RPAREN")  # Espera y consume el paréntesis derecho del cuerpo.
-        return {"type": "function_definition", "name": func_name, "params": params, "body": body}  # Devuelve la representación de la función.
+        """Parsea una definición: (define func_name (params) body), (define (func_name params) body) o (define variable valor)
+
+        Con 'define-memo' la función se marca como pura y sus resultados se memorizan.
+        """
+        memo = self.current_token[0] == "DEFINE_MEMO"  # Definición de una función memorizada.
+        self.expect("DEFINE_MEMO" if memo else "DEFINE")  # Espera y consume el token de definición.
+        if self.current_token and self.current_token[0] == "LPAREN":  # Forma (define (func_name params) body).
+            self.expect("LPAREN")  # Consume el paréntesis que rodea la firma.
+            func_name = self.expect("IDENTIFIER")  # Obtiene el nombre de la función.
+            if self.current_token and self.current_token[0] == "LPAREN":  # Parámetros entre paréntesis: (define (f (a b)) ...)
+                self.expect("LPAREN")
+                params = self.parse_parameters()
+                self.expect("RPAREN")
+            else:
+                params = self.parse_parameters()  # Parámetros sueltos: (define (f a b) ...)
+            self.expect("RPAREN")  # Cierra la firma.
+        else:
+            func_name = self.expect("IDENTIFIER")  # Obtiene el nombre de la función o variable.
+            if not self.is_parameter_list():  # (define variable valor)
+                if memo:  # Sólo las funciones se pueden memorizar.
+                    raise SyntaxError(f"'define-memo' requiere una función, pero '{func_name}' no tiene parámetros ni cuerpo")
+                value = self.parse_expression()  # Analiza el valor asignado.
+                return {"type": "assignment", "name": func_name, "value": value}
+            self.expect("LPAREN")  # Espera el paréntesis izquierdo de los parámetros.
+            params = self.parse_parameters()  # Analiza los parámetros de la función.
+            self.expect("RPAREN")  # Espera y consume el paréntesis derecho de los parámetros.
+        body = self.parse_body()  # Analiza el cuerpo de la función.
+        node = {"type": "function_definition", "name": func_name, "params": params, "body": body}  # Representación de la función.
+        if memo:
+            node["memo"] = True  # Los compiladores envuelven la función con una caché de resultados.
+        return node  # Devuelve la representación de la función.
+
+    def is_parameter_list(self):
+        """Indica si lo que sigue es una lista de parámetros seguida de un cuerpo (y no el valor de una variable)."""
+        if not self.current_token or self.current_token[0] != "LPAREN":  # Los parámetros siempre van entre paréntesis.
+            return False
+        offset = 1  # Recorre los identificadores sin consumirlos.
+        token = self.peek_token(offset)
+        while token and token[0] == "IDENTIFIER":
+            offset += 1
+            token = self.peek_token(offset)
+        if not token or token[0] != "RPAREN":  # No es una lista de identificadores.
+            return False
+        after = self.peek_token(offset + 1)  # Token posterior a la lista.
+        return bool(after) and after[0] != "RPAREN"  # Sólo es una función si después viene un cuerpo.
 
     def parse_parameters(self):
         """Parsea los parámetros de la función."""
@@ -70,6 +144,17 @@ class SimpylParser:
             params.append(self.expect("IDENTIFIER"))  # Agrega el identificador como parámetro.
         return params  # Devuelve los parámetros de la función.
 
+    def parse_body(self):
+        """Parsea una o varias expresiones hasta el paréntesis de cierre; varias expresiones forman un bloque."""
+        body = []  # Expresiones del cuerpo.
+        while self.current_token and self.current_token[0] != "RPAREN":
+            body.append(self.parse_expression())
+        if not body:  # Un cuerpo vacío no es válido.
+            raise SyntaxError(f"Se esperaba al menos una expresión, pero se encontró '{self.current_token}'")
+        if len(body) == 1:
+            return body[0]
+        return {"type": "block", "body": body}
+
     def parse_assignment(self):
         """Parsea una asignación de variable: (variable = value)"""
         var_name = self.expect("IDENTIFIER")  # Obtiene el nombre de la variable.
@@ -77,49 +162,112 @@ class SimpylParser:
         expression = self.parse_expression()  # Analiza la expresión que se va a asignar.
         return {"type": "assignment", "name": var_name, "value": expression}  # Devuelve la representación de la asignación.
 
+    def parse_call(self):
+        """Parsea una llamada a función: (func_name arg1 arg2 ...)"""
+        func_name = self.expect("IDENTIFIER")  # Nombre de la función llamada.
+        args = []  # Argumentos de la llamada.
+        while self.current_token and self.current_token[0] != "RPAREN":
+            args.append(self.parse_expression())
+        return {"type": "call", "name": func_name, "args": args}
+
+    def parse_operation(self):
+        """Parsea una operación prefija: (op a b ...). Con más de dos operandos se asocia por la izquierda."""
+        operator = self.current_token[1]  # Obtiene el operador.
+        self.next_token()
+        left = self.parse_expression()  # Analiza la expresión de la izquierda.
+        right = self.parse_expression()  # Analiza la expresión de la derecha.
+        node = {"type": "operation", "operator": operator, "left": left, "right": right}
+        while self.current_token and self.current_token[0] != "RPAREN":  # (+ a b c) equivale a (+ (+ a b) c).
+            node = {"type": "operation", "operator": operator, "left": node, "right": self.parse_expression()}
+        return node  # Devuelve la operación.
+
     def parse_expression(self):
         """Parsea una expresión, que puede ser un valor, operación o llamada a función."""
+        if self.current_token is None:  # Si el código termina antes de la expresión.
+            raise SyntaxError("Fin de código inesperado: se esperaba una expresión")
         if self.current_token[0] == "NUMBER":  # Si el token actual es un número.
             return {"type": "number", "value": self.expect("NUMBER")}  # Devuelve el número como una expresión.
         elif self.current_token[0] == "STRING":  # Si el token actual es una cadena.
             return {"type": "string", "value": self.expect("STRING")}  # Devuelve la cadena como una expresión.
+        elif self.current_token[0] in ("TRUE", "FALSE"):  # Si el token actual es un literal booleano.
+            return {"type": "boolean", "value": self.expect(self.current_token[0])}
+        elif self.current_token[0] == "NULL":  # Si el token actual es el literal null.
+            self.expect("NULL")
+            return {"type": "null"}
         elif self.current_token[0] == "IDENTIFIER":  # Si el token actual es un identificador.
             return {"type": "identifier", "value": self.expect("IDENTIFIER")}  # Devuelve el identificador como una expresión.
         elif self.current_token[0] == "LPAREN":  # Si el token actual es un paréntesis izquierdo (comienza una expresión compleja).
+            line = self.current_token[2]  # Línea donde empieza la forma, para el perfilador y los mensajes.
             self.expect("LPAREN")  # Consume el paréntesis izquierdo.
             expr = self.statement()  # Analiza la expresión dentro de los paréntesis.
             self.expect("RPAREN")  # Consume el paréntesis derecho.
+            expr["line"] = line
             return expr  # Devuelve la expresión analizada.
-        elif self.current_token[0] == "OPERATOR":  # Si el token es un operador (por ejemplo, '+', '-', '*').
-            operator = self.expect("OPERATOR")  # Obtiene el operador.
-            left = self.parse_expression()  # Analiza la expresión de la izquierda.
-            right = self.parse_expression()  # Analiza la expresión de la derecha.
-            return {"type": "operation", "operator": operator, "left": left, "right": right}  # Devuelve la operación.
+        elif self.current_token[0] == "LBRACKET":  # Si el token actual abre un vector literal.
+            return self.parse_vector()
+        elif self.current_token[0] in ("ARITHMETIC_OP", "COMPARISON_OP"):  # Un operador suelto es un valor: (reduce + v)
+            token = self.peek_token()
+            if self.current_token[1] == "-" and token and token[0] == "NUMBER":  # Número negativo: -1
+                self.next_token()
+                return {"type": "number", "value": "-" + self.expect("NUMBER")}
+            return {"type": "identifier", "value": self.expect(self.current_token[0])}
         else:
             raise SyntaxError(f"Expresión inesperada: {self.current_token}")  # Si el token no es una expresión válida.
 
+    def parse_vector(self):
+        """Parsea un vector literal: [1 2 3] o [1, 2, 3]"""
+        self.expect("LBRACKET")  # Consume el corchete izquierdo.
+        items = []  # Elementos del vector.
+        while self.current_token and self.current_token[0] != "RBRACKET":
+            if self.current_token[0] == "COMMA":  # Las comas son opcionales.
+                self.next_token()
+                continue
+            items.append(self.parse_expression())
+        self.expect("RBRACKET")  # Consume el corchete derecho.
+        return {"type": "vector", "items": items}
+
     def parse_if_statement(self):
-        """Parsea una sentencia condicional if: (if (condition) (then) (else))"""
+        """Parsea una sentencia condicional if: (if condition then [else])"""
         self.expect("IF")  # Espera y consume el token 'IF'.
-        self.expect("LPAREN")  # Consume el paréntesis izquierdo de la condición.
         condition = self.parse_expression()  # Analiza la condición.
-        self.expect("RPAREN")  # Consume el paréntesis derecho de la condición.
         then_expr = self.parse_expression()  # Analiza la expresión a ejecutar si la condición es verdadera.
-        self.expect("RPAREN")  # Consume el paréntesis derecho del bloque 'then'.
-        else_expr = self.parse_expression()  # Analiza la expresión a ejecutar si la condición es falsa.
+        else_expr = None  # La rama 'else' es opcional.
+        if self.current_token and self.current_token[0] != "RPAREN":
+            else_expr = self.parse_expression()  # Analiza la expresión a ejecutar si la condición es falsa.
         return {"type": "if", "condition": condition, "then": then_expr, "else": else_expr}  # Devuelve la sentencia 'if'.
 
+    def parse_while_statement(self):
+        """Parsea un bucle: (while condition body...)"""
+        self.expect("WHILE")  # Espera y consume el token 'WHILE'.
+        condition = self.parse_expression()  # Analiza la condición del bucle.
+        body = self.parse_body()  # Analiza el cuerpo del bucle.
+        return {"type": "while", "condition": condition, "body": body}
+
+    def parse_print(self):
+        """Parsea una impresión: (print expr1 expr2 ...)"""
+        self.expect("PRINT")  # Espera y consume el token 'PRINT'.
+        args = []  # Expresiones que se imprimirán.
+        while self.current_token and self.current_token[0] != "RPAREN":
+            args.append(self.parse_expression())
+        return {"type": "print", "args": args}
+
 # Ejemplo de uso con el lexer y parser
 
 def test_parser():
+    try:
+        from .lexer import lexer  # Importación dentro del paquete.
+    except ImportError:
+        from lexer import lexer  # Importación al ejecutar el archivo directamente.
+
     code = '''
     (define square (x) (* x x))
     (define add (a b) (+ a b))
-    (if (> x 10) (print "Mayor que 10") (print "Menor o igual a 10"))
     (x = (add 5 3))
+    (if (> x 10) (print "Mayor que 10") (print "Menor o igual a 10"))
     '''
-    parser = SimpylParser(lexer)  # Asumimos que 'lexer' es el lexer previamente definido.
+    parser = SimpylParser(lexer)  # Crea el parser a partir del lexer.
     ast = parser.parse(code)  # Analiza el código y genera el AST.
     print(ast)  # Imprime el AST resultante.
 
-test_parser()  # Ejecuta la función de prueba.
+if __name__ == "__main__":
+    test_parser()  # Ejecuta la función de prueba.
@@ -0,0 +1,199 @@
+import time  # Reloj de alta resolución para medir tiempos
+
+
+class ProfileEntry:
+    """Estadísticas acumuladas de una función de usuario o de una forma de nivel superior."""
+
+    __slots__ = ("name", "line", "calls", "total", "own")
+
+    def __init__(self, name, line):
+        self.name = name  # Nombre de la función o descripción de la forma
+        self.line = line  # Línea del código fuente donde empieza
+        self.calls = 0  # Número de llamadas
+        self.total = 0.0  # Tiempo total en segundos, incluidas las llamadas internas
+        self.own = 0.0  # Tiempo propio en segundos, sin las llamadas a otras funciones perfiladas
+
+    @property
+    def label(self):
+        return key_label((self.name, self.line))
+
+
+def key_label(key):
+    """Texto de una clave (nombre, línea) en el informe y en las pilas colapsadas."""
+    name, line = key
+    return f"{name}:{line}" if line is not None else name
+
+
+def form_label(node):
+    """Nombre con el que aparece una forma de nivel superior en el informe."""
+    if node["type"] == "call":
+        return f"<{node['name']}>"
+    if node["type"] == "function_definition":
+        return f"<define {node['name']}>"
+    if node["type"] == "assignment":
+        return f"<{node['name']} =>"
+    return f"<{node['type']}>"
+
+
+class Profiler:
+    """Perfilador de formas y funciones de Simpyl.
+
+    Los compiladores sólo insertan las llamadas a `enter` y `exit` mientras `enabled` es verdadero,
+    así que el código compilado sin perfilar no paga ningún coste; las funciones compiladas con el
+    perfilador activo se siguen midiendo aunque después se desactive. Las claves son tuplas (nombre, línea).
+    Además de las estadísticas por clave se acumula el tiempo propio de cada pila de llamadas,
+    que `write_collapsed` guarda en el formato de pilas colapsadas de los flame graphs.
+    """
+
+    def __init__(self, enabled=True, clock=time.perf_counter):
+        self.enabled = enabled  # Los compiladores instrumentan el código nuevo
+        self.clock = clock  # Función que devuelve el instante actual en segundos
+        self.entries = {}  # (nombre, línea) -> ProfileEntry
+        self.stacks = {}  # "forma;f;g" -> tiempo propio en segundos
+        self.stack = []  # Llamadas en curso: [clave, inicio, tiempo de las llamadas internas, pila colapsada]
+        self.active = {}  # clave -> llamadas en curso, para no contar dos veces el total de una recursión
+
+    def enter(self, key):
+        """Empieza a medir una llamada."""
+        self.active[key] = self.active.get(key, 0) + 1
+        label = key_label(key)
+        path = f"{self.stack[-1][3]};{label}" if self.stack else label
+        self.stack.append([key, self.clock(), 0.0, path])
+
+    def exit(self):
+        """Termina de medir la llamada más reciente."""
+        now = self.clock()
+        key, start, inner, path = self.stack.pop()
+        elapsed = now - start
+        entry = self.entries.get(key)
+        if entry is None:
+            entry = self.entries[key] = ProfileEntry(*key)
+        entry.calls += 1
+        entry.own += elapsed - inner
+        self.active[key] -= 1
+        if not self.active[key]:  # Sólo la llamada más externa de una recursión suma al total
+            entry.total += elapsed
+        if self.stack:
+            self.stack[-1][2] += elapsed
+        self.stacks[path] = self.stacks.get(path, 0.0) + elapsed - inner
+
+    def exit_to(self, depth):
+        """Cierra las llamadas abiertas por encima de `depth`, por ejemplo tras un error."""
+        while len(self.stack) > depth:
+            self.exit()
+
+    def clear(self):
+        """Descarta todas las mediciones."""
+        self.entries.clear()
+        self.stacks.clear()
+        self.stack.clear()
+        self.active.clear()
+
+    def report(self, limit=30):
+        """Informe ordenado por tiempo propio."""
+        if not self.entries:
+            return "No hay datos de perfilado."
+        entries = sorted(self.entries.values(), key=lambda entry: entry.own, reverse=True)
+        lines = [f"{'llamadas':>10} {'total (s)':>11} {'propio (s)':>11} {'por llamada (ms)':>17}  nombre:línea"]
+        for entry in entries[:limit]:
+            per_call = entry.total / entry.calls * 1000
+            lines.append(f"{entry.calls:>10} {entry.total:>11.6f} {entry.own:>11.6f} {per_call:>17.4f}  {entry.label}")
+        if len(entries) > limit:
+            lines.append(f"... {len(entries) - limit} entradas más")
+        return "\n".join(lines)
+
+    def write_collapsed(self, path):
+        """Guarda las pilas colapsadas ("forma;f;g microsegundos"), la entrada de flamegraph.pl y speedscope."""
+        with open(path, "w", encoding="utf-8") as file:
+            for stack, seconds in sorted(self.stacks.items()):
+                microseconds = round(seconds * 1_000_000)
+                if microseconds:
+                    file.write(f"{stack} {microseconds}\n")
+
+
+def test_profiler():
+    """Comprueba las mediciones con un reloj simulado y el perfilado de programas en los dos motores.
+
+    Con el reloj simulado se conocen exactamente el tiempo total y el propio de cada clave,
+    también en las recursiones, tras exit_to y en las pilas colapsadas.
+    """
+    import os
+    import tempfile
+
+    try:
+        from .simpyl_interpreter import SimpylInterpreter
+    except ImportError:
+        from simpyl_interpreter import SimpylInterpreter
+
+    now = [0.0]
+    profiler = Profiler(clock=lambda: now[0])
+
+    def advance(seconds):
+        now[0] += seconds
+
+    # forma (1 s) -> f (2 s) -> f (3 s) -> g (4 s); la forma termina 5 s después
+    profiler.enter(("<x =>", 1))
+    advance(1)
+    profiler.enter(("f", 2))
+    advance(2)
+    profiler.enter(("f", 2))
+    advance(3)
+    profiler.enter(("g", 3))
+    advance(4)
+    profiler.exit_to(1)  # Cierra g y las dos llamadas a f, como tras un error
+    assert len(profiler.stack) == 1
+    advance(5)
+    profiler.exit()
+    form, f, g = profiler.entries[("<x =>", 1)], profiler.entries[("f", 2)], profiler.entries[("g", 3)]
+    assert (form.calls, form.total, form.own) == (1, 15, 6)
+    assert (f.calls, f.total, f.own) == (2, 9, 5)  # La llamada recursiva no suma dos veces al total
+    assert (g.calls, g.total, g.own) == (1, 4, 4)
+    assert profiler.stacks == {"<x =>:1": 6, "<x =>:1;f:2": 2, "<x =>:1;f:2;f:2": 3, "<x =>:1;f:2;f:2;g:3": 4}
+    assert profiler.active == {("<x =>", 1): 0, ("f", 2): 0, ("g", 3): 0}
+    assert key_label(("<x =>", None)) == "<x =>" and g.label == "g:3"
+
+    report = profiler.report().splitlines()
+    assert report[0].split() == ["llamadas", "total", "(s)", "propio", "(s)", "por", "llamada", "(ms)", "nombre:línea"]
+    assert [line.rsplit("  ", 1)[1] for line in report[1:]] == ["<x =>:1", "f:2", "g:3"]  # Por tiempo propio
+    assert report[2].split()[:4] == ["2", "9.000000", "5.000000", "4500.0000"]
+    assert profiler.report(limit=1).splitlines()[-1] == "... 2 entradas más"
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "pilas.txt")
+        profiler.write_collapsed(path)
+        with open(path, encoding="utf-8") as file:
+            assert file.read() == ("<x =>:1 6000000\n<x =>:1;f:2 2000000\n"
+                                   "<x =>:1;f:2;f:2 3000000\n<x =>:1;f:2;f:2;g:3 4000000\n")
+    profiler.clear()
+    assert not profiler.entries and not profiler.stacks and not profiler.stack
+    assert profiler.report() == "No hay datos de perfilado."
+
+    # Programas perfilados: las mismas claves y llamadas en los dos motores, también tras un error
+    source = ("(define fib (n) (if (< n 2) n (+ (fib (- n 1)) (fib (- n 2)))))\n"
+              "(x = (fib 6))\n"
+              "(define falla (n) (/ n 0))\n"
+              "(define llama (n) (+ (falla n) 1))\n"
+              "(llama 1)\n")
+    for engine in ("closure", "vm"):
+        interpreter = SimpylInterpreter(engine=engine)
+        assert interpreter.enable_profile() == "Perfilado habilitado."
+        result = interpreter.run_source(source)
+        assert isinstance(result, str) and "ZeroDivisionError" in result, (engine, result)
+        profiler = interpreter.profiler
+        calls = {key: entry.calls for key, entry in profiler.entries.items()}
+        assert calls == {("<define fib>", 1): 1, ("fib", 1): 25, ("<x =>", 2): 1, ("<define falla>", 3): 1,
+                         ("<define llama>", 4): 1, ("falla", 3): 1, ("llama", 4): 1, ("<llama>", 5): 1}, (engine, calls)
+        assert not profiler.stack and not any(profiler.active.values()), engine
+        assert "<x =>:2;fib:1;fib:1;fib:1;fib:1;fib:1;fib:1" in profiler.stacks
+        assert "<llama>:5;llama:4;falla:3" in profiler.stacks
+        assert all(entry.total >= entry.own >= 0 for entry in profiler.entries.values())
+
+        # Las funciones ya compiladas se siguen midiendo; el código nuevo no se instrumenta
+        interpreter.execute_command("(disable-profile)")
+        interpreter.run_source("(define doble (n) (* n 2)) (fib 2) (doble 2)")
+        assert profiler.entries[("fib", 1)].calls == 28 and ("doble", 1) not in profiler.entries, engine
+    print("OK: perfilador")
+
+
+if __name__ == "__main__":
+    test_profiler()
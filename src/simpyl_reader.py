@@ -0,0 +1,88 @@
+import re  # Para localizar separadores dentro del buffer
+
+try:
+    from .lexer import TOKEN_IDS, TokenArray, scan  # Importación dentro del paquete
+except ImportError:
+    from lexer import TOKEN_IDS, TokenArray, scan  # Importación al ejecutar el archivo directamente
+
+CHUNK_SIZE = 1 << 16  # Caracteres leídos del archivo en cada bloque
+DELIMITER = re.compile(r'[\s()\[\],]')  # Caracteres que terminan siempre un token
+
+
+class Form:
+    """Forma de nivel superior completa: sus tokens, su texto original y la línea donde empieza."""
+
+    __slots__ = ("tokens", "text", "line")
+
+    def __init__(self, tokens, text, line):
+        self.tokens = tokens  # TokenArray; al recorrerlo da (tipo, valor, línea) como el lexer
+        self.text = text  # Texto original de la forma
+        self.line = line  # Línea de inicio en el archivo
+
+    def __repr__(self):
+        return f"<forma línea {self.line}: {self.text[:40]!r}>"
+
+
+def read_forms(file, chunk_size=CHUNK_SIZE):
+    """Lee un archivo por bloques y genera cada forma de nivel superior en cuanto se cierra su paréntesis.
+
+    Sólo se conserva en memoria la forma que se está leyendo, así que el consumo no depende del
+    tamaño del archivo y la ejecución puede empezar antes de leerlo entero.
+    """
+    buffer = ""  # Texto leído que aún no forma parte de una forma emitida
+    line_num = 1  # Línea en la que empieza el buffer
+    eof = False
+    while not eof:
+        chunk = file.read(chunk_size)
+        if chunk:
+            buffer += chunk
+        else:
+            eof = True
+        consumed = 0  # Final de la última forma emitida dentro del buffer
+        depth = 0  # Profundidad de paréntesis de la forma actual
+        tokens = TokenArray()
+        form_start = form_line = None
+        sign_end = None  # Final de un '-' de nivel superior que aún puede ser el signo de un número
+        for kind, value, token_line, match in scan(buffer, line_num):
+            start, end = match.span()
+            if not eof and (value == '"' or (value == '/' and buffer.startswith('*', end))):
+                break  # Cadena o comentario cortados por el final del bloque: se espera al siguiente
+            if not eof and (kind == 'MISMATCH' or end == len(buffer)) and not DELIMITER.search(buffer, start):
+                break  # La última palabra del bloque puede estar cortada (por ejemplo "3." de "3.5")
+            if kind == 'MISMATCH':
+                raise SyntaxError(f'Carácter no esperado "{value}" en la línea {token_line}')
+            if sign_end is not None:
+                if kind != 'NUMBER':  # No es un signo: el '-' es una forma por sí mismo
+                    tokens.source = buffer[form_start:sign_end]
+                    yield Form(tokens, tokens.source, form_line)
+                    tokens = TokenArray()
+                    form_start = None
+                    consumed = sign_end
+                    line_num = form_line
+                sign_end = None
+            if form_start is None:
+                form_start, form_line = start, token_line
+            tokens.append(TOKEN_IDS[kind], start - form_start, end - form_start, token_line)
+            if kind == 'LPAREN' or kind == 'LBRACKET':
+                depth += 1
+            elif kind == 'RPAREN' or kind == 'RBRACKET':
+                depth -= 1
+                if depth < 0:
+                    raise SyntaxError(f"Cierre de '{value}' sin abrir en la línea {token_line}")
+            if depth == 0:
+                if kind == 'ARITHMETIC_OP' and value == '-':
+                    sign_end = end  # Como en el parser, '-' seguido de un número es un número negativo: -5
+                    continue
+                tokens.source = buffer[form_start:end]  # Los valores se recortan del texto de la forma
+                yield Form(tokens, tokens.source, form_line)
+                tokens = TokenArray()
+                form_start = None
+                consumed = end
+                line_num = token_line
+        if eof and sign_end is not None:  # El archivo termina en un '-' suelto
+            tokens.source = buffer[form_start:sign_end]
+            yield Form(tokens, tokens.source, form_line)
+            tokens = TokenArray()
+        buffer = buffer[consumed:]  # Descarta lo ya emitido
+    if tokens:
+        raise SyntaxError(f"Falta un paréntesis de cierre en la forma que empieza en la línea {form_line}")
@@ -0,0 +1,462 @@
+import functools  # Reducción genérica con funciones de usuario
+import numbers  # Para reconocer valores numéricos
+import operator  # Operadores que admiten reducción vectorizada
+import types  # Para reconocer las funciones predefinidas de Python
+
+np = None  # NumPy (opcional): almacenamiento contiguo y operaciones vectorizadas; sin él se usan listas
+numpy_checked = False  # Ya se intentó importar NumPy
+
+
+def load_numpy():
+    """Importa NumPy al crear el primer vector, para no retrasar el arranque de los programas que no los usan."""
+    global np, numpy_checked
+    if not numpy_checked:
+        numpy_checked = True
+        try:
+            import numpy
+            np = numpy
+        except ImportError:
+            pass  # Sin NumPy los vectores usan listas de Python
+    return np
+
+PRINT_THRESHOLD = 1000  # A partir de este tamaño sólo se muestran los extremos al imprimir
+PRINT_EDGE = 3  # Elementos mostrados en cada extremo
+
+
+class SimpylVector:
+    """Vector numérico de Simpyl.
+
+    Con NumPy los datos se guardan en un ndarray y los operadores, `map`, `filter`, `reduce`,
+    `sum` y `dot` trabajan sobre el array completo; sin NumPy se guardan en una lista y las
+    mismas operaciones se hacen elemento a elemento. Los operadores aceptan otro vector de la
+    misma longitud o un número, que se aplica a todos los elementos. Las comparaciones
+    devuelven un vector de booleanos, por eso el valor de verdad de un vector es ambiguo.
+    """
+
+    __slots__ = ("data",)
+    __hash__ = None  # `==` compara elemento a elemento: los vectores no son hashables
+
+    def __init__(self, data):
+        self.data = data  # ndarray o lista de Python
+
+    @classmethod
+    def from_values(cls, values):
+        """Crea un vector a partir de una secuencia de números."""
+        if load_numpy() is not None:
+            data = np.asarray(values)
+            if data.ndim != 1 or data.dtype.kind not in "biuf":
+                raise TypeError("Los vectores sólo admiten números")
+            return cls(data)
+        data = list(values)
+        for value in data:
+            if not isinstance(value, numbers.Number) or isinstance(value, complex):
+                raise TypeError("Los vectores sólo admiten números")
+        return cls(data)
+
+    def tolist(self):
+        """Elementos como valores de Python."""
+        if np is not None:
+            return self.data.tolist()
+        return list(self.data)
+
+    def __reduce__(self):
+        # Se guarda como lista de números: al cargarlo se usa el almacenamiento disponible en ese proceso
+        return SimpylVector.from_values, (self.tolist(),)
+
+    def __len__(self):
+        return len(self.data)
+
+    def __iter__(self):
+        return iter(self.tolist())
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return SimpylVector(self.data[index])
+        value = self.data[index]
+        return value.item() if np is not None else value
+
+    def __bool__(self):
+        raise TypeError("El valor de verdad de un vector es ambiguo; usa 'filter', 'sum' o 'len'")
+
+    def binary(self, op, other, reflected=False):
+        """Aplica un operador binario de Python con difusión de escalares."""
+        if isinstance(other, SimpylVector):
+            if len(other) != len(self):
+                raise ValueError(f"Vectores de distinta longitud: {len(self)} y {len(other)}")
+            other = other.data
+        elif not isinstance(other, numbers.Number):
+            return NotImplemented
+        if np is not None:
+            left, right = (other, self.data) if reflected else (self.data, other)
+            with np.errstate(divide="raise", invalid="raise"):  # División por cero como error, igual que sin NumPy
+                try:
+                    return SimpylVector(op(left, right))
+                except FloatingPointError:
+                    raise ZeroDivisionError("División por cero en una operación de vectores") from None
+        if isinstance(other, list):
+            pairs = zip(other, self.data) if reflected else zip(self.data, other)
+            return SimpylVector([op(a, b) for a, b in pairs])
+        if reflected:
+            return SimpylVector([op(other, a) for a in self.data])
+        return SimpylVector([op(a, other) for a in self.data])
+
+    def __add__(self, other):
+        return self.binary(operator.add, other)
+
+    def __radd__(self, other):
+        return self.binary(operator.add, other, reflected=True)
+
+    def __sub__(self, other):
+        return self.binary(operator.sub, other)
+
+    def __rsub__(self, other):
+        return self.binary(operator.sub, other, reflected=True)
+
+    def __mul__(self, other):
+        return self.binary(operator.mul, other)
+
+    def __rmul__(self, other):
+        return self.binary(operator.mul, other, reflected=True)
+
+    def __truediv__(self, other):
+        return self.binary(operator.truediv, other)
+
+    def __rtruediv__(self, other):
+        return self.binary(operator.truediv, other, reflected=True)
+
+    def __mod__(self, other):
+        return self.binary(operator.mod, other)
+
+    def __rmod__(self, other):
+        return self.binary(operator.mod, other, reflected=True)
+
+    def __eq__(self, other):
+        return self.binary(operator.eq, other)
+
+    def __ne__(self, other):
+        return self.binary(operator.ne, other)
+
+    def __lt__(self, other):
+        return self.binary(operator.lt, other)
+
+    def __le__(self, other):
+        return self.binary(operator.le, other)
+
+    def __gt__(self, other):
+        return self.binary(operator.gt, other)
+
+    def __ge__(self, other):
+        return self.binary(operator.ge, other)
+
+    def __neg__(self):
+        return SimpylVector(-self.data) if np is not None else SimpylVector([-a for a in self.data])
+
+    def __abs__(self):
+        return SimpylVector(abs(self.data)) if np is not None else SimpylVector([abs(a) for a in self.data])
+
+    def is_mask(self):
+        """Indica si el vector contiene sólo booleanos, como el resultado de una comparación."""
+        if np is not None:
+            return self.data.dtype.kind == "b"
+        return all(value is True or value is False for value in self.data)
+
+    def __str__(self):
+        values = self.tolist()
+        if len(values) > PRINT_THRESHOLD:
+            head = ", ".join(map(str, values[:PRINT_EDGE]))
+            tail = ", ".join(map(str, values[-PRINT_EDGE:]))
+            return f"[{head}, ..., {tail}]"
+        return "[" + ", ".join(map(str, values)) + "]"
+
+    def __repr__(self):
+        return f"vector{self}"
+
+
+def to_vector(value):
+    """Convierte listas, tuplas y rangos de números en vectores; los vectores se devuelven tal cual."""
+    if isinstance(value, SimpylVector):
+        return value
+    if isinstance(value, (list, tuple, range)):
+        return SimpylVector.from_values(value)
+    raise TypeError(f"Se esperaba un vector, pero se recibió {type(value).__name__}")
+
+
+def vector(*values):
+    """(vector 1 2 3) o (vector lista): crea un vector numérico."""
+    if len(values) == 1 and isinstance(values[0], (list, tuple, range, SimpylVector)):
+        return to_vector(values[0])
+    return SimpylVector.from_values(values)
+
+
+# Operadores de Simpyl que SimpylVector aplica elemento a elemento sin pedir valores de verdad
+ARITHMETIC_OPERATORS = {'+', '-', '*', '/', '%'}
+COMPARISON_OPERATORS = {'==', '!=', '<', '<=', '>', '>='}
+
+# Funciones de Python sin efectos secundarios que aceptan vectores completos y tipo de su resultado
+PURE_FUNCTIONS = {
+    abs: "number",
+    operator.neg: "number",
+    operator.add: "number",
+    operator.sub: "number",
+    operator.mul: "number",
+    operator.truediv: "number",
+    operator.mod: "number",
+    operator.eq: "mask",
+    operator.ne: "mask",
+    operator.lt: "mask",
+    operator.le: "mask",
+    operator.gt: "mask",
+    operator.ge: "mask",
+}
+
+
+def vector_result(params, body):
+    """Analiza el cuerpo de una función de usuario para saber si puede aplicarse a vectores completos.
+
+    Sólo se aceptan expresiones sin efectos secundarios que no piden el valor de verdad de sus
+    operandos: parámetros, números y operadores aritméticos o de comparación. Devuelve "number" o
+    "mask" (una comparación) según el resultado, o None si la función debe llamarse elemento a
+    elemento (llamadas, asignaciones, print, if, variables globales o un resultado que no depende
+    de los parámetros).
+    """
+    def kind(node):
+        node_type = node["type"]
+        if node_type == "identifier":
+            return "number" if node["value"] in params else None
+        if node_type == "number":
+            return "scalar"
+        if node_type == "block" and len(node["body"]) == 1:
+            return kind(node["body"][0])
+        if node_type != "operation":
+            return None
+        left, right = kind(node["left"]), kind(node["right"])
+        if left not in ("number", "scalar") or right not in ("number", "scalar"):
+            return None  # Las máscaras no admiten aritmética con todos los almacenamientos
+        if node["operator"] in COMPARISON_OPERATORS:
+            return "mask" if "number" in (left, right) else "scalar"
+        if node["operator"] in ARITHMETIC_OPERATORS:
+            return "number" if "number" in (left, right) else "scalar"
+        return None
+
+    result = kind(body)
+    return result if result in ("number", "mask") else None
+
+
+def vector_kind(function):
+    """Tipo de resultado de `function` aplicada a vectores completos, o None si no puede vectorizarse.
+
+    Las funciones de usuario guardan en `vectorized` el resultado de vector_result al compilarse.
+    """
+    if isinstance(function, types.BuiltinFunctionType):
+        return PURE_FUNCTIONS.get(function)
+    return getattr(function, "vectorized", None)
+
+
+def simpyl_map(function, *sequences):
+    """(map f v ...): aplica una función a cada elemento de uno o varios vectores.
+
+    Si el análisis de vector_kind demuestra que la función es pura y sólo usa operadores, se
+    llama una sola vez con los vectores completos; si no, una vez por elemento.
+    """
+    if not sequences:
+        raise TypeError("'map' necesita al menos un vector")
+    vectors = [to_vector(sequence) for sequence in sequences]
+    if any(len(v) != len(vectors[0]) for v in vectors):
+        raise ValueError("'map' necesita vectores de la misma longitud")
+    if vector_kind(function) is not None:
+        return function(*vectors)
+    return SimpylVector.from_values([function(*items) for items in zip(*(v.tolist() for v in vectors))])
+
+
+def simpyl_filter(predicate, sequence):
+    """(filter f v): elementos de v para los que f es verdadera; f también puede ser una máscara booleana."""
+    values = to_vector(sequence)
+    if isinstance(predicate, SimpylVector):
+        mask = predicate
+        if not mask.is_mask() or len(mask) != len(values):
+            raise TypeError("La máscara de 'filter' debe ser un vector de booleanos de la misma longitud")
+    elif vector_kind(predicate) == "mask":
+        mask = predicate(values)  # Una comparación pura: la máscara se calcula de una vez
+    else:
+        return SimpylVector.from_values([value for value in values.tolist() if predicate(value)])
+    if np is not None:
+        return SimpylVector(values.data[mask.data])
+    return SimpylVector([value for value, keep in zip(values.data, mask.data) if keep])
+
+
+# Funciones que se reducen con la ufunc de NumPy correspondiente en lugar de llamarlas elemento a elemento
+REDUCERS = {
+    operator.add: "add",
+    operator.mul: "multiply",
+    max: "maximum",
+    min: "minimum",
+}
+
+
+def simpyl_reduce(function, sequence, *initial):
+    """(reduce f v [inicial]): combina los elementos de v de izquierda a derecha con f."""
+    if len(initial) > 1:
+        raise TypeError("'reduce' admite como mucho un valor inicial")
+    values = to_vector(sequence)
+    if not len(values) and not initial:
+        raise ValueError("'reduce' de un vector vacío necesita un valor inicial")
+    ufunc = REDUCERS.get(function) if np is not None else None
+    if ufunc is not None:
+        result = getattr(np, ufunc).reduce(values.data)
+        if len(values):
+            result = result.item()
+            return function(initial[0], result) if initial else result
+        return initial[0]
+    return functools.reduce(function, values.tolist(), *initial)
+
+
+def simpyl_sum(sequence, start=0):
+    """(sum v): suma de los elementos de un vector o de una lista."""
+    if isinstance(sequence, SimpylVector):
+        if np is not None:
+            return start + sequence.data.sum().item()
+        return sum(sequence.data, start)
+    return sum(sequence, start)
+
+
+def dot(left, right):
+    """(dot a b): producto escalar de dos vectores de la misma longitud."""
+    left, right = to_vector(left), to_vector(right)
+    if len(left) != len(right):
+        raise ValueError(f"Vectores de distinta longitud: {len(left)} y {len(right)}")
+    if np is not None:
+        return np.dot(left.data, right.data).item()
+    return sum(a * b for a, b in zip(left.data, right.data))
+
+
+def simpyl_slice(sequence, start, stop=None, step=None):
+    """(slice v inicio [fin [paso]]): porción de un vector, lista o cadena."""
+    return sequence[start:stop:step]
+
+
+# Funciones de vectores disponibles en los programas Simpyl
+VECTOR_BUILTINS = {
+    'vector': vector,
+    'map': simpyl_map,
+    'filter': simpyl_filter,
+    'reduce': simpyl_reduce,
+    'sum': simpyl_sum,
+    'dot': dot,
+    'slice': simpyl_slice,
+}
+
+
+def test_vectors():
+    """Comprueba los vectores con NumPy (si está instalado) y con listas de Python.
+
+    Se prueban los operadores y las máscaras, map, filter y reduce con funciones de Python y con
+    funciones de usuario de los motores closure y vm, dot, slice y el análisis de vector_result.
+    """
+    import sys  # Módulos cargados
+
+    try:
+        from . import simpyl_vector
+        from .simpyl_interpreter import SimpylInterpreter
+        from .simpyl_parser import SimpylParser
+        from .lexer import lexer
+    except ImportError:
+        import simpyl_vector
+        from simpyl_interpreter import SimpylInterpreter
+        from simpyl_parser import SimpylParser
+        from lexer import lexer
+
+    # Ejecutado como script este archivo es __main__ y el intérprete usa otra copia, simpyl_vector
+    modules = {sys.modules[__name__], simpyl_vector}
+
+    def expect_error(error, function, *args):
+        try:
+            function(*args)
+        except error:
+            return
+        raise AssertionError(f"Se esperaba {error.__name__} en {function.__name__}{args}")
+
+    def check_storage():
+        v = vector(1, 2, 3, 4)
+        assert list(v) == [1, 2, 3, 4] and len(v) == 4 and v[1] == 2 and type(v[1]) is int
+        assert (v + 1).tolist() == [2, 3, 4, 5] and (10 - v).tolist() == [9, 8, 7, 6]
+        assert (v * v).tolist() == [1, 4, 9, 16] and (v % 2).tolist() == [1, 0, 1, 0]
+        assert (v / 2).tolist() == [0.5, 1.0, 1.5, 2.0] and (-v).tolist() == [-1, -2, -3, -4]
+        assert abs(vector(-1, 2)).tolist() == [1, 2] and v[1:3].tolist() == [2, 3]
+        mask = v > 2
+        assert isinstance(mask, SimpylVector) and mask.is_mask() and not v.is_mask()
+        assert mask.tolist() == [False, False, True, True] and (v == v).tolist() == [True] * 4
+        expect_error(TypeError, bool, mask)
+        expect_error(ValueError, operator.add, v, vector(1, 2))
+        expect_error(ZeroDivisionError, operator.truediv, v, 0)
+        expect_error(TypeError, vector, 1, "a")
+        expect_error(TypeError, to_vector, "abc")
+        assert vector([1, 2]).tolist() == vector(range(1, 3)).tolist() == [1, 2] and to_vector(v) is v
+        assert str(v) == "[1, 2, 3, 4]" and repr(v) == "vector[1, 2, 3, 4]"
+        assert str(vector(range(PRINT_THRESHOLD + 1))) == f"[0, 1, 2, ..., {PRINT_THRESHOLD - 2}, {PRINT_THRESHOLD - 1}, {PRINT_THRESHOLD}]"
+
+        # Las funciones de Python conocidas reciben el vector completo; las demás, cada elemento
+        assert simpyl_map(abs, vector(-1, 2)).tolist() == [1, 2]
+        assert simpyl_map(operator.add, v, v).tolist() == [2, 4, 6, 8]
+        assert simpyl_map(lambda x: x * 10, v).tolist() == [10, 20, 30, 40]
+        expect_error(ValueError, simpyl_map, operator.add, v, vector(1))
+        expect_error(TypeError, simpyl_map, abs)
+        assert simpyl_filter(mask, v).tolist() == [3, 4]
+        assert simpyl_filter(lambda x: x % 2, v).tolist() == [1, 3]
+        expect_error(TypeError, simpyl_filter, v, v)
+        assert simpyl_reduce(operator.add, v) == 10 and simpyl_reduce(operator.mul, v, 2) == 48
+        assert simpyl_reduce(max, v) == 4 and simpyl_reduce(operator.add, vector(), 7) == 7
+        assert simpyl_reduce(lambda a, b: a * 10 + b, v) == 1234
+        expect_error(ValueError, simpyl_reduce, operator.add, vector())
+        assert simpyl_sum(v) == 10 and simpyl_sum([1, 2], 3) == 6
+        assert dot(v, [1, 0, 1, 0]) == 4 and dot(vector(0.5), vector(2)) == 1.0
+        expect_error(ValueError, dot, v, vector(1))
+        assert simpyl_slice(v, 1).tolist() == [2, 3, 4] and simpyl_slice(v, 0, 4, 2).tolist() == [1, 3]
+        assert simpyl_slice("hola", 1, 3) == "ol" and simpyl_slice([1, 2, 3], -1) == [3]
+
+        # Funciones de usuario: las puras reciben el vector completo en los dos motores
+        program = ("(define doble (x) (* x 2)) (define par (x) (== (% x 2) 0)) (define suma (a b) (+ a b)) "
+                   "(define uno (x) (print x) x) (v = (vector 1 2 3 4))")
+        for engine in ("closure", "vm"):
+            interpreter = SimpylInterpreter(engine=engine)
+            interpreter.run_source(program)
+            assert interpreter.run_source("doble").vectorized == "number"
+            assert interpreter.run_source("par").vectorized == "mask"
+            assert interpreter.run_source("uno").vectorized is None
+            assert interpreter.run_source("(map doble v)").tolist() == [2, 4, 6, 8], engine
+            assert interpreter.run_source("(filter par v)").tolist() == [2, 4], engine
+            assert interpreter.run_source("(filter (> v 2) v)").tolist() == [3, 4], engine
+            assert interpreter.run_source("(reduce suma v 10)") == 20, engine
+            assert interpreter.run_source("(dot v (map doble v))") == 60, engine
+
+    parser = SimpylParser(lexer)
+
+    def analyze(source):
+        node = parser.parse(source)[0]
+        return vector_result(node["params"], node["body"])
+
+    assert analyze("(define f (x) (* x 2))") == "number"
+    assert analyze("(define f (x y) (+ (* x y) 1))") == "number"
+    assert analyze("(define f (x) (> x 2))") == "mask"
+    assert analyze("(define f (x) (* (> x 2) 2))") is None  # Aritmética con una máscara
+    assert analyze("(define f (x) (+ x y))") is None  # Variable global
+    assert analyze("(define f (x) (* 2 3))") is None  # No depende de los parámetros
+    assert analyze("(define f (x) (print x))") is None
+    assert analyze("(define f (x) (if (> x 0) x 0))") is None
+
+    saved = [(module, module.np, module.numpy_checked) for module in modules]
+    storages = ["listas"]
+    try:
+        if all(module.load_numpy() is not None for module in modules):
+            storages.insert(0, "NumPy")
+            check_storage()
+        for module in modules:
+            module.np, module.numpy_checked = None, True  # Sin NumPy: los vectores usan listas
+        check_storage()
+    finally:
+        for module, numpy, checked in saved:
+            module.np, module.numpy_checked = numpy, checked
+    print(f"OK: vectores con {' y '.join(storages)}")
+
+
+if __name__ == "__main__":
+    test_vectors()
@@ -0,0 +1,1252 @@
+import sys  # Presupuesto de pasos ilimitado
+import time  # Tiempo máximo de los programas limitados con `limit`
+from array import array  # Codificación compacta de las instrucciones
+
+try:
+    from .simpyl_compiler import (  # Importación dentro del paquete
+        BUILTINS, DEFAULT_MAX_DEPTH, OPERATORS, SAFE_POINT_STEPS, TAIL_NODES, UNBOUND, SimpylBudgetError,
+        SimpylCompiler, SimpylRecursionError, assigned_names, parse_number, parse_string,
+    )
+    from .simpyl_memo import MemoizedFunction, memoize
+    from .simpyl_vector import SimpylVector, vector_result
+except ImportError:
+    from simpyl_compiler import (  # Importación al ejecutar el archivo directamente
+        BUILTINS, DEFAULT_MAX_DEPTH, OPERATORS, SAFE_POINT_STEPS, TAIL_NODES, UNBOUND, SimpylBudgetError,
+        SimpylCompiler, SimpylRecursionError, assigned_names, parse_number, parse_string,
+    )
+    from simpyl_memo import MemoizedFunction, memoize
+    from simpyl_vector import SimpylVector, vector_result
+
+# Códigos de operación. Cada instrucción ocupa cuatro enteros: (opcode, a, b, c)
+LOAD_CONST = 0  # r[a] = consts[b]
+MOVE = 1  # r[a] = r[b]
+LOAD_GLOBAL = 2  # r[a] = globales[b]
+STORE_GLOBAL = 3  # globales[b] = r[a]
+ADD = 4  # r[a] = r[b] + r[c]
+SUB = 5
+MUL = 6
+DIV = 7
+MOD = 8
+EQ = 9
+NE = 10
+LT = 11
+LE = 12
+GT = 13
+GE = 14
+ADD_K = 15  # r[a] = r[b] + consts[c]
+SUB_K = 16
+MUL_K = 17
+EQ_K = 18
+NE_K = 19
+LT_K = 20
+LE_K = 21
+GT_K = 22
+GE_K = 23
+JUMP = 24  # pc = a
+JUMP_IF_FALSE = 25  # si no r[a]: pc = b
+CALL = 26  # r[a] = funcion[b](r[a], ..., r[a + c - 1])
+RETURN = 27  # devuelve r[a]
+PRINT = 28  # print(r[a], ..., r[a + b - 1])
+DEFINE_FUNCTION = 29  # funciones[a] = consts[b] (memorizada si c es 1)
+TAIL_CALL = 30  # como CALL, pero reutiliza el marco actual y devuelve el resultado al llamador
+BUILD_VECTOR = 31  # r[a] = vector(r[b], ..., r[b + c - 1])
+PROFILE_ENTER = 32  # perfilador.enter(consts[a]); sólo se emite con el perfilador activo
+PROFILE_EXIT = 33  # perfilador.exit()
+DEBUG_HOOK = 34  # depurador.hook(consts[a]); sólo en las formas compiladas en su variante de depuración
+CALL_VALUE = 35  # como CALL, pero llama al valor de r[b] (un parámetro o una variable local)
+TAIL_CALL_VALUE = 36  # como TAIL_CALL, con el valor de r[b]
+MAKE_CLOSURE = 37  # r[a] = función consts[b] con el marco actual como entorno (memorizada si c es 1)
+LOAD_OUTER = 38  # r[a] = variable de una función exterior; consts[b] = (profundidad, registro, nombre)
+DIV_K = 39
+MOD_K = 40
+# Comparación y salto fusionados: si no (r[a] op r[b]), pc = c; las variantes _K comparan con consts[b]
+JUMP_IF_NOT_EQ = 41
+JUMP_IF_NOT_NE = 42
+JUMP_IF_NOT_LT = 43
+JUMP_IF_NOT_LE = 44
+JUMP_IF_NOT_GT = 45
+JUMP_IF_NOT_GE = 46
+JUMP_IF_NOT_EQ_K = 47
+JUMP_IF_NOT_NE_K = 48
+JUMP_IF_NOT_LT_K = 49
+JUMP_IF_NOT_LE_K = 50
+JUMP_IF_NOT_GT_K = 51
+JUMP_IF_NOT_GE_K = 52
+
+OPCODE_NAMES = [
+    "LOAD_CONST", "MOVE", "LOAD_GLOBAL", "STORE_GLOBAL", "ADD", "SUB", "MUL", "DIV", "MOD",
+    "EQ", "NE", "LT", "LE", "GT", "GE", "ADD_K", "SUB_K", "MUL_K", "EQ_K", "NE_K", "LT_K",
+    "LE_K", "GT_K", "GE_K", "JUMP", "JUMP_IF_FALSE", "CALL", "RETURN", "PRINT", "DEFINE_FUNCTION",
+    "TAIL_CALL", "BUILD_VECTOR", "PROFILE_ENTER", "PROFILE_EXIT", "DEBUG_HOOK", "CALL_VALUE", "TAIL_CALL_VALUE",
+    "MAKE_CLOSURE", "LOAD_OUTER", "DIV_K", "MOD_K", "JUMP_IF_NOT_EQ", "JUMP_IF_NOT_NE", "JUMP_IF_NOT_LT",
+    "JUMP_IF_NOT_LE", "JUMP_IF_NOT_GT", "JUMP_IF_NOT_GE", "JUMP_IF_NOT_EQ_K", "JUMP_IF_NOT_NE_K",
+    "JUMP_IF_NOT_LT_K", "JUMP_IF_NOT_LE_K", "JUMP_IF_NOT_GT_K", "JUMP_IF_NOT_GE_K",
+]
+
+# Operadores de Simpyl y su código de operación
+BINARY_OPCODES = {
+    '+': ADD, '-': SUB, '*': MUL, '/': DIV, '%': MOD,
+    '==': EQ, '!=': NE, '<': LT, '<=': LE, '>': GT, '>=': GE,
+}
+
+# Variantes con el operando derecho constante: evitan un LOAD_CONST en los casos más frecuentes
+CONSTANT_OPCODES = {
+    ADD: ADD_K, SUB: SUB_K, MUL: MUL_K, DIV: DIV_K, MOD: MOD_K,
+    EQ: EQ_K, NE: NE_K, LT: LT_K, LE: LE_K, GT: GT_K, GE: GE_K,
+}
+
+# Condiciones de if y while que son una comparación: un solo salto en lugar de comparar y saltar
+FUSED_JUMPS = {
+    EQ: JUMP_IF_NOT_EQ, NE: JUMP_IF_NOT_NE, LT: JUMP_IF_NOT_LT, LE: JUMP_IF_NOT_LE, GT: JUMP_IF_NOT_GT, GE: JUMP_IF_NOT_GE,
+}
+FUSED_CONSTANT_JUMPS = {
+    EQ: JUMP_IF_NOT_EQ_K, NE: JUMP_IF_NOT_NE_K, LT: JUMP_IF_NOT_LT_K, LE: JUMP_IF_NOT_LE_K,
+    GT: JUMP_IF_NOT_GT_K, GE: JUMP_IF_NOT_GE_K,
+}
+
+# Nodos que escriben su registro de destino una sola vez, al final: una asignación puede evaluarlos
+# directamente en el registro de la variable
+DIRECT_NODES = ("operation", "call", "identifier", "number", "string", "boolean", "null", "vector")
+LEAF_NODES = ("identifier", "number", "string", "boolean", "null")  # Nodos sin asignaciones dentro
+
+INSTRUCTION_SIZE = 4  # Enteros por instrucción
+
+UNLIMITED_STEPS = sys.maxsize  # Presupuesto de pasos de una ejecución que no se interrumpe
+
+
+class SymbolTable:
+    """Asigna a cada nombre global un índice entero estable."""
+
+    def __init__(self):
+        self.names = []  # índice -> nombre
+        self.indexes = {}  # nombre -> índice
+
+    def index(self, name):
+        """Devuelve el índice de un nombre, registrándolo si es nuevo."""
+        index = self.indexes.get(name)
+        if index is None:
+            index = self.indexes[name] = len(self.names)
+            self.names.append(name)
+        return index
+
+    def __len__(self):
+        return len(self.names)
+
+
+class CodeObject:
+    """Unidad de bytecode: una función de usuario o un programa de nivel superior."""
+
+    __slots__ = ("name", "params", "code", "consts", "nregs", "instructions", "vectorized")
+
+    def __init__(self, name, params, code, consts, nregs):
+        self.name = name  # Nombre de la función ("<programa>" en el nivel superior)
+        self.params = params  # Nombres de los parámetros (ocupan los primeros registros)
+        self.code = code  # array('i') con las instrucciones
+        self.consts = consts  # Tabla de constantes
+        self.nregs = nregs  # Número de registros que necesita un marco
+        self.instructions = None  # Instrucciones decodificadas en tuplas, creadas al ejecutar por primera vez
+        self.vectorized = None  # Resultado de vector_result en las funciones de usuario
+
+    def decode(self):
+        """Decodifica el array de enteros en tuplas (opcode, a, b, c) para el bucle de despacho."""
+        if self.instructions is None:
+            code = self.code
+            self.instructions = [tuple(code[i:i + INSTRUCTION_SIZE]) for i in range(0, len(code), INSTRUCTION_SIZE)]
+        return self.instructions
+
+    def __repr__(self):
+        return f"<código {self.name}({' '.join(self.params)})>"
+
+
+class VMFunction:
+    """Función de la VM usada como valor: las funciones predefinidas de Python la llaman como a cualquier otra.
+
+    Las funciones anidadas también son VMFunction: `outer` es el marco de la función que las definió.
+    """
+
+    __slots__ = ("vm", "code", "outer")
+
+    def __init__(self, vm, code, outer=None):
+        self.vm = vm  # VM que ejecuta la función
+        self.code = code  # CodeObject de la función
+        self.outer = outer  # Marco léxico exterior (None en las funciones de nivel superior)
+
+    @property
+    def name(self):
+        return self.code.name
+
+    @property
+    def vectorized(self):
+        return self.code.vectorized
+
+    def __call__(self, *args):
+        return self.vm.call(self.code, args, self.outer)
+
+    def __repr__(self):
+        return repr(self.code)
+
+
+class BytecodeCompiler:
+    """Traduce el AST de SimpylParser a bytecode de registros.
+
+    Con `profile`, cada función empieza con PROFILE_ENTER y ejecuta PROFILE_EXIT antes de RETURN
+    y de TAIL_CALL; sin él no se emite ninguna instrucción de perfilado. Con `debugger`, las
+    declaraciones y funciones que contienen un punto de interrupción emiten DEBUG_HOOK antes de
+    cada forma; el resto se compila igual que sin depurador.
+
+    Una función definida dentro de otra ocupa un registro de ésta (MAKE_CLOSURE) y lee las
+    variables de las funciones que la contienen con LOAD_OUTER, subiendo por sus marcos.
+
+    En el nivel superior, cada variable global asignada tiene además un registro con su valor: las
+    asignaciones lo actualizan a la vez que la global y, cuando una declaración anterior ya la
+    asignó, las lecturas usan el registro sin LOAD_GLOBAL. Es seguro porque las funciones no
+    pueden asignar globales. Los valores que no se usan (el cuerpo de un while, las formas que no
+    son la última de un bloque) no se copian a su registro de destino.
+    """
+
+    def __init__(self, symbols, profile=False, debugger=None, outer=()):
+        self.symbols = symbols  # Tabla de símbolos globales compartida con la VM
+        self.outer = outer  # Registros de las funciones exteriores (nombre -> registro), de fuera hacia dentro
+        self.top_level = False  # Se está compilando el nivel superior del programa
+        self.profile = profile  # Instrumentar las funciones para el perfilador
+        self.profile_key = None  # (nombre, línea) de la función que se está compilando, si se perfila
+        self.debugger = debugger  # Depurador (opcional)
+        self.debugging = False  # Se está compilando la variante de depuración
+
+    def compile_program(self, statements):
+        """Compila una lista de declaraciones de nivel superior en un CodeObject."""
+        return self.compile_unit("<programa>", [], statements, {}, top_level=True)
+
+    def compile_unit(self, name, params, statements, local_names, tail=False, profile_key=None, top_level=False):
+        """Compila un cuerpo completo; `local_names` asigna registros a parámetros y variables locales.
+
+        Con `tail`, la última declaración está en posición de cola y sus llamadas usan TAIL_CALL.
+        Con `profile_key`, el cuerpo se mide con esa clave del perfilador. Con `top_level`, cada
+        declaración decide por separado si se compila en su variante de depuración.
+        """
+        self.code = array('i')
+        self.consts = []
+        self.const_indexes = {}
+        self.locals = local_names
+        self.top = self.nregs = len(local_names)
+        self.profile_key = profile_key
+        self.top_level = top_level
+        self.homes = {}  # Global asignada en el nivel superior -> registro con su valor
+        self.settled = set()  # Globales cuyo registro ya tiene valor: las asignó una declaración anterior
+        self.discard = None  # Registro de destino cuyo valor no se usa
+        if top_level:
+            for global_name in assigned_names(statements):
+                self.homes[global_name] = self.alloc()
+        result = self.alloc()
+        if profile_key is not None:
+            self.emit(PROFILE_ENTER, self.const(profile_key))
+        for position, statement in enumerate(statements):
+            if top_level:
+                self.debugging = self.debugger is not None and self.debugger.wants(statement)
+            last = position == len(statements) - 1
+            self.discard = None if last else result
+            self.compile_expr(statement, result, tail and last)
+            if top_level and statement["type"] == "assignment":
+                self.settled.add(statement["name"])
+        self.discard = None
+        if not statements:
+            self.emit(LOAD_CONST, result, self.const(None))
+        if profile_key is not None:
+            self.emit(PROFILE_EXIT)
+        self.emit(RETURN, result)
+        return CodeObject(name, params, self.code, self.consts, self.nregs)
+
+    def compile_function(self, node):
+        """Compila una definición de función con un compilador independiente."""
+        params = node["params"]
+        local_names = {param: index for index, param in enumerate(params)}
+        for local_name in assigned_names(node["body"]):  # Las variables asignadas en el cuerpo son locales
+            local_names.setdefault(local_name, len(local_names))
+        profile_key = (node["name"], node.get("line")) if self.profile else None
+        outer = () if self.top_level else self.outer + (self.locals,)
+        compiler = BytecodeCompiler(self.symbols, self.profile, self.debugger, outer)
+        compiler.debugging = self.debugger is not None and self.debugger.wants(node)
+        code = compiler.compile_unit(
+            node["name"], params, [node["body"]], local_names, tail=True, profile_key=profile_key)
+        code.vectorized = vector_result(params, node["body"])
+        return code
+
+    # --- Emisión de instrucciones y registros ---
+
+    def emit(self, op, a=0, b=0, c=0):
+        """Agrega una instrucción y devuelve su número de instrucción."""
+        position = self.position()
+        self.code.extend((op, a, b, c))
+        return position
+
+    def position(self):
+        """Número de la próxima instrucción (los saltos usan números de instrucción)."""
+        return len(self.code) // INSTRUCTION_SIZE
+
+    def patch(self, position, slot, value):
+        """Corrige un operando de salto una vez conocido el destino."""
+        self.code[position * INSTRUCTION_SIZE + slot] = value
+
+    def const(self, value):
+        """Devuelve el índice de una constante, reutilizando las repetidas."""
+        key = id(value) if isinstance(value, (CodeObject, SimpylVector)) else (type(value), value)
+        index = self.const_indexes.get(key)
+        if index is None:
+            index = self.const_indexes[key] = len(self.consts)
+            self.consts.append(value)
+        return index
+
+    def alloc(self):
+        """Reserva un registro temporal."""
+        register = self.top
+        self.top += 1
+        self.nregs = max(self.nregs, self.top)
+        return register
+
+    def resolve_outer(self, name):
+        """Devuelve (profundidad, registro) de una variable de una función exterior, o None."""
+        for depth, names in enumerate(reversed(self.outer), 1):
+            if name in names:
+                return depth, names[name]
+        return None
+
+    def register_of(self, name):
+        """Registro con el valor de una variable local o de una global ya asignada en el nivel superior, o None."""
+        register = self.locals.get(name)
+        if register is None and name in self.settled:
+            register = self.homes[name]
+        return register
+
+    def operand(self, node):
+        """Devuelve el registro que contiene el valor del nodo, evitando copias para variables y llamadas."""
+        kind = node["type"]
+        if kind == "identifier":
+            register = self.register_of(node["value"])
+            if register is not None:
+                return register
+        elif kind == "call" and not self.debugging:
+            base = self.emit_call(node)  # El resultado queda en el primer registro de los argumentos
+            self.top = base + 1  # Libera los demás
+            return base
+        register = self.alloc()
+        self.compile_expr(node, register)
+        return register
+
+    def left_operand(self, left, right):
+        """Registro del operando izquierdo; una variable se copia si el operando derecho puede asignarla."""
+        register = self.operand(left)
+        if (left["type"] == "identifier" and register == self.register_of(left["value"])
+                and right["type"] not in LEAF_NODES and assigned_names(right)):
+            copy = self.alloc()
+            self.emit(MOVE, copy, register)
+            return copy
+        return register
+
+    def compile_branch(self, node):
+        """Emite el salto que se toma si la condición es falsa; devuelve su posición y el operando del destino.
+
+        Una comparación se fusiona con el salto, salvo en la variante de depuración, que pausa antes de evaluarla.
+        """
+        opcode = BINARY_OPCODES.get(node["operator"]) if node["type"] == "operation" else None
+        if opcode in FUSED_JUMPS and not self.debugging:
+            right = node["right"]
+            left = self.left_operand(node["left"], right)
+            if right["type"] == "number":
+                return self.emit(FUSED_CONSTANT_JUMPS[opcode], left, self.const(parse_number(right["value"]))), 3
+            return self.emit(FUSED_JUMPS[opcode], left, self.operand(right)), 3
+        return self.emit(JUMP_IF_FALSE, self.operand(node)), 2
+
+    # --- Compilación de nodos ---
+
+    def compile_expr(self, node, dst, tail=False):
+        """Emite el código que deja el valor del nodo en el registro `dst`.
+
+        `tail` indica que el valor es el resultado de la función que se está compilando.
+        """
+        method = getattr(self, f"compile_{node['type']}", None)
+        if method is None:
+            raise SyntaxError(f"Tipo de nodo no soportado: {node['type']}")
+        mark = self.top
+        if self.debugging and "line" in node and node["type"] != "function_definition":
+            self.emit(DEBUG_HOOK, self.const((node["line"], tuple(self.locals.items()))))
+        if tail and node["type"] in TAIL_NODES:
+            method(node, dst, tail=True)
+        else:
+            method(node, dst)
+        self.top = mark  # Libera los temporales usados por el nodo
+
+    def compile_number(self, node, dst):
+        self.emit(LOAD_CONST, dst, self.const(parse_number(node["value"])))
+
+    def compile_string(self, node, dst):
+        self.emit(LOAD_CONST, dst, self.const(parse_string(node["value"])))
+
+    def compile_boolean(self, node, dst):
+        self.emit(LOAD_CONST, dst, self.const(node["value"] == "true"))
+
+    def compile_null(self, node, dst):
+        self.emit(LOAD_CONST, dst, self.const(None))
+
+    def compile_identifier(self, node, dst):
+        name = node["value"]
+        register = self.register_of(name)
+        if register is not None:
+            if register != dst:
+                self.emit(MOVE, dst, register)
+            return
+        address = self.resolve_outer(name)
+        if address is not None:
+            self.emit(LOAD_OUTER, dst, self.const(address + (name,)))
+        else:
+            self.emit(LOAD_GLOBAL, dst, self.symbols.index(name))
+
+    def compile_vector(self, node, dst):
+        items = node["items"]
+        if all(item["type"] == "number" for item in items):  # Vector constante: se construye al compilar
+            vector = SimpylVector.from_values([parse_number(item["value"]) for item in items])
+            self.emit(LOAD_CONST, dst, self.const(vector))
+            return
+        base = self.compile_arguments(items)
+        self.emit(BUILD_VECTOR, dst, base, len(items))
+
+    def compile_assignment(self, node, dst):
+        name = node["name"]
+        value = node["value"]
+        discard, self.discard = self.discard, None  # El valor asignado sí se usa
+        if name in self.locals:
+            register = self.locals[name]
+            self.compile_expr(value, register)
+            if register != dst and dst != discard:
+                self.emit(MOVE, dst, register)
+        elif name in self.homes and value["type"] in DIRECT_NODES:
+            register = self.homes[name]
+            self.compile_expr(value, register)
+            self.emit(STORE_GLOBAL, register, self.symbols.index(name))
+            if register != dst and dst != discard:
+                self.emit(MOVE, dst, register)
+        else:
+            # Un valor de varios pasos se calcula aparte: el registro de la variable conserva el anterior hasta el final
+            self.compile_expr(value, dst)
+            self.emit(STORE_GLOBAL, dst, self.symbols.index(name))
+            if name in self.homes:
+                self.emit(MOVE, self.homes[name], dst)
+        self.discard = discard
+
+    def compile_operation(self, node, dst):
+        opcode = BINARY_OPCODES.get(node["operator"])
+        if opcode is None:
+            raise SyntaxError(f"Operador no soportado: {node['operator']}")
+        right = node["right"]
+        left = self.left_operand(node["left"], right)
+        if opcode in CONSTANT_OPCODES and right["type"] == "number":
+            self.emit(CONSTANT_OPCODES[opcode], dst, left, self.const(parse_number(right["value"])))
+        else:
+            self.emit(opcode, dst, left, self.operand(right))
+
+    def compile_if(self, node, dst, tail=False):
+        jump_else, slot = self.compile_branch(node["condition"])
+        if tail and self.profile_key is None:  # Tras el if sólo queda devolver el valor: se devuelve sin saltar
+            jump_end = None
+            register = self.register_of(node["then"]["value"]) if node["then"]["type"] == "identifier" else None
+            if register is None:
+                self.compile_expr(node["then"], dst, tail)
+                register = dst
+            self.emit(RETURN, register)
+        else:
+            self.compile_expr(node["then"], dst, tail)
+            jump_end = self.emit(JUMP)
+        self.patch(jump_else, slot, self.position())
+        if node["else"] is not None:
+            self.compile_expr(node["else"], dst, tail)
+        elif dst != self.discard:
+            self.emit(LOAD_CONST, dst, self.const(None))
+        if jump_end is not None:
+            self.patch(jump_end, 1, self.position())
+
+    def compile_while(self, node, dst):
+        start = self.position()
+        jump_end, slot = self.compile_branch(node["condition"])
+        discard, self.discard = self.discard, self.alloc()  # El valor del cuerpo no se usa
+        self.compile_expr(node["body"], self.discard)
+        self.discard = discard
+        self.emit(JUMP, start)
+        self.patch(jump_end, slot, self.position())
+        if dst != self.discard:
+            self.emit(LOAD_CONST, dst, self.const(None))
+
+    def compile_block(self, node, dst, tail=False):
+        body = node["body"]
+        discard = self.discard
+        for position, expression in enumerate(body):
+            last = position == len(body) - 1
+            self.discard = discard if last else dst  # Sólo se usa el valor de la última forma
+            self.compile_expr(expression, dst, tail and last)
+        self.discard = discard
+
+    def compile_print(self, node, dst):
+        base = self.compile_arguments(node["args"])
+        self.emit(PRINT, base, len(node["args"]))
+        if dst != self.discard:
+            self.emit(LOAD_CONST, dst, self.const(None))
+
+    def compile_call(self, node, dst, tail=False):
+        base = self.emit_call(node, tail)
+        if base != dst and dst != self.discard:
+            self.emit(MOVE, dst, base)
+
+    def emit_call(self, node, tail=False):
+        """Emite la llamada con los argumentos en registros consecutivos y devuelve el primero, que recibe el resultado."""
+        base = self.compile_arguments(node["args"])
+        if tail and self.profile_key is not None:
+            self.emit(PROFILE_EXIT)  # La llamada en cola sustituye al marco: la medición de esta función termina aquí
+        name = node["name"]
+        if name in self.locals:  # Se llama al valor del registro: (define apply (f x) (f x))
+            self.emit(TAIL_CALL_VALUE if tail else CALL_VALUE, base, self.locals[name], len(node["args"]))
+        elif self.resolve_outer(name) is not None:  # Función o variable de una función exterior
+            register = self.alloc()
+            self.compile_identifier({"type": "identifier", "value": name}, register)
+            self.emit(TAIL_CALL_VALUE if tail else CALL_VALUE, base, register, len(node["args"]))
+        else:
+            self.emit(TAIL_CALL if tail else CALL, base, self.symbols.index(name), len(node["args"]))
+        return base
+
+    def compile_arguments(self, args):
+        """Evalúa los argumentos en registros consecutivos y devuelve el primero."""
+        base = self.alloc()
+        for position, arg in enumerate(args):
+            register = base if position == 0 else self.alloc()
+            self.compile_expr(arg, register)
+        return base
+
+    def compile_function_definition(self, node, dst):
+        function = self.const(self.compile_function(node))
+        if not self.top_level:  # Función anidada: variable local de la función que la contiene
+            register = self.locals[node["name"]]
+            self.emit(MAKE_CLOSURE, register, function, 1 if node.get("memo") else 0)
+            if register != dst and dst != self.discard:
+                self.emit(MOVE, dst, register)
+            return
+        index = self.symbols.index(node["name"])
+        self.emit(DEFINE_FUNCTION, index, function, 1 if node.get("memo") else 0)
+        if dst != self.discard:
+            self.emit(LOAD_GLOBAL, dst, index)  # La definición devuelve la función como valor
+
+
+class Frame:
+    """Marco de activación de una llamada en la VM."""
+
+    __slots__ = ("code", "pc", "regs", "ret", "memo", "outer")
+
+    def __init__(self, code, regs, ret, outer=None):
+        self.code = code  # CodeObject en ejecución
+        self.pc = 0  # Próxima instrucción
+        self.regs = regs  # Registros del marco
+        self.ret = ret  # Registro del llamador que recibe el resultado
+        self.outer = outer  # Marco de la función que definió la que se ejecuta (LOAD_OUTER)
+        self.memo = None  # Lista de (caché, argumentos) que esperan el resultado de una función memorizada
+
+
+class Suspension:
+    """Programa interrumpido al agotar su tramo de pasos: el marco en curso y los marcos suspendidos."""
+
+    __slots__ = ("frame", "frames")
+
+    def __init__(self, frame, frames):
+        self.frame = frame  # Marco en curso; su pc indica dónde continuar
+        self.frames = frames  # Pila de marcos suspendidos
+
+
+class SimpylVM:
+    """Máquina virtual de registros que ejecuta el bytecode de BytecodeCompiler.
+
+    `memo(nombre, código)` envuelve las funciones definidas con 'define-memo' y debe devolver un
+    MemoizedFunction: la VM consulta su caché en CALL y guarda el resultado en RETURN, de modo que
+    las funciones memorizadas también usan marcos en el heap.
+    Con `safe_point`, la ejecución se detiene cada SAFE_POINT_STEPS pasos para llamarlo, de modo
+    que el intérprete controla la memoria también dentro de una forma.
+    """
+
+    def __init__(self, variables=None, max_depth=DEFAULT_MAX_DEPTH, memo=memoize, profiler=None, debugger=None,
+                 safe_point=None):
+        self.variables = variables if variables is not None else {}  # Vista por nombre de las globales
+        self.max_depth = max_depth  # Máximo de marcos suspendidos; los marcos viven en el heap, no en la pila de Python
+        self.memo = memo  # Envoltorio de las funciones memorizadas
+        self.profiler = profiler  # Perfilador (opcional); las funciones compiladas mientras está activo se miden
+        self.debugger = debugger  # Depurador (opcional); recibe DEBUG_HOOK
+        self.symbols = SymbolTable()
+        self.globals = []  # índice de símbolo -> valor
+        self.functions = []  # índice de símbolo -> CodeObject o invocable
+        self.budget = None  # Pasos máximos del programa limitado con `limit` (None: sin límite)
+        self.timeout = None  # Segundos máximos del programa limitado con `limit` (None: sin límite)
+        self.deadline = None  # Instante de time.monotonic en que vence `timeout`
+        self.slice_steps = None  # Tramo de pasos entre dos comprobaciones de las llamadas desde Python
+        self.steps_used = 0  # Pasos gastados por el programa limitado, incluidas las llamadas desde Python
+        self.limited = False  # Hay presupuesto de pasos o tiempo máximo
+        self.safe_point = safe_point  # Invocable de los puntos seguros dentro de una forma (opcional)
+        self.check_steps = SAFE_POINT_STEPS  # Pasos que faltan hasta el siguiente punto seguro
+        self.unused_steps = 0  # Pasos que le sobraron a la última llamada a run que terminó el programa
+
+    def reset(self):
+        """Olvida las globales, las funciones y los símbolos, para ejecutar otro programa desde cero."""
+        self.symbols = SymbolTable()
+        self.globals = []
+        self.functions = []
+
+    def global_value(self, index):
+        """Valor de un nombre global sin variable: la función de usuario, predefinida u operador con ese nombre."""
+        function = self.functions[index]
+        if function is not None:
+            return self.function_value(function)
+        name = self.symbols.names[index]
+        function = BUILTINS.get(name) or OPERATORS.get(name)
+        if function is None:
+            raise NameError(f"Variable '{name}' no definida")
+        return function
+
+    def function_value(self, function):
+        """Convierte una función de la VM en un invocable de Python, para pasarla como valor: (map doble v)"""
+        if function.__class__ is MemoizedFunction and function.function.__class__ is CodeObject:
+            return MemoizedFunction(function.name, self.function_value(function.function), function.cache)
+        if function.__class__ is CodeObject:
+            return VMFunction(self, function)
+        return function
+
+    def call(self, code, args, outer=None):
+        """Ejecuta una función de la VM desde Python con su propio bucle de despacho."""
+        if len(args) != len(code.params):
+            raise TypeError(f"La función '{code.name}' espera {len(code.params)} argumentos, pero recibió {len(args)}")
+        regs = [UNBOUND] * code.nregs
+        regs[:len(args)] = args
+        frame = Frame(code, regs, 0, outer)
+        if not self.limited:
+            return self.run_checked(frame)
+        # Una llamada desde Python no puede ceder el control: se ejecuta por tramos que descuentan
+        # los pasos y comprueban el tiempo, y cuenta ella misma como un paso aunque no salte ni llame
+        self.charge(1)
+        frames = []
+        while True:
+            result = self.run_limited(frame, frames, self.slice_steps)
+            if result.__class__ is not Suspension:
+                return result
+            frame, frames = result.frame, result.frames
+
+    def compile(self, statements):
+        """Compila un programa usando la tabla de símbolos de esta VM."""
+        profile = self.profiler is not None and self.profiler.enabled
+        return BytecodeCompiler(self.symbols, profile, self.debugger).compile_program(statements)
+
+    def read_global(self, name):
+        """Valor actual de una variable global durante la ejecución (None si no tiene valor)."""
+        index = self.symbols.indexes.get(name)
+        if index is None or index >= len(self.globals):
+            return self.variables.get(name)
+        value = self.globals[index]
+        return None if value is UNBOUND else value
+
+    def sync_symbols(self):
+        """Amplía las tablas de valores y copia las variables existentes a sus índices."""
+        missing = len(self.symbols) - len(self.globals)
+        if missing > 0:
+            self.globals.extend([UNBOUND] * missing)
+            self.functions.extend([None] * missing)
+        for name, value in self.variables.items():
+            index = self.symbols.indexes.get(name)
+            if index is not None:
+                self.globals[index] = value
+
+    def forget_globals(self, names):
+        """Borra variables globales, como si nunca se hubieran asignado."""
+        for name in names:
+            self.variables.pop(name, None)
+            index = self.symbols.indexes.get(name)
+            if index is not None and index < len(self.globals):
+                self.globals[index] = UNBOUND
+
+    def publish_globals(self):
+        """Copia las globales en `variables` para inspect y el REPL."""
+        names = self.symbols.names
+        for index, value in enumerate(self.globals):
+            if value is not UNBOUND:
+                self.variables[names[index]] = value
+
+    def execute(self, code):
+        """Ejecuta un CodeObject de nivel superior y devuelve su resultado."""
+        self.sync_symbols()
+        try:
+            return self.run_checked(Frame(code, [UNBOUND] * code.nregs, 0))
+        finally:
+            self.publish_globals()
+
+    def start(self, code):
+        """Prepara un CodeObject de nivel superior para ejecutarlo por tramos con `resume`."""
+        self.sync_symbols()
+        return Suspension(Frame(code, [UNBOUND] * code.nregs, 0), [])
+
+    def resume(self, suspension, steps):
+        """Continúa un programa durante `steps` pasos como máximo.
+
+        Devuelve una nueva Suspension si el programa no terminó o, si terminó, su resultado.
+        """
+        try:
+            if self.limited:
+                return self.run_limited(suspension.frame, suspension.frames, steps)
+            return self.run_checked(suspension.frame, suspension.frames, steps)
+        finally:
+            self.publish_globals()
+
+    def limit(self, budget=None, timeout=None, slice_steps=1_000):
+        """Limita el programa que se ejecuta con `resume` a `budget` pasos y `timeout` segundos.
+
+        Los límites son de todo el programa: los comparten sus tramos y las funciones que llaman
+        map, filter o reduce, que se ejecutan por tramos de `slice_steps` pasos. Al superarlos se
+        lanza SimpylBudgetError. `limit()` sin argumentos los quita.
+        """
+        self.budget = budget
+        self.timeout = timeout
+        self.deadline = time.monotonic() + timeout if timeout is not None else None
+        self.slice_steps = slice_steps
+        self.steps_used = 0
+        self.limited = budget is not None or timeout is not None
+
+    def charge(self, steps):
+        """Descuenta pasos del programa limitado; lanza SimpylBudgetError si se superan los pasos o el tiempo."""
+        self.steps_used += steps
+        if self.budget is not None and self.steps_used > self.budget:
+            raise SimpylBudgetError(f"El programa superó el presupuesto de {self.budget} pasos")
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            raise SimpylBudgetError(f"El programa superó el tiempo máximo de {self.timeout} s")
+
+    def run_limited(self, frame, frames, steps):
+        """Ejecuta hasta `steps` pasos de un programa limitado y los descuenta de su presupuesto."""
+        if self.budget is not None:
+            steps = min(steps, self.budget - self.steps_used)
+            if steps <= 0:
+                raise SimpylBudgetError(f"El programa superó el presupuesto de {self.budget} pasos")
+        result = self.run_checked(frame, frames, steps)
+        self.charge(steps if result.__class__ is Suspension else steps - self.unused_steps)
+        return result
+
+    def run_checked(self, frame, frames=None, steps=None):
+        """Como `run`, pero se detiene cada SAFE_POINT_STEPS pasos para llamar a `safe_point`.
+
+        Los pasos hasta el siguiente punto seguro los cuenta la VM, no cada llamada a run, así que
+        también avanzan con las funciones de la VM que llaman map, filter o reduce.
+        """
+        if self.safe_point is None:
+            return self.run(frame, frames, steps)
+        if frames is None:
+            frames = []
+        while True:
+            chunk = self.check_steps if steps is None else min(self.check_steps, steps)
+            result = self.run(frame, frames, chunk)
+            used = chunk if result.__class__ is Suspension else chunk - self.unused_steps
+            self.check_steps -= used
+            if self.check_steps <= 0:
+                self.check_steps = SAFE_POINT_STEPS
+                self.safe_point()
+            if result.__class__ is not Suspension:
+                return result
+            if steps is not None:
+                steps -= used
+                if not steps:
+                    return result
+            frame, frames = result.frame, result.frames
+
+    def run(self, frame, frames=None, steps=None):
+        """Bucle de despacho principal.
+
+        Cada salto y cada llamada cuentan como un paso; con `steps`, al agotarlos se guarda el pc
+        en el marco en curso y se devuelve una Suspension desde la que `resume` puede continuar.
+        Sin `steps` el contador nunca llega a cero.
+        """
+        if frames is None:
+            frames = []  # Pila de marcos suspendidos
+        countdown = steps if steps is not None else UNLIMITED_STEPS
+        glob = self.globals
+        functions = self.functions
+        names = self.symbols.names
+        max_depth = self.max_depth
+        code_object = frame.code
+        code = code_object.decode()
+        consts = code_object.consts
+        regs = frame.regs
+        pc = frame.pc
+        while True:
+            op, a, b, c = code[pc]
+            pc += 1
+            # Las instrucciones más frecuentes se comprueban primero
+            if op == STORE_GLOBAL:
+                glob[b] = regs[a]
+            elif op == JUMP_IF_NOT_LT_K:
+                if not (regs[a] < consts[b]):
+                    pc = c
+            elif op == JUMP:
+                pc = a
+                countdown -= 1
+                if not countdown:
+                    frame.pc = pc
+                    return Suspension(frame, frames)
+            elif op == ADD_K:
+                regs[a] = regs[b] + consts[c]
+            elif op == SUB_K:
+                regs[a] = regs[b] - consts[c]
+            elif op == ADD:
+                regs[a] = regs[b] + regs[c]
+            elif op == MOD_K:
+                regs[a] = regs[b] % consts[c]
+            elif op == JUMP_IF_NOT_EQ_K:
+                if not (regs[a] == consts[b]):
+                    pc = c
+            elif op == RETURN:
+                value = regs[a]
+                if frame.memo is not None:  # Resultado de una función memorizada
+                    for cache, key in frame.memo:
+                        cache.store(key, value)
+                if not frames:
+                    self.unused_steps = countdown
+                    return value
+                ret = frame.ret
+                frame = frames.pop()  # Reanuda al llamador
+                code = frame.code.instructions
+                consts = frame.code.consts
+                regs = frame.regs
+                pc = frame.pc
+                regs[ret] = value
+            elif op == CALL or op == CALL_VALUE:
+                countdown -= 1
+                if not countdown:
+                    frame.pc = pc - 1  # La llamada se repite al reanudar
+                    return Suspension(frame, frames)
+                if op == CALL:
+                    function = functions[b]
+                    if function is None:
+                        function = glob[b]
+                        if function is UNBOUND:
+                            function = BUILTINS.get(names[b])
+                            if function is None:
+                                raise NameError(f"Función '{names[b]}' no definida")
+                else:
+                    function = regs[b]
+                pending = None
+                outer = None
+                if function.__class__ is not CodeObject:  # El caso más frecuente, una función de usuario, no entra
+                    if function.__class__ is MemoizedFunction:
+                        found, value, key = function.lookup(regs[a:a + c])
+                        if found:
+                            regs[a] = value
+                            continue
+                        if key is not None:
+                            pending = [(function.cache, key)]
+                        function = function.function
+                    if function.__class__ is VMFunction:  # Función de la VM pasada como valor: también usa un marco en el heap
+                        outer = function.outer
+                        function = function.code
+                if function.__class__ is CodeObject:
+                    if c != len(function.params):
+                        raise TypeError(f"La función '{function.name}' espera {len(function.params)} argumentos, pero recibió {c}")
+                    if len(frames) >= max_depth:
+                        raise SimpylRecursionError(f"Se superó la profundidad máxima de {max_depth} llamadas anidadas en '{function.name}'")
+                    frame.pc = pc  # Suspende el marco actual
+                    frames.append(frame)
+                    new_regs = [UNBOUND] * function.nregs
+                    new_regs[:c] = regs[a:a + c]
+                    frame = Frame(function, new_regs, a, outer)
+                    frame.memo = pending
+                    code = function.instructions or function.decode()
+                    consts = function.consts
+                    regs = new_regs
+                    pc = 0
+                else:
+                    value = regs[a] = function(*regs[a:a + c])
+                    if pending is not None:
+                        pending[0][0].store(pending[0][1], value)
+            elif op == MUL_K:
+                regs[a] = regs[b] * consts[c]
+            elif op == MOVE:
+                regs[a] = regs[b]
+            elif op == LOAD_CONST:
+                regs[a] = consts[b]
+            elif op == JUMP_IF_NOT_GT_K:
+                if not (regs[a] > consts[b]):
+                    pc = c
+            elif op == JUMP_IF_NOT_LE_K:
+                if not (regs[a] <= consts[b]):
+                    pc = c
+            elif op == JUMP_IF_NOT_GE_K:
+                if not (regs[a] >= consts[b]):
+                    pc = c
+            elif op == JUMP_IF_NOT_NE_K:
+                if not (regs[a] != consts[b]):
+                    pc = c
+            elif op == JUMP_IF_NOT_LT:
+                if not (regs[a] < regs[b]):
+                    pc = c
+            elif op == JUMP_IF_NOT_EQ:
+                if not (regs[a] == regs[b]):
+                    pc = c
+            elif op == JUMP_IF_NOT_GT:
+                if not (regs[a] > regs[b]):
+                    pc = c
+            elif op == JUMP_IF_NOT_LE:
+                if not (regs[a] <= regs[b]):
+                    pc = c
+            elif op == JUMP_IF_NOT_GE:
+                if not (regs[a] >= regs[b]):
+                    pc = c
+            elif op == JUMP_IF_NOT_NE:
+                if not (regs[a] != regs[b]):
+                    pc = c
+            elif op == LOAD_GLOBAL:
+                value = glob[b]
+                if value is UNBOUND:
+                    value = self.global_value(b)  # Las funciones también son valores
+                regs[a] = value
+            elif op == JUMP_IF_FALSE:
+                if not regs[a]:
+                    pc = b
+            elif op == TAIL_CALL or op == TAIL_CALL_VALUE:
+                countdown -= 1
+                if not countdown:
+                    frame.pc = pc - 1
+                    return Suspension(frame, frames)
+                if op == TAIL_CALL:
+                    function = functions[b]
+                    if function is None:
+                        function = glob[b]
+                        if function is UNBOUND:
+                            function = BUILTINS.get(names[b])
+                            if function is None:
+                                raise NameError(f"Función '{names[b]}' no definida")
+                else:
+                    function = regs[b]
+                memo = frame.memo  # El resultado de la llamada en cola es también el del marco actual
+                found = False
+                if function.__class__ is MemoizedFunction:
+                    found, value, key = function.lookup(regs[a:a + c])
+                    if not found:
+                        if key is not None:
+                            if memo is None:
+                                memo = []
+                            memo.append((function.cache, key))
+                        function = function.function
+                if not found:
+                    outer = None
+                    if function.__class__ is VMFunction:
+                        outer = function.outer
+                        function = function.code
+                    if function.__class__ is CodeObject:
+                        if c != len(function.params):
+                            raise TypeError(f"La función '{function.name}' espera {len(function.params)} argumentos, pero recibió {c}")
+                        new_regs = [UNBOUND] * function.nregs
+                        new_regs[:c] = regs[a:a + c]
+                        frame = Frame(function, new_regs, frame.ret, outer)  # Sustituye al marco actual: la pila no crece
+                        frame.memo = memo
+                        code = function.decode()
+                        consts = function.consts
+                        regs = new_regs
+                        pc = 0
+                        continue
+                    value = function(*regs[a:a + c])  # Función de Python: se llama y se vuelve como RETURN
+                if memo is not None:
+                    for cache, key in memo:
+                        cache.store(key, value)
+                if not frames:
+                    self.unused_steps = countdown
+                    return value
+                ret = frame.ret
+                frame = frames.pop()
+                code = frame.code.instructions
+                consts = frame.code.consts
+                regs = frame.regs
+                pc = frame.pc
+                regs[ret] = value
+            elif op == SUB:
+                regs[a] = regs[b] - regs[c]
+            elif op == MUL:
+                regs[a] = regs[b] * regs[c]
+            elif op == DIV_K:
+                regs[a] = regs[b] / consts[c]
+            elif op == LT_K:
+                regs[a] = regs[b] < consts[c]
+            elif op == LT:
+                regs[a] = regs[b] < regs[c]
+            elif op == LE:
+                regs[a] = regs[b] <= regs[c]
+            elif op == LE_K:
+                regs[a] = regs[b] <= consts[c]
+            elif op == GT:
+                regs[a] = regs[b] > regs[c]
+            elif op == GT_K:
+                regs[a] = regs[b] > consts[c]
+            elif op == GE:
+                regs[a] = regs[b] >= regs[c]
+            elif op == GE_K:
+                regs[a] = regs[b] >= consts[c]
+            elif op == EQ:
+                regs[a] = regs[b] == regs[c]
+            elif op == EQ_K:
+                regs[a] = regs[b] == consts[c]
+            elif op == NE:
+                regs[a] = regs[b] != regs[c]
+            elif op == NE_K:
+                regs[a] = regs[b] != consts[c]
+            elif op == DIV:
+                regs[a] = regs[b] / regs[c]
+            elif op == MOD:
+                regs[a] = regs[b] % regs[c]
+            elif op == PRINT:
+                print(*regs[a:a + b])
+            elif op == DEFINE_FUNCTION:
+                functions[a] = self.memo(names[a], consts[b]) if c else consts[b]
+            elif op == LOAD_OUTER:
+                depth, index, name = consts[b]
+                scope = frame.outer
+                for _ in range(depth - 1):
+                    scope = scope.outer
+                value = scope.regs[index]
+                if value is UNBOUND:
+                    raise NameError(f"Variable '{name}' no definida")
+                regs[a] = value
+            elif op == MAKE_CLOSURE:
+                function = VMFunction(self, consts[b], frame)
+                regs[a] = self.memo(function.name, function) if c else function
+            elif op == BUILD_VECTOR:
+                regs[a] = SimpylVector.from_values(regs[b:b + c])
+            elif op == PROFILE_ENTER:
+                self.profiler.enter(consts[a])
+            elif op == PROFILE_EXIT:
+                self.profiler.exit()
+            elif op == DEBUG_HOOK:
+                line, local_names = consts[a]
+                self.debugger.hook(line, dict(local_names), regs, self.read_global)
+            else:
+                raise RuntimeError(f"Código de operación desconocido: {op}")
+
+
+def disassemble(code_object, symbols):
+    """Devuelve un listado legible del bytecode, incluidas las funciones anidadas."""
+    lines = [f"Código {code_object.name}({' '.join(code_object.params)}) - {code_object.nregs} registros"]
+    nested = []
+    for position, (op, a, b, c) in enumerate(code_object.decode()):
+        name = OPCODE_NAMES[op]
+        if op == LOAD_CONST:
+            operands = f"r{a}, {b} ({code_object.consts[b]!r})"
+        elif op == MOVE:
+            operands = f"r{a}, r{b}"
+        elif op in (LOAD_GLOBAL, STORE_GLOBAL):
+            operands = f"r{a}, {b} ({symbols.names[b]})"
+        elif op == JUMP:
+            operands = f"{a}"
+        elif op == JUMP_IF_FALSE:
+            operands = f"r{a}, {b}"
+        elif op in FUSED_JUMPS.values():
+            operands = f"r{a}, r{b}, {c}"
+        elif op in FUSED_CONSTANT_JUMPS.values():
+            operands = f"r{a}, {b} ({code_object.consts[b]!r}), {c}"
+        elif op in (CALL, TAIL_CALL):
+            operands = f"r{a}, {symbols.names[b]}, {c} args"
+        elif op in (CALL_VALUE, TAIL_CALL_VALUE):
+            operands = f"r{a}, r{b}, {c} args"
+        elif op == LOAD_OUTER:
+            depth, index, name = code_object.consts[b]
+            operands = f"r{a}, {depth} marcos arriba r{index} ({name})"
+        elif op == MAKE_CLOSURE:
+            operands = f"r{a}, {b}" + (" (memo)" if c else "")
+            nested.append(code_object.consts[b])
+        elif op == RETURN:
+            operands = f"r{a}"
+        elif op == PRINT:
+            operands = f"r{a}, {b} args"
+        elif op == BUILD_VECTOR:
+            operands = f"r{a}, r{b}, {c} elementos"
+        elif op == PROFILE_ENTER:
+            operands = f"{code_object.consts[a]!r}"
+        elif op == PROFILE_EXIT:
+            operands = ""
+        elif op == DEBUG_HOOK:
+            operands = f"línea {code_object.consts[a][0]}"
+        elif op == DEFINE_FUNCTION:
+            operands = f"{symbols.names[a]}, {b}" + (" (memo)" if c else "")
+            nested.append(code_object.consts[b])
+        elif op in CONSTANT_OPCODES.values():
+            operands = f"r{a}, r{b}, {c} ({code_object.consts[c]!r})"
+        else:
+            operands = f"r{a}, r{b}, r{c}"
+        lines.append(f"{position:5d}  {name:<18}{operands}")
+    for function in nested:
+        lines.append("")
+        lines.append(disassemble(function, symbols))
+    return "\n".join(lines)
+
+
+# Casos de test_vm: el mismo programa para el motor regex (un comando por línea, con expresiones de
+# Python) y para SimpylParser. El motor regex no tiene while ni funciones anidadas: el bucle se
+# desenrolla y las funciones anidadas se escriben con lambda.
+REFERENCE_PROGRAMS = [
+    ("""(define (suma (a b)) return a + b)
+        (print (suma(3, 4)))
+        (print (suma(5, 10)))""",
+     '(define suma (a b) (+ a b)) (print (suma 3 4)) (print (suma 5 10))'),
+    ("""(define pi 3.1416)
+        (define x 5 + 10)
+        (print (pi))
+        (print (x))""",
+     '(define pi 3.1416) (x = (+ 5 10)) (print pi) (print x)'),
+    ('(print ("Hola, mundo!"))', '(print "Hola, mundo!")'),
+    ('(if (10 > 5) ("10 es mayor que 5") ("10 no es mayor que 5"))',
+     '(if (> 10 5) "10 es mayor que 5" "10 no es mayor que 5")'),
+    ("""(define x 0)
+        (print (x))
+        (define x x + 1)
+        (print (x))
+        (define x x + 1)
+        (print (x))
+        (define x x + 1)
+        (print (x))""",
+     '(x = 0) (while (< x 3) (print x) (x = (+ x 1))) (print x)'),
+    ("""(define (suma (a b)) return a + b)
+        (define (factorial (n)) return 1 if n <= 1 else n * factorial(n - 1))
+        (define x 10)
+        (define y 20)
+        (define result suma(x, y))
+        (print (f"La suma de {x} y {y} es: {result}"))
+        (print (f"El factorial de 5 es: {factorial(5)}"))""",
+     """(define suma (a b) (+ a b))
+        (define factorial (n) (if (<= n 1) 1 (* n (factorial (- n 1)))))
+        (x = 10) (y = 20) (result = (suma x y))
+        (print "La suma de" x "y" y "es:" result)
+        (print "El factorial de 5 es:" (factorial 5))"""),
+    # Funciones anidadas: leen las variables de la función que las contiene y no son globales
+    ("""(define (make_adder (x)) return lambda y: x + y)
+        (define add5 make_adder(5))
+        (print (add5(10)))""",
+     '(define make_adder (x) (define add (y) (+ x y)) add) (define add5 (make_adder 5)) (print (add5 10))'),
+    ("""(define (sum_to (n)) return n * (n + 1) // 2)
+        (print (sum_to(100)))""",
+     '(define sum_to (n) (define go (i acc) (if (> i n) acc (go (+ i 1) (+ acc i)))) (go 1 0)) (print (sum_to 100))'),
+    ("""(define (outer (a)) return (lambda b: (lambda c: a + b + c)(3))(2))
+        (print (outer(1)))""",
+     '(define outer (a) (define mid (b) (define inner (c) (+ a (+ b c))) (inner 3)) (mid 2)) (print (outer 1))'),
+    # Funciones de orden superior: los parámetros se llaman por su valor
+    ("""(define (apply (f x)) return f(x))
+        (define (double (x)) return x * 2)
+        (define (twice (f x)) return f(f(x)))
+        (print (apply(double, 21)))
+        (print (twice(double, 5)))
+        (print (apply(abs, -3)))""",
+     """(define apply (f x) (f x)) (define double (x) (* x 2)) (define twice (f x) (f (f x)))
+        (print (apply double 21)) (print (twice double 5)) (print (apply abs -3))"""),
+    ("""(define (mk (n)) return lambda x: x * n)
+        (define (apply (f x)) return f(x))
+        (print (apply(mk(3), 4)))""",
+     '(define mk (n) (define m (x) (* x n)) m) (define apply (f x) (f x)) (print (apply (mk 3) 4))'),
+]
+
+# Programas que deben fallar con el mismo tipo de error en los tres motores
+REFERENCE_ERRORS = [
+    ('(print (1 / 0))', '(print (/ 1 0))', "ZeroDivisionError"),
+    ('(print (z))', '(print z)', "NameError"),
+    ("""(define (suma (a b)) return a + b)
+        (print (suma(1)))""",
+     '(define suma (a b) (+ a b)) (print (suma 1))', "TypeError"),
+    ("""(define (f (x)) return (lambda y: y * 2)(x))
+        (print (f(4)))
+        (print (g(1)))""",
+     '(define f (x) (define g (y) (* y 2)) (g x)) (print (f 4)) (print (g 1))', "NameError"),
+    ("""(define (apply (f x)) return f(x))
+        (print (apply(3, 4)))""",
+     '(define apply (f x) (f x)) (print (apply 3 4))', "TypeError"),
+]
+
+
+def test_vm():
+    """Comprueba que la VM y el motor de closures dan los mismos resultados que el intérprete regex.
+
+    Se comparan la salida, el valor de la última forma y las variables globales que no son
+    funciones; en los programas con errores, la salida anterior al error y el tipo de excepción.
+    """
+    import contextlib  # Captura de la salida estándar
+    import io
+    import re
+
+    try:
+        from .simpyl_interpreter import SimpylInterpreter
+    except ImportError:
+        from simpyl_interpreter import SimpylInterpreter
+
+    def plain_variables(variables):
+        return {name: value for name, value in variables.items() if not callable(value)}
+
+    def run_regex(program):
+        interpreter = SimpylInterpreter(engine="regex")
+        buffer = io.StringIO()
+        result = None
+        with contextlib.redirect_stdout(buffer):
+            for command in program.splitlines():
+                result = interpreter.execute_command(command)
+        output, _, error = buffer.getvalue().partition("Expresión inválida: ")  # El motor regex imprime los errores
+        error = re.findall(r"^(\w+):", error, re.MULTILINE)[-1] if error else None
+        return output, result, plain_variables(interpreter.variables), error
+
+    def run_engine(engine, source):
+        interpreter = SimpylInterpreter(engine=engine)
+        buffer = io.StringIO()
+        result = error = None
+        with contextlib.redirect_stdout(buffer):
+            try:
+                result = interpreter.execute_statements(interpreter.parser.parse(source))
+            except Exception as e:
+                error = type(e).__name__
+        return buffer.getvalue(), result, plain_variables(interpreter.variables), error
+
+    for regex_program, source in REFERENCE_PROGRAMS:
+        expected = run_regex(regex_program)
+        assert expected[3] is None, (regex_program, expected)
+        for engine in ("closure", "vm"):
+            assert run_engine(engine, source) == expected, (engine, source, run_engine(engine, source), expected)
+    for regex_program, source, error in REFERENCE_ERRORS:
+        output, _, _, regex_error = run_regex(regex_program)
+        assert regex_error == error, (regex_program, regex_error)
+        for engine in ("closure", "vm"):
+            engine_output, _, _, engine_error = run_engine(engine, source)
+            assert (engine_output, engine_error) == (output, error), (engine, source, engine_output, engine_error)
+    print(f"OK: {len(REFERENCE_PROGRAMS)} programas y {len(REFERENCE_ERRORS)} errores iguales en los motores regex, closure y vm")
+
+
+def test_async():
+    """Comprueba que run_async cancela por pasos y por tiempo también las funciones que llaman map o reduce."""
+    import asyncio
+
+    try:
+        from .simpyl_interpreter import SimpylInterpreter
+    except ImportError:
+        from simpyl_interpreter import SimpylInterpreter
+
+    callback = "(define signo (x) (if (> x 0) 1 0))"  # Con if no es vectorizable: map la llama por elemento
+    interpreter = SimpylInterpreter(engine="vm")
+    assert asyncio.run(interpreter.run_async(callback + " (sum (map signo (vector 1 -2 3)))", budget=1_000)) == 2
+
+    cases = [
+        (" (i = 0) (while (< i 1000000) (i = (+ i 1)))", {"budget": 5_000}, "presupuesto"),
+        (" (sum (map signo datos))", {"budget": 5_000}, "presupuesto"),
+        (" (sum (map signo datos))", {"timeout": 0.05}, "tiempo"),
+        (" (define vuelta (a x) (while (> x 0) (x = (- x 1))) a) (reduce vuelta datos)", {"timeout": 0.05}, "tiempo"),
+    ]
+    for program, limits, reason in cases:
+        interpreter = SimpylInterpreter(engine="vm")
+        interpreter.variables["datos"] = list(range(2_000_000))
+        start = time.monotonic()
+        try:
+            asyncio.run(interpreter.run_async(callback + program, **limits))
+        except SimpylBudgetError as e:
+            assert reason in str(e), (program, e)
+        else:
+            raise AssertionError(f"No se canceló: {program}")
+        assert time.monotonic() - start < 2, (program, time.monotonic() - start)
+        assert not interpreter.vm.limited  # Los límites no quedan activos para la ejecución siguiente
+    print(f"OK: {len(cases)} programas cancelados por pasos o por tiempo en run_async")
+
+
+if __name__ == "__main__":
+    test_vm()
+    test_async()